@@ -0,0 +1,171 @@
+# distanceField.py
+# ----------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Distance fields: the maze distance from every cell to the nearest of a set of
+sources (e.g. the remaining food), kept up to date as sources come and go.
+
+Example:
+field = DistanceField(walls, food.asList())
+field.pathToNearest( (1,1) )   # the Directions to the closest dot
+field.removeSource( (3,1) )    # the dot at (3,1) is eaten
+
+The field is built once with a breadth first search from all sources at the
+same time.  After that it is only kept as a lower bound on the distances:
+
+  - Adding a source only lowers distances: a breadth first search from it
+    that stops where the field is already as small repairs it.
+  - Removing a source only raises distances, so the field is still a lower
+    bound and nothing has to be done yet.
+  - pathToNearest goes downhill in the field where it is exact, and searches
+    with A* (the field is a consistent heuristic) where a removed source left
+    it too low.  The cells that search closes get tighter bounds.
+
+Repairing the whole field on every removal is not worth it: when Pacman eats
+the dots one by one, the cells around the eaten dot (everything Pacman has
+cleared already) change their distance every time, while the next query only
+needs the cells between Pacman and the next dot.
+"""
+
+from array import array
+from game import getLayoutGraph
+
+UNREACHABLE = 0x7FFFFFFF  # Larger than any distance, and still fits an array('l')
+
+class DistanceField:
+    """
+    Cells are numbered like in game.LayoutGraph.  distances[i] is a lower
+    bound on the distance from cell i to the nearest source (exact when the
+    field is built), UNREACHABLE if no source can be reached.
+    """
+
+    def __init__(self, walls, sources=()):
+        self.graph = getLayoutGraph(walls)
+        self.cellIndex = self.graph.cellIndex
+        self.numCells = len(self.graph.cells)
+        self.distances = array('l', [UNREACHABLE]) * self.numCells
+        self.isSource = bytearray(self.numCells)
+        frontier = []
+        for position in sources:
+            i = self.cellIndex[position]
+            if not self.isSource[i]:
+                self.isSource[i], self.distances[i] = 1, 0
+                frontier.append(i)
+        self._spread(frontier)
+
+    def _spread(self, frontier):
+        "Breadth first search from the cells in frontier, which all have the same distance.  Only lowers distances."
+        offsets, targets, distances = self.graph.offsets, self.graph.targets, self.distances
+        while frontier:
+            nextFrontier = []
+            for cell in frontier:
+                distance = distances[cell] + 1
+                for k in range(offsets[cell], offsets[cell + 1]):
+                    other = targets[k]
+                    if distances[other] > distance:
+                        distances[other] = distance
+                        nextFrontier.append(other)
+            frontier = nextFrontier
+
+    def addSource(self, position):
+        i = self.cellIndex[position]
+        if not self.isSource[i]:
+            self.isSource[i], self.distances[i] = 1, 0
+            self._spread([i])
+
+    def removeSource(self, position):
+        # Distances can only grow, so the old ones are still lower bounds
+        self.isSource[self.cellIndex[position]] = 0
+
+    def getDistance(self, position):
+        "The maze distance from position to the nearest source, UNREACHABLE if there is none."
+        path = self.pathToNearest(position)
+        return UNREACHABLE if path is None else len(path)
+
+    def pathToNearest(self, position):
+        """
+        The Directions of a shortest path from position to the nearest source,
+        None if no source can be reached.
+
+        This is an A* search with the field as heuristic.  Where the field is
+        exact it goes straight downhill; around removed sources it searches
+        until the true distance is known.  Afterwards every cell it closed
+        gets the distance of the path found minus its distance from position,
+        a better bound for later queries (adaptive A*).
+        """
+        offsets, targets, actions = self.graph.offsets, self.graph.targets, self.graph.actions
+        distances, isSource = self.distances, self.isSource
+        start = self.cellIndex[position]
+        if distances[start] == UNREACHABLE:
+            return None
+        costs, parents, closed = {start: 0}, {}, []
+        # The heuristic is consistent, so f never decreases: one list of cells
+        # per f value, the last one pushed (the deepest) is expanded first.
+        f = distances[start]
+        buckets = {f: [start]}
+        goal = None
+        while buckets:
+            f = min(buckets)
+            bucket = buckets[f]
+            cell = bucket.pop()
+            if not bucket:
+                del buckets[f]
+            cost = costs[cell]
+            if cost + distances[cell] != f:
+                continue # Reached with a lower cost since it was pushed
+            if isSource[cell]:
+                goal = cell
+                break
+            closed.append(cell)
+            for k in range(offsets[cell], offsets[cell + 1]):
+                other = targets[k]
+                if cost + 1 < costs.get(other, UNREACHABLE) and distances[other] != UNREACHABLE:
+                    costs[other] = cost + 1
+                    parents[other] = (cell, actions[k])
+                    buckets.setdefault(cost + 1 + distances[other], []).append(other)
+
+        if goal is None:
+            for cell in closed:
+                distances[cell] = UNREACHABLE
+            return None
+        total = costs[goal]
+        for cell in closed:
+            distances[cell] = total - costs[cell]
+        path = []
+        while goal != start:
+            goal, action = parents[goal]
+            path.append(action)
+        path.reverse()
+        return path
+
+class FoodDistanceField(DistanceField):
+    """
+    A DistanceField with the food dots as sources, kept in step with the food
+    Grids of later game states by update.
+    """
+
+    def __init__(self, walls, food):
+        DistanceField.__init__(self, walls, food.asList())
+        self.height = food.height
+        self.bits = food.bits
+
+    def update(self, food):
+        "Adds and removes the dots that changed since the last food Grid."
+        eaten, added = self.bits & ~food.bits, food.bits & ~self.bits
+        for changed, method in ((eaten, self.removeSource), (added, self.addSource)):
+            while changed:
+                low = changed & -changed
+                method(divmod(low.bit_length() - 1, self.height))
+                changed ^= low
+        self.bits = food.bits
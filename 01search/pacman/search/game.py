@@ -22,7 +22,10 @@
 
 from util import *
 import time, os
+from array import array
 import traceback
+import struct
+import random
 import sys
 
 #######################
@@ -117,6 +120,9 @@ class Configuration:
             direction = self.direction # There is no stop direction
         return Configuration((x + dx, y+dy), direction)
 
+    def __reduce__(self):
+        return (Configuration, (self.pos, self.direction))
+
 class AgentState:
     """
     AgentStates hold the state of an agent (configuration, speed, scared, etc).
@@ -152,6 +158,14 @@ class AgentState:
         state.numReturned = self.numReturned
         return state
 
+    def __reduce__(self):
+        # A tuple instead of the attribute dict: faster to pickle and smaller
+        return (AgentState, (self.start, self.isPacman),
+                (self.configuration, self.scaredTimer, self.numCarrying, self.numReturned))
+
+    def __setstate__(self, state):
+        self.configuration, self.scaredTimer, self.numCarrying, self.numReturned = state
+
     def getPosition(self):
         if self.configuration == None: return None
         return self.configuration.getPosition()
@@ -159,71 +173,133 @@ class AgentState:
     def getDirection(self):
         return self.configuration.getDirection()
 
+if hasattr(int, 'bit_count'):
+    _popcount = int.bit_count
+else: # Python < 3.10
+    _popcount = lambda n: bin(n).count('1')
+
+ZOBRIST_BLOCK = 4096
+_zobristKeys = array('Q')
+
+def getZobristKeys(size):
+    """
+    A random 64 bit key for every cell index below size.  The keys are made
+    in blocks with fixed seeds, so they are the same in every process.
+    """
+    while len(_zobristKeys) < size:
+        block = random.Random(len(_zobristKeys) // ZOBRIST_BLOCK).getrandbits(64 * ZOBRIST_BLOCK)
+        _zobristKeys.frombytes(block.to_bytes(8 * ZOBRIST_BLOCK, 'little'))
+    return _zobristKeys
+
+def zobristHash(bits, size):
+    "The xor of the Zobrist keys of the cells whose bit is set."
+    keys = getZobristKeys(size)
+    h = 0
+    cells = format(bits, 'b')[::-1] # cells[i] is bit i
+    i = cells.find('1')
+    while i != -1:
+        h ^= keys[i]
+        i = cells.find('1', i + 1)
+    return h
+
 class Grid:
     """
-    A 2-dimensional array of objects backed by a list of lists.  Data is accessed
-    via grid[x][y] where (x,y) are positions on a Pacman map with x horizontal,
-    y vertical and the origin (0,0) in the bottom left corner.
+    A 2-dimensional array of booleans backed by the bits of a single Python int.
+    Data is accessed via grid[x][y] where (x,y) are positions on a Pacman map
+    with x horizontal, y vertical and the origin (0,0) in the bottom left corner.
+
+    Cell (x,y) is stored in bit x * height + y, so copying, comparing and
+    counting a Grid work on one int instead of on every cell.  Use freeze()
+    to get an immutable FrozenGrid, e.g. to store a Grid inside a search state.
+
+    The hash is a Zobrist hash (see zobristHash).  It is remembered together
+    with the bits it belongs to: setting a cell updates it with one xor, and
+    copies start with the hash of the original, so a chain of states that
+    each eat one dot never hashes a whole grid again.
 
     The __str__ method constructs an output that is oriented like a pacman board.
     """
+    _hash = _hashBits = None # For Grids that were not made by __init__
+
     def __init__(self, width, height, initialValue=False, bitRepresentation=None):
         if initialValue not in [False, True]: raise Exception('Grids can only contain booleans')
         self.CELLS_PER_INT = 30
 
         self.width = width
         self.height = height
-        self.data = [[initialValue for y in range(height)] for x in range(width)]
+        self.bits = (1 << (width * height)) - 1 if initialValue else 0
+        self._hash = self._hashBits = None # The hash of the bits _hashBits
         if bitRepresentation:
             self._unpackBits(bitRepresentation)
 
     def __getitem__(self, i):
-        return self.data[i]
+        if i < 0: i += self.width
+        if not 0 <= i < self.width: raise IndexError('Grid column out of range')
+        return GridColumn(self, i)
 
     def __setitem__(self, key, item):
-        self.data[key] = item
+        column = GridColumn(self, key)
+        for y, value in enumerate(item):
+            column[y] = value
+
+    def __iter__(self):
+        for x in range(self.width):
+            yield self[x]
 
     def __str__(self):
-        out = [[str(self.data[x][y])[0] for x in range(self.width)] for y in range(self.height)]
+        out = [[str(self[x][y])[0] for x in range(self.width)] for y in range(self.height)]
         out.reverse()
         return '\n'.join([''.join(x) for x in out])
 
     def __eq__(self, other):
-        if other == None: return False
-        return self.data == other.data
+        if self is other: return True
+        if not isinstance(other, Grid): return False
+        if self._hashBits is self.bits and other._hashBits is other.bits and self._hash != other._hash:
+            return False
+        return self.bits == other.bits and self.width == other.width and self.height == other.height
 
     def __hash__(self):
-        # return hash(str(self))
-        base = 1
-        h = 0
-        for l in self.data:
-            for i in l:
-                if i:
-                    h += base
-                base *= 2
-        return hash(h)
+        return self.getZobristHash()
+
+    def getZobristHash(self):
+        if self._hashBits is not self.bits: # Not computed yet, or the bits were replaced
+            self._hash, self._hashBits = zobristHash(self.bits, self.width * self.height), self.bits
+        return self._hash
 
     def copy(self):
         g = Grid(self.width, self.height)
-        g.data = [x[:] for x in self.data]
+        g._hash, g._hashBits = self.getZobristHash(), self.bits
+        g.bits = self.bits
         return g
 
     def deepCopy(self):
         return self.copy()
 
     def shallowCopy(self):
-        g = Grid(self.width, self.height)
-        g.data = self.data
-        return g
+        # Python ints are immutable, so a copy is as cheap as sharing the data
+        return self.copy()
+
+    def freeze(self):
+        "Returns an immutable FrozenGrid with the same cells."
+        return FrozenGrid(self)
 
     def count(self, item =True ):
-        return sum([x.count(item) for x in self.data])
+        ones = _popcount(self.bits)
+        return ones if item else self.width * self.height - ones
 
     def asList(self, key = True):
+        """
+        Returns the (x,y) positions whose value is key, in order of increasing
+        x and then increasing y.
+        """
         list = []
-        for x in range(self.width):
-            for y in range(self.height):
-                if self[x][y] == key: list.append( (x,y) )
+        height = self.height
+        cells = format(self.bits, 'b').zfill(self.width * height)[::-1] # cells[i] is bit i
+        char = '1' if key else '0'
+        i = cells.find(char)
+        while i != -1:
+            list.append( (i // height, i % height) )
+            i = cells.find(char, i + 1)
         return list
 
     def packBits(self):
@@ -231,48 +307,102 @@ class Grid:
         Returns an efficient int list representation
 
         (width, height, bitPackedInts...)
+
+        Every int holds CELLS_PER_INT cells, the first one in its highest bit.
         """
-        bits = [self.width, self.height]
-        currentInt = 0
-        for i in range(self.height * self.width):
-            bit = self.CELLS_PER_INT - (i % self.CELLS_PER_INT) - 1
-            x, y = self._cellIndexToPosition(i)
-            if self[x][y]:
-                currentInt += 2 ** bit
-            if (i + 1) % self.CELLS_PER_INT == 0:
-                bits.append(currentInt)
-                currentInt = 0
-        bits.append(currentInt)
-        return tuple(bits)
-
-    def _cellIndexToPosition(self, index):
-        x = index // self.height
-        y = index % self.height
-        return x, y
+        n, size = self.CELLS_PER_INT, self.width * self.height
+        cells = format(self.bits, 'b').zfill(size)[::-1][:size] # cells[i] is bit i
+        cells += '0' * (-size % n)
+        ints = [int(cells[i:i + n], 2) for i in range(0, len(cells), n)]
+        if size % n == 0:
+            ints.append(0)
+        return (self.width, self.height) + tuple(ints)
 
     def _unpackBits(self, bits):
         """
         Fills in data from a bit-level representation
         """
-        cell = 0
-        for packed in bits:
-            for bit in self._unpackInt(packed, self.CELLS_PER_INT):
-                if cell == self.width * self.height: break
-                x, y = self._cellIndexToPosition(cell)
-                self[x][y] = bit
-                cell += 1
-
-    def _unpackInt(self, packed, size):
-        bools = []
-        if packed < 0: raise ValueError("must be a positive integer")
-        for i in range(size):
-            n = 2 ** (self.CELLS_PER_INT - i - 1)
-            if packed >= n:
-                bools.append(True)
-                packed -= n
-            else:
-                bools.append(False)
-        return bools
+        if min(bits) < 0: raise ValueError("must be a positive integer")
+        cells = ''.join([format(packed, '0%db' % self.CELLS_PER_INT) for packed in bits])
+        cells = cells[:self.width * self.height]
+        self.bits = int(cells[::-1], 2) if cells else 0
+
+    def toBytes(self):
+        "The cells as little endian bytes, cell (x,y) in bit x * height + y.  See gridFromBytes."
+        return self.bits.to_bytes((self.width * self.height + 7) // 8, 'little')
+
+    def __reduce__(self):
+        # Pickle only the packed cells, not the tables cached on FrozenGrids
+        return (gridFromBytes, (self.width, self.height, self.toBytes(), isinstance(self, FrozenGrid)))
+
+class GridColumn:
+    """
+    The column grid[x] of a Grid, reads and writes go straight to the bits of
+    the grid.
+    """
+    __slots__ = ('grid', 'x')
+
+    def __init__(self, grid, x):
+        self.grid = grid
+        self.x = x
+
+    def _bit(self, y):
+        height = self.grid.height
+        if y < 0: y += height
+        if not 0 <= y < height: raise IndexError('Grid row out of range')
+        return self.x * height + y
+
+    def __getitem__(self, y):
+        return (self.grid.bits >> self._bit(y)) & 1 == 1
+
+    def __setitem__(self, y, value):
+        if value not in [False, True]: raise Exception('Grids can only contain booleans')
+        grid, i = self.grid, self._bit(y)
+        bits = grid.bits
+        if (bits >> i & 1) != value:
+            grid.bits = bits ^ (1 << i)
+            if grid._hashBits is bits:
+                grid._hash ^= _zobristKeys[i]
+                grid._hashBits = grid.bits
+
+    def __len__(self):
+        return self.grid.height
+
+    def __iter__(self):
+        for y in range(self.grid.height):
+            yield self[y]
+
+class FrozenGrid(Grid):
+    """
+    An immutable Grid.  Its hash is computed at most once (or taken over from
+    the grid it was made of), and grid[x] returns a cached tuple so reading
+    cells is as fast as with a list of lists.  copy() returns a regular,
+    mutable Grid.
+    """
+    def __init__(self, grid):
+        self.CELLS_PER_INT = grid.CELLS_PER_INT
+        self.width = grid.width
+        self.height = grid.height
+        self.bits = grid.bits
+        self._hash, self._hashBits = grid._hash, grid._hashBits
+        self._columns = None
+
+    def __getitem__(self, i):
+        if self._columns is None:
+            self._columns = tuple([tuple(GridColumn(self, x)) for x in range(self.width)])
+        return self._columns[i]
+
+    def __setitem__(self, key, item):
+        raise TypeError('FrozenGrid does not support item assignment')
+
+    def freeze(self):
+        return self
+
+def gridFromBytes(width, height, data, frozen=False):
+    "The Grid (a FrozenGrid if frozen) of the bytes of Grid.toBytes."
+    grid = Grid(width, height)
+    grid.bits = int.from_bytes(data, 'little')
+    return grid.freeze() if frozen else grid
 
 def reconstituteGrid(bitRep):
     if type(bitRep) is not type((1,2)):
@@ -338,6 +468,11 @@ class Actions:
         if (abs(x - x_int) + abs(y - y_int)  > Actions.TOLERANCE):
             return [config.getDirection()]
 
+        if isinstance(walls, FrozenGrid):
+            actions = getLayoutGraph(walls).legalActions.get((x_int, y_int))
+            if actions is not None:
+                return list(actions)
+
         for dir, vec in Actions._directionsAsList:
             dx, dy = vec
             next_y = y_int + dy
@@ -351,6 +486,10 @@ class Actions:
     def getLegalNeighbors(position, walls):
         x,y = position
         x_int, y_int = int(x + 0.5), int(y + 0.5)
+        if isinstance(walls, FrozenGrid):
+            neighbors = getLayoutGraph(walls).legalNeighbors.get((x_int, y_int))
+            if neighbors is not None:
+                return list(neighbors)
         neighbors = []
         for dir, vec in Actions._directionsAsList:
             dx, dy = vec
@@ -368,9 +507,85 @@ class Actions:
         return (x + dx, y + dy)
     getSuccessor = staticmethod(getSuccessor)
 
+class LayoutGraph:
+    """
+    A compiled walls Grid.  Every open cell gets an integer id (column by
+    column, the order of walls.asList(False)) and the moves between the cells
+    are stored as compressed sparse row arrays: the moves out of cell i are
+    targets[offsets[i]:offsets[i+1]], in the directions actions[...], in the
+    order NORTH, SOUTH, EAST, WEST.
+
+    The per-position tuples below are built from those arrays and are what
+    the successor functions, Actions.getPossibleActions and
+    Actions.getLegalNeighbors read.  Use getLayoutGraph(walls) so the tables
+    are built only once per walls Grid.
+    """
+
+    MOVES = [(Directions.NORTH, (0, 1)), (Directions.SOUTH, (0, -1)),
+             (Directions.EAST, (1, 0)), (Directions.WEST, (-1, 0))]
+
+    def __init__(self, walls):
+        self.width, self.height = walls.width, walls.height
+        self.cells = walls.asList(False)
+        self.cellIndex = dict([(cell, i) for i, cell in enumerate(self.cells)])
+        self.offsets = array('i', [0])
+        self.targets = array('i')
+        self.actions = []
+        for x, y in self.cells:
+            for action, (dx, dy) in LayoutGraph.MOVES:
+                target = self.cellIndex.get((x + dx, y + dy))
+                if target is not None:
+                    self.targets.append(target)
+                    self.actions.append(action)
+            self.offsets.append(len(self.targets))
+
+        cells, targets, actions, offsets = self.cells, self.targets, self.actions, self.offsets
+        self.successors = {} # position -> ((next position, action), ...)
+        self.legalActions = {} # position -> actions of Actions.getPossibleActions
+        self.legalNeighbors = {} # position -> positions of Actions.getLegalNeighbors
+        self.predecessors = {} # position -> ((previous position, action), ...)
+        for i, cell in enumerate(cells):
+            moves = tuple([(cells[targets[k]], actions[k]) for k in range(offsets[i], offsets[i + 1])])
+            self.successors[cell] = moves
+            self.legalActions[cell] = tuple([action for _, action in moves]) + (Directions.STOP,)
+            self.legalNeighbors[cell] = tuple([position for position, _ in moves]) + (cell,)
+            reverse = dict([(Actions.reverseDirection(action), position) for position, action in moves])
+            self.predecessors[cell] = tuple([(reverse[action], action) for action, _ in LayoutGraph.MOVES
+                                             if action in reverse])
+
+    def getNeighbors(self, i):
+        "The (cell id, action) pairs of the moves out of cell id i."
+        return [(self.targets[k], self.actions[k]) for k in range(self.offsets[i], self.offsets[i + 1])]
+
+def getLayoutGraph(walls):
+    """
+    Returns the LayoutGraph of a walls Grid.  The graph is cached on FrozenGrid
+    walls (the walls of a Layout, shared by all its game states); a mutable
+    Grid is compiled on every call.
+    """
+    graph = getattr(walls, '_layoutGraph', None)
+    if graph is None:
+        graph = LayoutGraph(walls)
+        if isinstance(walls, FrozenGrid):
+            walls._layoutGraph = graph
+    return graph
+
+# GameStateData.toBytes: a header, one record per agent, the capsules and the food bits
+_STATE_HEADER = struct.Struct('<BBbHdd6i') # flags, agents, agent moved, capsules, score, score change, food eaten, capsule eaten, food added
+_AGENT_RECORD = struct.Struct('<BddBddBHHH') # flags, start x, y, direction, x, y, direction, scared timer, carrying, returned
+_DIRECTION_CODES = [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST, Directions.STOP]
+_DIRECTION_INDEX = dict([(direction, i) for i, direction in enumerate(_DIRECTION_CODES)])
+_NO_POSITION = (-1, -1)
+
 class GameStateData:
     """
+    The data of a game state.  toBytes packs it without the layout, which
+    all states of a game share; pickling uses the same packed form and adds
+    the layout once per pickle.
 
+    A state is a snapshot: it is only changed while it is being built (by
+    initialize or GameState.generateSuccessor), so its hash is computed once
+    and kept.  Do not change a state after it has been hashed.
     """
     def __init__( self, prevState = None ):
         """
@@ -391,15 +606,17 @@ class GameStateData:
         self._lose = False
         self._win = False
         self.scoreChange = 0
+        self._hash = None
 
     def deepCopy( self ):
+        # GameStateData( self ) already copied the food and agent states, and
+        # the layout never changes
         state = GameStateData( self )
-        state.food = self.food.deepCopy()
-        state.layout = self.layout.deepCopy()
         state._agentMoved = self._agentMoved
         state._foodEaten = self._foodEaten
         state._foodAdded = self._foodAdded
         state._capsuleEaten = self._capsuleEaten
+        state._hash = self._hash
         return state
 
     def copyAgentStates( self, agentStates ):
@@ -408,12 +625,45 @@ class GameStateData:
             copiedStates.append( agentState.copy() )
         return copiedStates
 
+    def toBytes( self ):
+        """
+        The state without its layout as a few dozen bytes; gameStateDataFromBytes
+        with the same layout turns them back into an equal GameStateData.
+        Integer positions and scores stay ints.
+        """
+        flags = self._lose | self._win << 1 | (type(self.score) is int) << 2 | (type(self.scoreChange) is int) << 3
+        agentMoved = -1 if self._agentMoved is None else self._agentMoved
+        parts = [_STATE_HEADER.pack(flags, len(self.agentStates), agentMoved, len(self.capsules),
+                                    self.score, self.scoreChange,
+                                    *(_NO_POSITION if self._foodEaten is None else self._foodEaten),
+                                    *(_NO_POSITION if self._capsuleEaten is None else self._capsuleEaten),
+                                    *(_NO_POSITION if self._foodAdded is None else self._foodAdded))]
+        for agentState, eaten in zip(self.agentStates, self._eaten):
+            start, configuration = agentState.start, agentState.configuration
+            flags = agentState.isPacman | eaten << 1 | _isIntegral(start.pos) << 2
+            if configuration is None:
+                pos, direction = _NO_POSITION, 0
+            else:
+                flags |= 8 | _isIntegral(configuration.pos) << 4
+                pos, direction = configuration.pos, _DIRECTION_INDEX[configuration.direction]
+            parts.append(_AGENT_RECORD.pack(flags, start.pos[0], start.pos[1], _DIRECTION_INDEX[start.direction],
+                                            pos[0], pos[1], direction, agentState.scaredTimer,
+                                            agentState.numCarrying, agentState.numReturned))
+        parts.append(struct.pack('<%di' % (2 * len(self.capsules)), *[n for pos in self.capsules for n in pos]))
+        parts.append(self.food.toBytes())
+        return b''.join(parts)
+
+    def __reduce__( self ):
+        return (gameStateDataFromBytes, (self.toBytes(), self.layout))
+
     def __eq__( self, other ):
         """
         Allows two states to be compared.
         """
+        if self is other: return True
         if other == None: return False
         # TODO Check for type of other
+        if self._hash is not None and other._hash is not None and self._hash != other._hash: return False
         if not self.agentStates == other.agentStates: return False
         if not self.food == other.food: return False
         if not self.capsules == other.capsules: return False
@@ -422,19 +672,16 @@ class GameStateData:
 
     def __hash__( self ):
         """
-        Allows states to be keys of dictionaries.
+        Allows states to be keys of dictionaries.  The food hash is kept up
+        to date as dots are eaten (see Grid), the rest is hashed once.
         """
-        for i, state in enumerate( self.agentStates ):
-            try:
-                int(hash(state))
-            except TypeError as e:
-                print(e)
-                #hash(state)
-        return int((hash(tuple(self.agentStates)) + 13*hash(self.food) + 113* hash(tuple(self.capsules)) + 7 * hash(self.score)) % 1048575 )
+        if self._hash is None:
+            self._hash = hash((tuple(self.agentStates), self.food, tuple(self.capsules), self.score))
+        return self._hash
 
     def __str__( self ):
         width, height = self.layout.width, self.layout.height
-        map = Grid(width, height)
+        map = [[None for y in range(height)] for x in range(width)]
         if type(self.food) == type((1,2)):
             self.food = reconstituteGrid(self.food)
         for x in range(width):
@@ -455,7 +702,9 @@ class GameStateData:
         for x, y in self.capsules:
             map[x][y] = 'o'
 
-        return str(map) + ("\nScore: %d\n" % self.score)
+        out = [''.join([map[x][y] for x in range(width)]) for y in range(height)]
+        out.reverse()
+        return '\n'.join(out) + ("\nScore: %d\n" % self.score)
 
     def _foodWallStr( self, hasFood, hasWall ):
         if hasFood:
@@ -490,7 +739,7 @@ class GameStateData:
         """
         self.food = layout.food.copy()
         #self.capsules = []
-        self.capsules = layout.capsules[:]
+        self.capsules = list(layout.capsules)
         self.layout = layout
         self.score = 0
         self.scoreChange = 0
@@ -504,18 +753,97 @@ class GameStateData:
             self.agentStates.append( AgentState( Configuration( pos, Directions.STOP), isPacman) )
         self._eaten = [False for a in self.agentStates]
 
+def _isIntegral(pos):
+    return type(pos[0]) is int and type(pos[1]) is int
+
+def _unpackPosition(x, y, integral):
+    return (int(x), int(y)) if integral else (x, y)
+
+def gameStateDataFromBytes(data, layout):
+    "The GameStateData of the bytes of GameStateData.toBytes, on the given layout."
+    flags, numAgents, agentMoved, numCapsules, score, scoreChange, *positions = _STATE_HEADER.unpack_from(data)
+    state = GameStateData()
+    state.layout = layout
+    state._lose, state._win = bool(flags & 1), bool(flags & 2)
+    state.score = int(score) if flags & 4 else score
+    state.scoreChange = int(scoreChange) if flags & 8 else scoreChange
+    state._agentMoved = None if agentMoved == -1 else agentMoved
+    state._foodEaten, state._capsuleEaten, state._foodAdded = \
+        [None if pos == _NO_POSITION else pos for pos in zip(positions[0::2], positions[1::2])]
+    state.agentStates, state._eaten = [], []
+    offset = _STATE_HEADER.size
+    for i in range(numAgents):
+        flags, startX, startY, startDirection, x, y, direction, scaredTimer, numCarrying, numReturned = \
+            _AGENT_RECORD.unpack_from(data, offset)
+        offset += _AGENT_RECORD.size
+        start = Configuration(_unpackPosition(startX, startY, flags & 4), _DIRECTION_CODES[startDirection])
+        agentState = AgentState(start, bool(flags & 1))
+        if flags & 8:
+            agentState.configuration = Configuration(_unpackPosition(x, y, flags & 16), _DIRECTION_CODES[direction])
+        else:
+            agentState.configuration = None
+        agentState.scaredTimer, agentState.numCarrying, agentState.numReturned = scaredTimer, numCarrying, numReturned
+        state.agentStates.append(agentState)
+        state._eaten.append(bool(flags & 2))
+    capsules = struct.unpack_from('<%di' % (2 * numCapsules), data, offset)
+    state.capsules = list(zip(capsules[0::2], capsules[1::2]))
+    state.food = gridFromBytes(layout.width, layout.height, data[offset + 8 * numCapsules:])
+    return state
+
 try:
     import boinc
     _BOINC_ENABLED = True
 except:
     _BOINC_ENABLED = False
 
+class AgentSandbox:
+    """
+    Calls the methods of a game's agents and keeps count of the wall clock
+    and CPU time (of the calling thread) each agent has used.  With a
+    timeout the call is cut short by util.TimeoutFunction: by SIGALRM in the
+    main thread, which also interrupts calls blocked in C code (a sleep), and
+    by the util.Watchdog in other threads, so timed games can be played in
+    threads as well as in worker processes.
+    """
+    def __init__(self, numAgents):
+        self.wallTimes = [0.0 for i in range(numAgents)]
+        self.cpuTimes = [0.0 for i in range(numAgents)]
+        self.lastWallTime = 0.0 # Of the last call, also if it timed out or crashed
+
+    def call(self, agentIndex, timeout, function, *args):
+        """
+        Returns function(*args), raises TimeoutFunctionException if it takes
+        more than timeout seconds (None: no limit).
+        """
+        startWall, startCpu = time.perf_counter(), time.thread_time()
+        try:
+            if timeout is None:
+                return function(*args)
+            return TimeoutFunction(function, timeout)(*args)
+        finally:
+            self.lastWallTime = time.perf_counter() - startWall
+            self.wallTimes[agentIndex] += self.lastWallTime
+            self.cpuTimes[agentIndex] += time.thread_time() - startCpu
+
 class Game:
     """
     The Game manages the control flow, soliciting actions from agents.
+
+    With catchExceptions the agents are held to the rules' time budgets:
+    getMaxStartupTime for registerInitialState, getMoveTimeout for each
+    move and getMaxTotalTime for the whole game.  The times the agents used
+    are in sandbox (and totalAgentTimes, the wall clock times).  Which
+    agents have an observationFunction and whether the display is a null
+    one (see checkNullDisplay, which is then not updated) are looked up once
+    per game, not every turn.
+
+    The (agentIndex, action) pairs of the game are only kept in moveHistory
+    with recordHistory; agentMoves counts the moves of every agent.  A
+    recorder (see gameRecord.GameRecorder) is told every move as it is made.
     """
 
-    def __init__( self, agents, display, rules, startingIndex=0, muteAgents=False, catchExceptions=False ):
+    def __init__( self, agents, display, rules, startingIndex=0, muteAgents=False, catchExceptions=False,
+                  recordHistory=False ):
         self.agentCrashed = False
         self.agents = agents
         self.display = display
@@ -524,12 +852,17 @@ class Game:
         self.gameOver = False
         self.muteAgents = muteAgents
         self.catchExceptions = catchExceptions
+        self.recordHistory = recordHistory
         self.moveHistory = []
-        self.totalAgentTimes = [0 for agent in agents]
+        self.recorder = None
+        self.agentMoves = [0 for agent in agents]
+        self.sandbox = AgentSandbox(len(agents))
+        self.totalAgentTimes = self.sandbox.wallTimes
         self.totalAgentTimeWarnings = [0 for agent in agents]
         self.agentTimeout = False
-        import io
-        self.agentOutput = [io.StringIO() for agent in agents]
+        if muteAgents:
+            import io
+            self.agentOutput = [io.StringIO() for agent in agents]
 
     def getProgress(self):
         if self.gameOver:
@@ -587,12 +920,9 @@ class Game:
                 self.mute(i)
                 if self.catchExceptions:
                     try:
-                        timed_func = TimeoutFunction(agent.registerInitialState, int(self.rules.getMaxStartupTime(i)))
                         try:
-                            start_time = time.time()
-                            timed_func(self.state.deepCopy())
-                            time_taken = time.time() - start_time
-                            self.totalAgentTimes[i] += time_taken
+                            self.sandbox.call(i, self.rules.getMaxStartupTime(i), agent.registerInitialState,
+                                              self.state.deepCopy())
                         except TimeoutFunctionException:
                             print("Agent %d ran out of time on startup!" % i, file=sys.stderr)
                             self.unmute()
@@ -604,90 +934,40 @@ class Game:
                         self.unmute()
                         return
                 else:
-                    agent.registerInitialState(self.state.deepCopy())
+                    self.sandbox.call(i, None, agent.registerInitialState, self.state.deepCopy())
                 ## TODO: could this exceed the total time
                 self.unmute()
 
         agentIndex = self.startingIndex
         numAgents = len( self.agents )
+        # Looked up once per game instead of every turn
+        observers = [getattr(agent, 'observationFunction', None) for agent in self.agents]
+        actors = [agent.getAction for agent in self.agents]
+        isNull = getattr(self.display, 'checkNullDisplay', None)
+        update = None if isNull is not None and isNull() else self.display.update
+        history = self.moveHistory if self.recordHistory else None
+        sandbox, rules, recorder = self.sandbox, self.rules, self.recorder
 
         while not self.gameOver:
-            # Fetch the next agent
-            agent = self.agents[agentIndex]
-            move_time = 0
-            skip_action = False
-            # Generate an observation of the state
-            if 'observationFunction' in dir( agent ):
-                self.mute(agentIndex)
-                if self.catchExceptions:
-                    try:
-                        timed_func = TimeoutFunction(agent.observationFunction, int(self.rules.getMoveTimeout(agentIndex)))
-                        try:
-                            start_time = time.time()
-                            observation = timed_func(self.state.deepCopy())
-                        except TimeoutFunctionException:
-                            skip_action = True
-                        move_time += time.time() - start_time
-                        self.unmute()
-                    except Exception as data:
-                        self._agentCrash(agentIndex, quiet=False)
-                        self.unmute()
-                        return
-                else:
-                    observation = agent.observationFunction(self.state.deepCopy())
-                self.unmute()
-            else:
-                observation = self.state.deepCopy()
-
-            # Solicit an action
-            action = None
+            # Generate an observation of the state and solicit an action
             self.mute(agentIndex)
             if self.catchExceptions:
-                try:
-                    timed_func = TimeoutFunction(agent.getAction, int(self.rules.getMoveTimeout(agentIndex)) - int(move_time))
-                    try:
-                        start_time = time.time()
-                        if skip_action:
-                            raise TimeoutFunctionException()
-                        action = timed_func( observation )
-                    except TimeoutFunctionException:
-                        print("Agent %d timed out on a single move!" % agentIndex, file=sys.stderr)
-                        self.agentTimeout = True
-                        self._agentCrash(agentIndex, quiet=True)
-                        self.unmute()
-                        return
-
-                    move_time += time.time() - start_time
-
-                    if move_time > self.rules.getMoveWarningTime(agentIndex):
-                        self.totalAgentTimeWarnings[agentIndex] += 1
-                        print("Agent %d took too long to make a move! This is warning %d" % (agentIndex, self.totalAgentTimeWarnings[agentIndex]), file=sys.stderr)
-                        if self.totalAgentTimeWarnings[agentIndex] > self.rules.getMaxTimeWarnings(agentIndex):
-                            print("Agent %d exceeded the maximum number of warnings: %d" % (agentIndex, self.totalAgentTimeWarnings[agentIndex]), file=sys.stderr)
-                            self.agentTimeout = True
-                            self._agentCrash(agentIndex, quiet=True)
-                            self.unmute()
-                            return
-
-                    self.totalAgentTimes[agentIndex] += move_time
-                    #print("Agent: %d, time: %f, total: %f" % (agentIndex, move_time, self.totalAgentTimes[agentIndex]))
-                    if self.totalAgentTimes[agentIndex] > self.rules.getMaxTotalTime(agentIndex):
-                        print("Agent %d ran out of time! (time: %1.2f)" % (agentIndex, self.totalAgentTimes[agentIndex]), file=sys.stderr)
-                        self.agentTimeout = True
-                        self._agentCrash(agentIndex, quiet=True)
-                        self.unmute()
-                        return
-                    self.unmute()
-                except Exception as data:
-                    self._agentCrash(agentIndex)
+                action = self._timedAction(agentIndex, observers[agentIndex])
+                if self.agentCrashed:
                     self.unmute()
                     return
             else:
-                action = agent.getAction(observation)
+                observe = observers[agentIndex]
+                if observe is None:
+                    observation = self.state.deepCopy()
+                else:
+                    observation = sandbox.call(agentIndex, None, observe, self.state.deepCopy())
+                action = sandbox.call(agentIndex, None, actors[agentIndex], observation)
             self.unmute()
 
             # Execute the action
-            self.moveHistory.append( (agentIndex, action) )
+            if history is not None:
+                history.append( (agentIndex, action) )
             if self.catchExceptions:
                 try:
                     self.state = self.state.generateSuccessor( agentIndex, action )
@@ -698,16 +978,20 @@ class Game:
                     return
             else:
                 self.state = self.state.generateSuccessor( agentIndex, action )
+            if recorder is not None:
+                recorder.recordMove( agentIndex, action, self.state )
 
             # Change the display
-            self.display.update( self.state.data )
+            if update is not None:
+                update( self.state.data )
             ###idx = agentIndex - agentIndex % 2 + 1
             ###self.display.update( self.state.makeObservation(idx).data )
 
             # Allow for game specific conditions (winning, losing, etc.)
-            self.rules.process(self.state, self)
+            rules.process(self.state, self)
             # Track progress
-            if agentIndex == numAgents + 1: self.numMoves += 1
+            self.agentMoves[agentIndex] += 1
+            self.numMoves += 1
             # Next agent
             agentIndex = ( agentIndex + 1 ) % numAgents
 
@@ -727,3 +1011,67 @@ class Game:
                     self.unmute()
                     return
         self.display.finish()
+
+    def _timedAction( self, agentIndex, observe ):
+        """
+        The observation and the action of a turn with catchExceptions: both
+        are held to the move timeout and the action also to what is left of
+        the agent's total time.  An exception, a timeout or too many warnings
+        crash the agent (agentCrashed is then set and None returned).
+        """
+        agent = self.agents[agentIndex]
+        move_time = 0
+        skip_action = False
+        if observe is not None:
+            try:
+                try:
+                    observation = self.sandbox.call(agentIndex, self.rules.getMoveTimeout(agentIndex),
+                                                    observe, self.state.deepCopy())
+                except TimeoutFunctionException:
+                    skip_action = True
+                move_time += self.sandbox.lastWallTime
+            except Exception as data:
+                self._agentCrash(agentIndex, quiet=False)
+                return None
+        else:
+            observation = self.state.deepCopy()
+
+        action = None
+        try:
+            # The move may not take longer than what is left of the agent's total time either
+            moveLeft = self.rules.getMoveTimeout(agentIndex) - move_time
+            totalLeft = self.rules.getMaxTotalTime(agentIndex) - self.totalAgentTimes[agentIndex]
+            try:
+                if skip_action:
+                    raise TimeoutFunctionException()
+                action = self.sandbox.call(agentIndex, min(moveLeft, totalLeft), agent.getAction, observation)
+            except TimeoutFunctionException:
+                if totalLeft < moveLeft:
+                    print("Agent %d ran out of time! (time: %1.2f)" % (agentIndex, self.totalAgentTimes[agentIndex]), file=sys.stderr)
+                else:
+                    print("Agent %d timed out on a single move!" % agentIndex, file=sys.stderr)
+                self.agentTimeout = True
+                self._agentCrash(agentIndex, quiet=True)
+                return None
+
+            move_time += self.sandbox.lastWallTime
+
+            if move_time > self.rules.getMoveWarningTime(agentIndex):
+                self.totalAgentTimeWarnings[agentIndex] += 1
+                print("Agent %d took too long to make a move! This is warning %d" % (agentIndex, self.totalAgentTimeWarnings[agentIndex]), file=sys.stderr)
+                if self.totalAgentTimeWarnings[agentIndex] > self.rules.getMaxTimeWarnings(agentIndex):
+                    print("Agent %d exceeded the maximum number of warnings: %d" % (agentIndex, self.totalAgentTimeWarnings[agentIndex]), file=sys.stderr)
+                    self.agentTimeout = True
+                    self._agentCrash(agentIndex, quiet=True)
+                    return None
+
+            #print("Agent: %d, time: %f, total: %f" % (agentIndex, move_time, self.totalAgentTimes[agentIndex]))
+            if self.totalAgentTimes[agentIndex] > self.rules.getMaxTotalTime(agentIndex):
+                print("Agent %d ran out of time! (time: %1.2f)" % (agentIndex, self.totalAgentTimes[agentIndex]), file=sys.stderr)
+                self.agentTimeout = True
+                self._agentCrash(agentIndex, quiet=True)
+                return None
+        except Exception as data:
+            self._agentCrash(agentIndex)
+            return None
+        return action
@@ -0,0 +1,154 @@
+# gameBenchmark.py
+# ----------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+A microbenchmark of the game loop: turns per second of Game.run.
+
+The same games (game i is seeded like with pacman.py --workers) are played
+without display by each way of running them:
+
+  baseline        the loop Game.run had before its per-game lookups (see
+                  playBaselineGame)
+  run             Game.run as pacman.py plays games
+  catchExceptions with time budgets and exception handling (pacman.py -c)
+
+The turns per second include the agents' own work, which is also shown on
+its own (Agents) so the overhead of the loop is the rest.  Each way plays
+the games --repeat times, the fastest time counts.  Use a cheap Pacman
+agent, like the default, to see the loop itself.
+
+All the ways copy and advance today's game states, so baseline against run
+is the speedup of the loop alone.  What the cheaper state copies gained on
+top of that only shows by copying gameBenchmark.py into an older checkout
+and running it there with -m baseline, which times the old states with the
+old loop.
+
+Examples:
+  python gameBenchmark.py
+  python gameBenchmark.py -l smallClassic -p GreedyAgent -n 50
+  python gameBenchmark.py -m baseline,run
+"""
+
+import sys, time, random
+import layout, pacman, textDisplay
+
+def playBaselineGame(game):
+    """
+    Plays the game like Game.run without catchExceptions did before it looked
+    the agents' methods up once per game: dir() on the agent every turn, the
+    move history always kept and the display always updated.  It only uses
+    what Game had then, so it also runs in older checkouts.
+    """
+    game.display.initialize(game.state.data)
+    game.numMoves = 0
+    for i, agent in enumerate(game.agents):
+        if 'registerInitialState' in dir(agent):
+            game.mute(i)
+            game.sandbox.call(i, None, agent.registerInitialState, game.state.deepCopy())
+            game.unmute()
+
+    agentIndex = game.startingIndex
+    numAgents = len(game.agents)
+    while not game.gameOver:
+        agent = game.agents[agentIndex]
+        if 'observationFunction' in dir(agent):
+            game.mute(agentIndex)
+            observation = game.sandbox.call(agentIndex, None, agent.observationFunction, game.state.deepCopy())
+            game.unmute()
+        else:
+            observation = game.state.deepCopy()
+        game.mute(agentIndex)
+        action = game.sandbox.call(agentIndex, None, agent.getAction, observation)
+        game.unmute()
+
+        game.moveHistory.append((agentIndex, action))
+        game.state = game.state.generateSuccessor(agentIndex, action)
+        game.display.update(game.state.data)
+        game.rules.process(game.state, game)
+        game.numMoves += 1
+        agentIndex = (agentIndex + 1) % numAgents
+
+    for agentIndex, agent in enumerate(game.agents):
+        if 'final' in dir(agent):
+            game.mute(agentIndex)
+            agent.final(game.state)
+            game.unmute()
+    game.display.finish()
+
+def playRun(game):
+    game.run()
+
+# The ways of playing the games: name, catchExceptions and the function playing a game
+MODES = [('baseline', False, playBaselineGame), ('run', False, playRun), ('catchExceptions', True, playRun)]
+
+def playGames(gameLayout, pacmanAgent, ghostAgents, numGames, seed, catchExceptions, play):
+    "Plays the games, returns the number of turns, the seconds they took and the seconds spent in the agents."
+    turns, seconds, agentSeconds = 0, 0.0, 0.0
+    for i in range(numGames):
+        random.seed(pacman.getGameSeed(seed, i))
+        rules = pacman.ClassicGameRules()
+        game = rules.newGame(gameLayout, pacmanAgent, ghostAgents, textDisplay.NullGraphics(), True, catchExceptions)
+        start = time.perf_counter()
+        play(game)
+        seconds += time.perf_counter() - start
+        turns += game.numMoves
+        agentSeconds += sum(game.sandbox.wallTimes)
+    return turns, seconds, agentSeconds
+
+def readCommand(argv):
+    from optparse import OptionParser
+    parser = OptionParser(__doc__)
+    parser.add_option('-l', '--layout', dest='layout', default='mediumClassic',
+                      help='the layout to play on [Default: %default]')
+    parser.add_option('-p', '--pacman', dest='pacman', default='LeftTurnAgent',
+                      help='the Pacman agent, from any *Agents.py [Default: %default]')
+    parser.add_option('-g', '--ghosts', dest='ghost', default='RandomGhost',
+                      help='the ghost agent [Default: %default]')
+    parser.add_option('-n', '--numGames', dest='numGames', type='int', default=20,
+                      help='the number of games per way of running them [Default: %default]')
+    parser.add_option('--seed', dest='seed', default='cs188',
+                      help='the seed of the games [Default: %default]')
+    parser.add_option('-r', '--repeat', dest='repeat', type='int', default=3,
+                      help='play the games this many times and keep the fastest [Default: %default]')
+    parser.add_option('-m', '--modes', dest='modes', default=','.join([mode[0] for mode in MODES]),
+                      help='the ways of running the games, comma separated [Default: %default]')
+    options, otherjunk = parser.parse_args(argv)
+    if len(otherjunk) != 0:
+        raise Exception('Command line input not understood: ' + str(otherjunk))
+    for name in options.modes.split(','):
+        if name not in [mode[0] for mode in MODES]:
+            raise Exception('Unknown mode: ' + name)
+    return options
+
+def main(argv):
+    options = readCommand(argv)
+    gameLayout = layout.getLayout(options.layout)
+    if gameLayout == None: raise Exception("The layout " + options.layout + " cannot be found")
+    pacmanAgent = pacman.loadAgent(options.pacman, True)()
+    ghostType = pacman.loadAgent(options.ghost, True)
+    ghostAgents = [ghostType(i + 1) for i in range(gameLayout.getNumGhosts())]
+
+    print('%d games of %s on %s' % (options.numGames, options.pacman, options.layout))
+    print('%-16s %8s %10s %10s %10s' % ('', 'Turns', 'Turns/s', 'us/turn', 'Agents'))
+    for name, catchExceptions, play in MODES:
+        if name not in options.modes.split(','): continue
+        turns, seconds, agentSeconds = min([playGames(gameLayout, pacmanAgent, ghostAgents, options.numGames,
+                                                      options.seed, catchExceptions, play)
+                                            for i in range(options.repeat)], key=lambda result: result[1])
+        print('%-16s %8d %10.0f %10.1f %9.1fus' % (name, turns, turns / seconds, 1e6 * seconds / turns,
+                                                   1e6 * agentSeconds / turns))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,283 @@
+# gameRecord.py
+# -------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Game recordings: a compact binary file a game writes while it is played
+(pacman.py -r), which can be replayed from any turn (pacman.py --replay) and
+scored or verified in batches without display (python gameRecord.py).
+
+A recording is:
+
+  header      MAGIC, the keyframe interval and the layout text
+  keyframe    KEYFRAME, the turn and the packed state (GameStateData.toBytes)
+  moves       one byte per move: agentIndex << 3 | the code of the action
+  keyframe    every keyframe interval moves, the state after that many moves
+  ...
+  end         END, the number of moves, win/lose/crash flags and the score
+
+The first keyframe is the state the game starts in.  The move bytes are
+never KEYFRAME or END, so a recording cut off while it was written (the
+game crashed) can still be read up to its last complete keyframe and the
+moves after it; it just has no end.  Opening a recording only jumps from
+keyframe to keyframe.  The state at any turn is then the keyframe before it
+plus at most an interval of moves.
+
+Examples:
+  python gameRecord.py recorded-game-*            # score from the last keyframes
+  python gameRecord.py --verify -w 4 recorded-game-*
+"""
+
+import struct, sys, time
+from game import Game, Directions, gameStateDataFromBytes
+
+MAGIC = b'PACREC1\n'
+KEYFRAME = 0xFF
+END = 0xFE
+KEYFRAME_INTERVAL = 100 # Moves between keyframes
+
+_HEADER = struct.Struct('<8sHI') # magic, keyframe interval, length of the layout text
+_KEYFRAME = struct.Struct('<II') # turn, length of the state
+_END = struct.Struct('<IBd') # moves, flags (win, lose, crashed, timed out), score
+ACTIONS = [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST, Directions.STOP]
+_ACTION_CODES = dict([(action, i) for i, action in enumerate(ACTIONS)])
+_MOVES = [(code >> 3, ACTIONS[code & 7]) if code & 7 < len(ACTIONS) else None for code in range(256)]
+MAX_AGENTS = 30 # So that a move byte is never KEYFRAME or END
+
+class GameRecorder:
+    """
+    Writes a game to a binary file (opened for writing) while it is played:
+    set it as the recorder of the Game before it runs, and close it with
+    the game afterwards.
+    """
+
+    def __init__(self, file, layout, state, keyframeInterval=KEYFRAME_INTERVAL):
+        if state.getNumAgents() > MAX_AGENTS:
+            raise Exception('Games of more than %d agents cannot be recorded' % MAX_AGENTS)
+        self.file = file
+        self.keyframeInterval = keyframeInterval
+        self.turn = 0
+        text = '\n'.join(layout.layoutText).encode('latin-1', 'replace')
+        file.write(_HEADER.pack(MAGIC, keyframeInterval, len(text)))
+        file.write(text)
+        self.writeKeyframe(state)
+
+    def writeKeyframe(self, state):
+        data = state.data.toBytes()
+        self.file.write(bytes((KEYFRAME,)) + _KEYFRAME.pack(self.turn, len(data)) + data)
+        self.file.flush() # Readable up to here while the game goes on
+
+    def recordMove(self, agentIndex, action, state):
+        "Called by the Game with the state after each move."
+        self.file.write(bytes((agentIndex << 3 | _ACTION_CODES[action],)))
+        self.turn += 1
+        if self.turn % self.keyframeInterval == 0:
+            self.writeKeyframe(state)
+
+    def close(self, game):
+        "Writes the end of the game, if it is over, and closes the file."
+        if game.gameOver:
+            state = game.state
+            flags = state.isWin() | state.isLose() << 1 | game.agentCrashed << 2 | game.agentTimeout << 3
+            self.file.write(bytes((END,)) + _END.pack(self.turn, flags, state.getScore()))
+        self.file.close()
+
+class GameRecording:
+    """
+    A recording read back.  numMoves is the number of moves recorded and
+    result, for a game that was recorded to its end, a dict of its score,
+    win, lose, crashed and timedOut (None otherwise).
+    """
+
+    def __init__(self, data, name='recording'):
+        import layout
+        if len(data) < _HEADER.size or data[:len(MAGIC)] != MAGIC:
+            raise Exception('%s is not a game recording' % name)
+        self.name = name
+        self.data = data
+        magic, self.keyframeInterval, textLength = _HEADER.unpack_from(data)
+        offset = _HEADER.size + textLength
+        if offset > len(data):
+            raise Exception('%s has no complete keyframe' % name)
+        self.layout = layout.Layout(data[_HEADER.size:offset].decode('latin-1').split('\n'))
+        self.keyframes = [] # (start, end) of the packed states
+        self.segments = [] # (start, length) of the moves after each keyframe
+        while offset < len(data) and data[offset] == KEYFRAME:
+            start = offset + 1 + _KEYFRAME.size
+            if start > len(data): break
+            turn, length = _KEYFRAME.unpack_from(data, offset + 1)
+            if start + length > len(data): break # Cut off while it was written
+            if turn != len(self.keyframes) * self.keyframeInterval:
+                raise Exception('%s: keyframe of turn %d out of place' % (name, turn))
+            self.keyframes.append((start, start + length))
+            offset = start + length
+            moves = data[offset:offset + self.keyframeInterval]
+            length = len(moves)
+            for marker in (KEYFRAME, END):
+                found = moves.find(marker)
+                if found != -1: length = min(length, found)
+            self.segments.append((offset, length))
+            offset += length
+        if not self.keyframes:
+            raise Exception('%s has no complete keyframe' % name)
+        start, length = self.segments[-1]
+        self.numMoves = (len(self.keyframes) - 1) * self.keyframeInterval + length
+
+        self.result = None
+        if offset + 1 + _END.size <= len(data) and data[offset] == END:
+            numMoves, flags, score = _END.unpack_from(data, offset + 1)
+            if numMoves != self.numMoves:
+                raise Exception('%s ends after %d moves, not %d' % (name, self.numMoves, numMoves))
+            self.result = {'score': int(score) if score == int(score) else score, 'win': bool(flags & 1),
+                           'lose': bool(flags & 2), 'crashed': bool(flags & 4), 'timedOut': bool(flags & 8)}
+
+    def getKeyframe(self, k):
+        "The GameState of keyframe k, the state after k * keyframeInterval moves."
+        from pacman import GameState
+        start, end = self.keyframes[k]
+        state = GameState()
+        state.data = gameStateDataFromBytes(self.data[start:end], self.layout)
+        return state
+
+    def getMoves(self, start=0, stop=None):
+        "The (agentIndex, action) pairs of moves start to stop (the last move by default)."
+        if stop is None or stop > self.numMoves: stop = self.numMoves
+        moves = []
+        while start < stop:
+            k, i = divmod(start, self.keyframeInterval)
+            offset, length = self.segments[k]
+            count = min(length - i, stop - start)
+            moves.extend([_MOVES[code] for code in self.data[offset + i:offset + i + count]])
+            start += count
+        if None in moves:
+            raise Exception('%s: unknown action code' % self.name)
+        return moves
+
+    def getState(self, turn):
+        "The GameState after turn moves: the keyframe before it and the moves since."
+        if not 0 <= turn <= self.numMoves:
+            raise IndexError('%s has moves 0 to %d, not %d' % (self.name, self.numMoves, turn))
+        k = min(turn // self.keyframeInterval, len(self.keyframes) - 1) # The last may be cut off
+        state = self.getKeyframe(k)
+        for agentIndex, action in self.getMoves(k * self.keyframeInterval, turn):
+            state = state.generateSuccessor(agentIndex, action)
+        return state
+
+def isRecording(fileName):
+    f = open(fileName, 'rb')
+    try: return f.read(len(MAGIC)) == MAGIC
+    finally: f.close()
+
+def readRecording(fileName):
+    f = open(fileName, 'rb')
+    try: data = f.read()
+    finally: f.close()
+    return GameRecording(data, fileName)
+
+def replayRecording(recording, display, startTurn=0):
+    "Shows a recorded game on the display from the given turn on."
+    import pacman
+    rules = pacman.ClassicGameRules()
+    rules.quiet = False
+    game = Game([], display, rules) # Only for the rules to end
+    state = recording.getState(startTurn)
+    display.initialize(state.data)
+    for agentIndex, action in recording.getMoves(startTurn):
+        state = state.generateSuccessor(agentIndex, action)
+        display.update(state.data)
+        rules.process(state, game)
+    display.finish()
+
+def verifyRecording(recording):
+    """
+    Replays the whole game from its first state and checks every keyframe,
+    and the recorded result, against the replay.  Returns the final
+    GameState; raises an Exception at the first difference.
+    """
+    interval = recording.keyframeInterval
+    state = recording.getKeyframe(0)
+    for turn, (agentIndex, action) in enumerate(recording.getMoves()):
+        state = state.generateSuccessor(agentIndex, action)
+        k, i = divmod(turn + 1, interval)
+        if i == 0 and k < len(recording.keyframes):
+            start, end = recording.keyframes[k]
+            if state.data.toBytes() != recording.data[start:end]:
+                raise Exception('%s: the state after move %d differs from its keyframe' % (recording.name, turn + 1))
+    _checkResult(recording, state)
+    return state
+
+def _checkResult(recording, state):
+    result = recording.result
+    if result is not None and (result['score'] != state.getScore() or result['win'] != state.isWin() or
+                               result['lose'] != state.isLose()):
+        raise Exception('%s: the game ends with score %s, not %s' % (recording.name, state.getScore(), result['score']))
+
+def scoreRecording(fileName, verify=False):
+    "Reads a recording and returns the result of replaying it (a dict, with error set if it is corrupt)."
+    try:
+        recording = readRecording(fileName)
+        if verify:
+            state = verifyRecording(recording)
+        else:
+            state = recording.getState(recording.numMoves)
+            _checkResult(recording, state)
+    except Exception as e:
+        return {'file': fileName, 'error': str(e)}
+    return {'file': fileName, 'score': state.getScore(), 'win': state.isWin(), 'moves': recording.numMoves,
+            'finished': recording.result is not None, 'error': None}
+
+def _scoreVerified(fileName):
+    return scoreRecording(fileName, True)
+
+def readCommand(argv):
+    from optparse import OptionParser
+    parser = OptionParser('USAGE: python gameRecord.py [options] RECORDING...' + __doc__)
+    parser.add_option('--verify', action='store_true', dest='verify', default=False,
+                      help='replay every game from its start and check all its keyframes')
+    parser.add_option('-w', '--workers', dest='workers', type='int', default=0,
+                      help='replay the recordings in this many processes [Default: %default]')
+    options, fileNames = parser.parse_args(argv)
+    if not fileNames:
+        parser.error('No recordings given')
+    return options, fileNames
+
+def main(argv):
+    options, fileNames = readCommand(argv)
+    score = _scoreVerified if options.verify else scoreRecording
+    start = time.perf_counter()
+    if options.workers:
+        import multiprocessing
+        with multiprocessing.Pool(options.workers) as pool:
+            results = pool.map(score, fileNames)
+    else:
+        results = [score(fileName) for fileName in fileNames]
+    seconds = time.perf_counter() - start
+
+    games = [result for result in results if result['error'] is None]
+    for result in results:
+        if result['error'] is not None:
+            print('%s: %s' % (result['file'], result['error']))
+        else:
+            print('%s: %s, score %d, %d moves%s' % (result['file'], ['Loss', 'Win'][result['win']], result['score'],
+                                                    result['moves'], '' if result['finished'] else ' (unfinished)'))
+    if games:
+        scores = [result['score'] for result in games]
+        print('Average Score:', sum(scores) / float(len(scores)))
+        print('Win Rate:      %d/%d' % ([result['win'] for result in games].count(True), len(games)))
+    print('%s %d recordings (%d moves) in %.2f s, %d corrupt' %
+          ('Verified' if options.verify else 'Scored', len(results), sum([result['moves'] for result in games]),
+           seconds, len(results) - len(games)))
+    return 1 if len(games) < len(results) else 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,193 @@
+# hierarchical.py
+# ---------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+The abstract graph of hierarchical path finding (HPA*) for big mazes.
+
+Example:
+abstraction = getAbstraction(problem.walls)
+abstraction.getEdges( (1,1) )        # {entrance: maze distance, ...}
+abstraction.refine( (1,1), (5,3) )   # the Directions of an abstract edge
+
+The maze is cut into square clusters of clusterSize x clusterSize cells.
+Where two neighboring clusters touch, every run of open cells on both sides
+of the border is an entrance: its middle pair of cells, or both end pairs if
+the run is ENTRANCE_SPLIT cells or longer, become nodes of the abstract
+graph.  Nodes are connected by
+
+  inter edges  one step across a border, between the two cells of a pair
+  intra edges  the maze distance between two nodes of the same cluster,
+               found with a breadth first search that stays in the cluster
+
+These are computed once per walls Grid.  A query from a start to a goal only
+needs two more searches inside the start and goal clusters to connect them to
+the nodes there (memoized per position in a cache of at most maxBytes, so
+repeated queries are cheap and many different ones use bounded memory).  The
+abstract path is close to, but not always, a shortest path: it can only cross
+borders at the entrances.  It is turned back into Directions one edge at a
+time with refine.
+
+Steps have unit cost, as in maze distances.
+"""
+
+import sys
+import util
+from game import getLayoutGraph, Actions
+
+DEFAULT_CLUSTER_SIZE = 10
+ENTRANCE_SPLIT = 6
+DEFAULT_MAX_BYTES = 4 * 1024 * 1024 # For the edges of the positions queried, see getEdges
+
+class ClusterAbstraction:
+    """
+    Abstract nodes are positions: the border cells chosen as entrances.
+    edges[node] maps every node reachable in one abstract edge to its cost.
+    """
+
+    def __init__(self, walls, clusterSize=DEFAULT_CLUSTER_SIZE, maxBytes=DEFAULT_MAX_BYTES):
+        self.graph = getLayoutGraph(walls)
+        self.clusterSize = clusterSize
+        self.width, self.height = walls.width, walls.height
+        self.edges = {}         # node -> {node: cost}
+        self.clusterNodes = {}  # cluster -> [node, ...]
+        self.localEdges = util.LRUCache(maxBytes, _edgesBytes) # position -> {node of its cluster: cost}
+        self.paths = {}         # (node, node) -> refined Directions
+        self._addEntrances()
+        for cluster, nodes in self.clusterNodes.items():
+            for node in nodes:
+                distances = self.localSearch(node)[0]
+                for other in nodes:
+                    if other != node and other in distances:
+                        self.edges[node][other] = distances[other]
+
+    def getCluster(self, position):
+        x, y = position
+        return (x // self.clusterSize, y // self.clusterSize)
+
+    def _addEntrances(self):
+        "Adds the nodes and inter edges of every border between two clusters."
+        size, cellIndex = self.clusterSize, self.graph.cellIndex
+        for border in range(size, self.width, size):
+            # Vertical border between columns border - 1 and border
+            self._addBorder([((border - 1, y), (border, y)) for y in range(self.height)], cellIndex)
+        for border in range(size, self.height, size):
+            self._addBorder([((x, border - 1), (x, border)) for x in range(self.width)], cellIndex)
+
+    def _addBorder(self, pairs, cellIndex):
+        "Splits the open pairs along one border into runs, one per pair of clusters."
+        run = []
+        for pair in pairs:
+            if pair[0] in cellIndex and pair[1] in cellIndex:
+                if run and self.getCluster(pair[0]) != self.getCluster(run[-1][0]):
+                    self._addRun(run)
+                    run = []
+                run.append(pair)
+            elif run:
+                self._addRun(run)
+                run = []
+        if run:
+            self._addRun(run)
+
+    def _addRun(self, run):
+        if len(run) >= ENTRANCE_SPLIT:
+            self._addEntrance(*run[0])
+            self._addEntrance(*run[-1])
+        else:
+            self._addEntrance(*run[len(run) // 2])
+
+    def _addEntrance(self, a, b):
+        for node in (a, b):
+            if node not in self.edges:
+                self.edges[node] = {}
+                self.clusterNodes.setdefault(self.getCluster(node), []).append(node)
+        self.edges[a][b] = 1
+        self.edges[b][a] = 1
+
+    def localSearch(self, source):
+        """
+        Breadth first search from source that does not leave its cluster.
+        Returns the distances and the back-pointers (position -> (parent, action)).
+        """
+        successors, getCluster = self.graph.successors, self.getCluster
+        cluster = getCluster(source)
+        distances, parents = {source: 0}, {}
+        frontier, depth = [source], 0
+        while frontier:
+            depth += 1
+            nextFrontier = []
+            for position in frontier:
+                for nextPosition, action in successors[position]:
+                    if nextPosition not in distances and getCluster(nextPosition) == cluster:
+                        distances[nextPosition] = depth
+                        parents[nextPosition] = (position, action)
+                        nextFrontier.append(nextPosition)
+            frontier = nextFrontier
+        return distances, parents
+
+    def getEdges(self, position):
+        """
+        The nodes of the cluster of position that can be reached without
+        leaving the cluster, with their distances.  For a node these are its
+        intra edges; any other position is connected with a local search,
+        which is memoized so later queries from or to it are cheap (the least
+        recently used positions are dropped beyond maxBytes).
+        """
+        edges = self.localEdges.get(position)
+        if edges is None:
+            distances = self.localSearch(position)[0]
+            nodes = self.clusterNodes.get(self.getCluster(position), [])
+            edges = dict([(node, distances[node]) for node in nodes if node in distances and node != position])
+            self.localEdges.put(position, edges)
+        return edges
+
+    def getLocalDistance(self, start, goal):
+        "The distance from start to goal inside their cluster, None if there is no such path."
+        if self.getCluster(start) != self.getCluster(goal):
+            return None
+        return self.localSearch(start)[0].get(goal)
+
+    def refine(self, start, end):
+        "The Directions of an abstract edge (or a path inside one cluster) from start to end."
+        key = (start, end)
+        path = self.paths.get(key)
+        if path is None:
+            if self.getCluster(start) != self.getCluster(end):
+                (x1, y1), (x2, y2) = start, end
+                path = [Actions.vectorToDirection((x2 - x1, y2 - y1))]
+            else:
+                parents = self.localSearch(start)[1]
+                path, position = [], end
+                while position != start:
+                    position, action = parents[position]
+                    path.append(action)
+                path.reverse()
+            if start in self.edges and end in self.edges:
+                self.paths[key] = path # Only the edges of the abstraction, not the queries
+        return list(path)
+
+def _edgesBytes(position, edges):
+    "The size of an entry of localEdges, the nodes are shared with the abstraction."
+    return sys.getsizeof(position) + sys.getsizeof(edges)
+
+def getAbstraction(walls, clusterSize=DEFAULT_CLUSTER_SIZE):
+    """
+    Returns the ClusterAbstraction of a walls Grid, shared by every problem on
+    the same Grid so it is only built once per layout and cluster size.
+    """
+    cache = getattr(walls, '_abstractions', None)
+    if cache is None:
+        cache = walls._abstractions = {}
+    if clusterSize not in cache:
+        cache[clusterSize] = ClusterAbstraction(walls, clusterSize)
+    return cache[clusterSize]
@@ -0,0 +1,162 @@
+# landmarks.py
+# ------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Landmark (ALT) lower bounds on maze distances.
+
+Example:
+bounds = getLandmarks(problem.walls)
+bounds.getDistance( (1,1), (10,10) )   # <= the maze distance
+
+A few landmark cells are chosen per wall layout, far away from each other
+(farthest-point selection), and the maze distance from every landmark to
+every cell is computed with one breadth first search each.  By the triangle
+inequality, for every landmark L
+
+  d(a, b) >= |d(L, a) - d(L, b)|
+
+so the largest of these differences (and the Manhattan distance) is an
+admissible estimate of d(a, b) that, unlike the Manhattan distance, knows
+about walls.  This needs k rows of distances instead of the numCells rows of
+mazeDistances, so it also works for mazes that are too big for a table of
+all distances; getDistanceBounds picks whichever fits.
+
+Like mazeDistances, the bounds are UNREACHABLE for cells that are not
+connected.  The rows hold distances of any length, so a connected pair
+whose bound would reach UNREACHABLE gets UNREACHABLE - 1 instead, which is
+still a lower bound.
+"""
+
+from array import array
+from game import getLayoutGraph
+import mazeDistances
+
+DEFAULT_LANDMARKS = 8
+UNREACHABLE = mazeDistances.UNREACHABLE
+_NOT_CONNECTED = -1  # In the rows, for cells a landmark cannot reach
+
+class Landmarks:
+    """
+    Cells are numbered like in game.LayoutGraph and mazeDistances: the order
+    of walls.asList(False).
+    """
+
+    def __init__(self, walls, numLandmarks=DEFAULT_LANDMARKS):
+        self.graph = getLayoutGraph(walls)
+        self.cells = self.graph.cells
+        self.cellIndex = self.graph.cellIndex
+        self.numCells = len(self.cells)
+        self.landmarks = [] # cell ids
+        self.distances = [] # one array of distances to every cell per landmark
+        if self.numCells:
+            self._chooseLandmarks(min(numLandmarks, self.numCells))
+        self.table = _BoundTable(self)
+
+    def _chooseLandmarks(self, k):
+        "Farthest-point selection, starting from the cell farthest from cell 0."
+        far = self.numCells  # Farther than any distance, so unreachable cells are chosen first
+        nearest = array('l', [far if d == _NOT_CONNECTED else d for d in self._bfs(0)])
+        for _ in range(k):
+            landmark = max(range(self.numCells), key=nearest.__getitem__)
+            if landmark in self.landmarks:
+                break # Every cell is a landmark already
+            distances = self._bfs(landmark)
+            if not self.landmarks:
+                nearest = array('l', [far]) * self.numCells
+            self.landmarks.append(landmark)
+            self.distances.append(distances)
+            # Distance to the closest landmark, unreachable cells stay the farthest
+            nearest = array('l', [n if d == _NOT_CONNECTED or n < d else d for n, d in zip(nearest, distances)])
+
+    def _bfs(self, source):
+        offsets, targets = self.graph.offsets, self.graph.targets
+        distances = array('l', [_NOT_CONNECTED]) * self.numCells
+        distances[source] = 0
+        frontier, depth = [source], 0
+        while frontier:
+            depth += 1
+            nextFrontier = []
+            for cell in frontier:
+                for k in range(offsets[cell], offsets[cell + 1]):
+                    other = targets[k]
+                    if distances[other] == _NOT_CONNECTED:
+                        distances[other] = depth
+                        nextFrontier.append(other)
+            frontier = nextFrontier
+        return distances
+
+    def lowerBound(self, i, j):
+        "A lower bound on the distance between cells i and j, UNREACHABLE if they are not connected."
+        (x1, y1), (x2, y2) = self.cells[i], self.cells[j]
+        best = abs(x1 - x2) + abs(y1 - y2)
+        for row in self.distances:
+            di, dj = row[i], row[j]
+            if di == _NOT_CONNECTED or dj == _NOT_CONNECTED:
+                if di != dj:
+                    return UNREACHABLE # Only one of them is connected to this landmark
+                continue
+            if di - dj > best:
+                best = di - dj
+            elif dj - di > best:
+                best = dj - di
+        return min(best, UNREACHABLE - 1)
+
+    def getDistance(self, pos1, pos2):
+        """
+        Returns a lower bound on the maze distance between two open positions,
+        with the same interface as mazeDistances.MazeDistances.
+        """
+        try:
+            return self.lowerBound(self.cellIndex[pos1], self.cellIndex[pos2])
+        except KeyError:
+            raise Exception("Positions not in grid: " + str((pos1, pos2)))
+
+class _BoundTable:
+    """
+    Reads like the flat table of a MazeDistances (table[i * numCells + j]),
+    so code written for exact distances (e.g. mstHeuristic) can use the bounds.
+    """
+
+    def __init__(self, landmarks):
+        self.landmarks = landmarks
+        self.numCells = landmarks.numCells
+
+    def __getitem__(self, index):
+        i, j = divmod(index, self.numCells)
+        return self.landmarks.lowerBound(i, j)
+
+    def __len__(self):
+        return self.numCells * self.numCells
+
+def getLandmarks(walls, numLandmarks=DEFAULT_LANDMARKS):
+    """
+    Returns the Landmarks of a walls Grid, shared by every problem on the same
+    Grid so the breadth first searches only run once per layout.
+    """
+    cache = getattr(walls, '_landmarks', None)
+    if cache is None:
+        cache = walls._landmarks = {}
+    if numLandmarks not in cache:
+        cache[numLandmarks] = Landmarks(walls, numLandmarks)
+    return cache[numLandmarks]
+
+def getDistanceBounds(walls):
+    """
+    Exact maze distances (a mazeDistances.MazeDistances) when the maze is
+    small enough for a table of all distances, landmark lower bounds
+    otherwise.  Both have cells, cellIndex, numCells, table and getDistance.
+    """
+    if walls.count(False) > mazeDistances.MAX_TABLE_CELLS:
+        return getLandmarks(walls)
+    return mazeDistances.getMazeDistances(walls)
@@ -12,14 +12,45 @@
 # Pieter Abbeel (pabbeel@cs.berkeley.edu).
 
 
+"""
+Layouts are read from .lay text files.  The first time a file is read it is
+also compiled to a small binary file in a .pacmancache directory next to it
+(walls and food as packed bits, capsules and agent positions as integers),
+which later runs load instead of parsing the text again; the compiled file
+is rebuilt when the .lay file's modification time or size changes.  Within
+one process every load of the same file returns the same Layout.
+
+A Layout never changes once it is built (its walls and food are FrozenGrids),
+so copies of it share one instance.
+"""
+
 from util import manhattanDistance
 from game import Grid
+from game import gridFromBytes
+from game import getLayoutGraph
+import hierarchical
 import os
+import sys
+import struct
 import random
 from functools import reduce
 
 VISIBILITY_MATRIX_CACHE = {}
 
+CACHE_DIR_NAME = '.pacmancache'
+_HEADER = struct.Struct('<4sIIqqII')  # magic, width, height, .lay mtime (ns), .lay size, capsules, agents
+_MAGIC = b'LAY2'
+_loaded = {}  # absolute .lay path -> ((mtime, size), Layout)
+
+def _bitTable(char):
+    "A bytes.translate table that maps char to '1' and everything else to '0'."
+    table = bytearray(b'0' * 256)
+    table[ord(char)] = ord('1')
+    return bytes(table)
+
+_WALL_BITS, _FOOD_BITS = _bitTable('%'), _bitTable('.')
+_AGENT_CHARS = [('P', 0), ('G', 1), ('1', 1), ('2', 2), ('3', 3), ('4', 4)]
+
 class Layout:
     """
     A Layout manages the static information about the game board.
@@ -32,15 +63,54 @@ class Layout:
         self.food = Grid(self.width, self.height, False)
         self.capsules = []
         self.agentPositions = []
+        self.agentChars = [] # The character of each agent in the text, e.g. '2' for a numbered ghost
         self.numGhosts = 0
         self.processLayoutText(layoutText)
-        self.layoutText = layoutText
-        self.totalFood = len(self.food.asList())
+        self._layoutText = layoutText
+        self._freeze()
         # self.initializeVisibilityMatrix()
 
+    def _freeze(self):
+        self.walls = self.walls.freeze() # Walls never change during a game
+        self.food = self.food.freeze()
+        self.capsules = tuple(self.capsules)
+        self.agentPositions = tuple(self.agentPositions)
+        self.agentChars = tuple(self.agentChars)
+        self.totalFood = self.food.count()
+
+    def getLayoutText(self):
+        """
+        The rows of the layout, top row first.  Layouts loaded from a compiled
+        file rebuild them from the grids the first time they are needed, with
+        each agent written as it was (numbered ghosts keep their order).
+        """
+        text = getattr(self, '_layoutText', None)
+        if text is None:
+            width, height = self.width, self.height
+            walls = format(self.walls.bits, 'b').zfill(width * height)[::-1]
+            cells = bytearray(walls.translate({ord('1'): '%', ord('0'): ' '}).encode()) # Cell (x,y) at x * height + y
+            for x, y in self.food.asList():
+                cells[x * height + y] = ord('.')
+            for x, y in self.capsules:
+                cells[x * height + y] = ord('o')
+            for char, (isPacman, (x, y)) in zip(self.agentChars, self.agentPositions):
+                cells[x * height + y] = ord(char)
+            text = self._layoutText = [cells[y::height].decode() for y in range(height - 1, -1, -1)]
+        return text
+
+    layoutText = property(getLayoutText)
+
     def getNumGhosts(self):
         return self.numGhosts
 
+    def getGraph(self):
+        "The compiled neighbor tables of the walls (a game.LayoutGraph), built once per layout."
+        return getLayoutGraph(self.walls)
+
+    def getAbstraction(self, clusterSize=hierarchical.DEFAULT_CLUSTER_SIZE):
+        "The clusters and entrances of the walls for hierarchical search (a hierarchical.ClusterAbstraction), built once per layout."
+        return hierarchical.getAbstraction(self.walls, clusterSize)
+
     def initializeVisibilityMatrix(self):
         global VISIBILITY_MATRIX_CACHE
         if reduce(str.__add__, self.layoutText) not in VISIBILITY_MATRIX_CACHE:
@@ -91,7 +161,14 @@ class Layout:
         return "\n".join(self.layoutText)
 
     def deepCopy(self):
-        return Layout(self.layoutText[:])
+        # Layouts are immutable, so copies can share this one
+        return self
+
+    def __getstate__(self):
+        # The text is rebuilt from the grids when it is needed
+        state = dict(self.__dict__)
+        state['_layoutText'] = None
+        return state
 
     def processLayoutText(self, layoutText):
         """
@@ -106,29 +183,44 @@ class Layout:
          P - Pacman
         Other characters are ignored.
         """
-        maxY = self.height - 1
-        for y in range(self.height):
-            for x in range(self.width):
-                layoutChar = layoutText[maxY - y][x]
-                self.processLayoutChar(x, y, layoutChar)
-        self.agentPositions.sort()
-        self.agentPositions = [ ( i == 0, pos) for i, pos in self.agentPositions]
-
-    def processLayoutChar(self, x, y, layoutChar):
-        if layoutChar == '%':
-            self.walls[x][y] = True
-        elif layoutChar == '.':
-            self.food[x][y] = True
-        elif layoutChar == 'o':
+        width, height = self.width, self.height
+        # The characters in the bit order of a Grid: cell (x,y) at x * height + y
+        cells = bytearray(width * height)
+        for y in range(height):
+            row = layoutText[height - 1 - y][:width].encode('latin-1', 'replace') # Longer rows are cut off
+            if len(row) != width:
+                raise Exception('Layout row %d has %d characters instead of %d' % (height - y, len(row), width))
+            cells[y::height] = row
+        self.walls.bits = _toBits(cells, _WALL_BITS)
+        self.food.bits = _toBits(cells, _FOOD_BITS)
+
+        for x, y in _findAll(cells, 'o', height):
             self.capsules.append((x, y))
-        elif layoutChar == 'P':
-            self.agentPositions.append( (0, (x, y) ) )
-        elif layoutChar in ['G']:
-            self.agentPositions.append( (1, (x, y) ) )
-            self.numGhosts += 1
-        elif layoutChar in  ['1', '2', '3', '4']:
-            self.agentPositions.append( (int(layoutChar), (x,y)))
-            self.numGhosts += 1
+        self.capsules.sort(key=lambda pos: (pos[1], pos[0])) # Row by row, like the text
+        for char, index in _AGENT_CHARS:
+            for pos in _findAll(cells, char, height):
+                self.agentPositions.append((index, pos, char))
+                if index > 0:
+                    self.numGhosts += 1
+        self.agentPositions.sort()
+        self.agentChars = [char for i, pos, char in self.agentPositions]
+        self.agentPositions = [ ( i == 0, pos) for i, pos, char in self.agentPositions]
+
+def _toBits(cells, table):
+    "The int whose bit i is set when cells[i] maps to '1' in table."
+    digits = cells.translate(table)
+    digits.reverse()
+    return int(digits, 2)
+
+def _findAll(cells, char, height):
+    "The (x,y) positions of every occurrence of char in cells."
+    positions = []
+    i = cells.find(ord(char))
+    while i != -1:
+        positions.append((i // height, i % height))
+        i = cells.find(ord(char), i + 1)
+    return positions
+
 def getLayout(name, back = 2):
     if name.endswith('.lay'):
         layout = tryToLoad('layouts/' + name)
@@ -145,6 +237,69 @@ def getLayout(name, back = 2):
 
 def tryToLoad(fullname):
     if(not os.path.exists(fullname)): return None
-    f = open(fullname)
-    try: return Layout([line.strip() for line in f])
-    finally: f.close()
+    path = os.path.abspath(fullname)
+    stat = os.stat(path)
+    version = (stat.st_mtime_ns, stat.st_size)
+    if path in _loaded and _loaded[path][0] == version:
+        return _loaded[path][1]
+    compiledPath = getCompiledPath(path)
+    layout = _loadCompiled(compiledPath, version)
+    if layout is None:
+        f = open(fullname)
+        try: layout = Layout([line.strip() for line in f])
+        finally: f.close()
+        _saveCompiled(layout, compiledPath, version)
+    _loaded[path] = (version, layout)
+    return layout
+
+def getCompiledPath(path):
+    "Where the compiled form of the .lay file at path is cached."
+    directory, name = os.path.split(os.path.abspath(path))
+    return os.path.join(directory, CACHE_DIR_NAME, name + 'c')
+
+def _loadCompiled(path, version):
+    "Reads a compiled layout, returns None if it is missing or stale."
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return None
+    if len(data) < _HEADER.size:
+        return None
+    magic, width, height, mtime, size, numCapsules, numAgents = _HEADER.unpack_from(data)
+    gridBytes = (width * height + 7) // 8
+    if (magic, (mtime, size)) != (_MAGIC, version) \
+            or len(data) != _HEADER.size + 2 * gridBytes + 4 * (2 * numCapsules + 3 * numAgents):
+        return None
+    offset = _HEADER.size
+    layout = Layout.__new__(Layout)
+    layout.width, layout.height = width, height
+    layout.walls = gridFromBytes(width, height, data[offset:offset + gridBytes])
+    layout.food = gridFromBytes(width, height, data[offset + gridBytes:offset + 2 * gridBytes])
+    numbers = struct.unpack_from('<%dI' % (2 * numCapsules + 3 * numAgents), data, offset + 2 * gridBytes)
+    layout.capsules = [(numbers[i], numbers[i + 1]) for i in range(0, 2 * numCapsules, 2)]
+    agents = numbers[2 * numCapsules:]
+    layout.agentChars = [chr(agents[i]) for i in range(0, len(agents), 3)]
+    layout.agentPositions = [(agents[i] == ord('P'), (agents[i + 1], agents[i + 2])) for i in range(0, len(agents), 3)]
+    layout.numGhosts = len([isPacman for isPacman, pos in layout.agentPositions if not isPacman])
+    layout._layoutText = None
+    layout._freeze()
+    return layout
+
+def _saveCompiled(layout, path, version):
+    "Writes a compiled layout, only warning on read-only installs."
+    numbers = [n for pos in layout.capsules for n in pos]
+    # Every agent as its character (P, G or a ghost's number) and position
+    numbers += [n for char, (isPacman, (x, y)) in zip(layout.agentChars, layout.agentPositions) for n in (ord(char), x, y)]
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmpPath = '%s.%d.tmp' % (path, os.getpid())
+        with open(tmpPath, 'wb') as f:
+            f.write(_HEADER.pack(_MAGIC, layout.width, layout.height, version[0], version[1],
+                                 len(layout.capsules), len(layout.agentPositions)))
+            f.write(layout.walls.toBytes())
+            f.write(layout.food.toBytes())
+            f.write(struct.pack('<%dI' % len(numbers), *numbers))
+        os.replace(tmpPath, path)
+    except OSError as e:
+        print('[layout] could not write cache %s: %s' % (path, e), file=sys.stderr)
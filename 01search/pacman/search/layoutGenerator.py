@@ -0,0 +1,291 @@
+# layoutGenerator.py
+# ------------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Generates big .lay files, and a stress corpus of them for searchBenchmark.py.
+
+Styles:
+  maze    a perfect maze (exactly one path between any two cells)
+  rooms   rectangular rooms joined by corridors, with a few loops
+  open    an open field with scattered blocks of wall
+
+Every open cell of a generated layout can be reached from Pacman.  Food is
+put on a fraction (--food) or a fixed number (--numFood) of the free cells;
+with --numFood 1 the dot is as far from Pacman as the style allows, like in
+the *Maze layouts.  Ghosts and capsules can be added for the multi-agent and
+busters projects, which read the same format.
+
+The corpus has one layout per size, style and variant:
+  Search  a single dot in the far corner (PositionSearchProblem)
+  Food    food on 5% of the cells (FoodSearchProblem, ClosestDotSearchAgent)
+  Ghosts  food, 4 ghosts and 4 capsules (multi-agent and busters)
+and a corpus.json with the size, style, seed, number of open cells, food,
+capsules, ghosts, junctions and dead ends of each layout.
+
+Examples:
+  python layoutGenerator.py -W 500 -H 300 -s rooms --food 0.1 -o layouts/rooms500.lay
+  python layoutGenerator.py --corpus stressLayouts --sizes 100,250,500
+  python searchBenchmark.py -d stressLayouts -l '*Search' -a astar,jps,hpa
+"""
+
+import os, sys, json, random
+from array import array
+
+CORPUS_SIZES = [100, 250, 500, 1000, 2000]
+CORPUS_VARIANTS = {
+    'Search': {'numFood': 1},
+    'Food': {'foodDensity': 0.05},
+    'Ghosts': {'foodDensity': 0.05, 'numGhosts': 4, 'numCapsules': 4},
+}
+CORPUS_FILE = 'corpus.json'
+
+WALL, OPEN = ord('%'), ord(' ')
+
+def generateLayout(width, height, style='maze', foodDensity=0.0, numFood=None, numGhosts=0, numCapsules=0, seed=None):
+    """
+    Returns the rows of a new layout, top row first, as in a .lay file.
+    """
+    if width < 5 or height < 5:
+        raise Exception('Layouts must be at least 5x5, got %dx%d' % (width, height))
+    if style not in CARVERS:
+        raise Exception('Unknown layout style %s, use one of %s' % (style, ', '.join(STYLES)))
+    rng = random.Random(seed)
+    rows = [bytearray([WALL]) * width for _ in range(height)]
+    CARVERS[style](rows, rng)
+    grid = bytearray().join(rows)
+    cells = _connectedCells(grid, width, rng)
+
+    # Pacman near the top left corner, everything else on distinct random cells
+    pacman = min(cells, key=lambda i: i // width + i % width)
+    grid[pacman] = ord('P')
+    numFree = len(cells) - 1
+    numGhosts, numCapsules = min(numGhosts, numFree), min(numCapsules, numFree - min(numGhosts, numFree))
+    if numFood is None:
+        numFood = int(round(foodDensity * (numFree - numGhosts - numCapsules)))
+    numFood = min(numFood, numFree - numGhosts - numCapsules)
+    picks = [cells[k] for k in rng.sample(range(len(cells)), min(len(cells), numGhosts + numCapsules + numFood + 1))]
+    picks = [i for i in picks if i != pacman]
+    for char, count in (('G', numGhosts), ('o', numCapsules)):
+        for i in picks[:count]:
+            grid[i] = ord(char)
+        picks = picks[count:]
+    if numFood == 1:
+        # A single dot as far away as possible, like in the *Maze layouts
+        picks = [max([i for i in cells if grid[i] == OPEN], key=lambda i: i // width + i % width)]
+    for i in picks[:numFood]:
+        grid[i] = ord('.')
+    return [grid[y * width:(y + 1) * width].decode() for y in range(height)]
+
+def _carveMaze(rows, rng):
+    "A perfect maze on the odd coordinates, carved with a randomized depth first search."
+    height, width = len(rows), len(rows[0])
+    start = (1, 1)
+    rows[1][1] = OPEN
+    stack = [start]
+    while stack:
+        x, y = stack[-1]
+        neighbors = [(x + dx, y + dy) for dx, dy in ((2, 0), (-2, 0), (0, 2), (0, -2))
+                     if 0 < x + dx < width - 1 and 0 < y + dy < height - 1 and rows[y + dy][x + dx] == WALL]
+        if not neighbors:
+            stack.pop()
+            continue
+        nx, ny = rng.choice(neighbors)
+        rows[(y + ny) // 2][(x + nx) // 2] = OPEN
+        rows[ny][nx] = OPEN
+        stack.append((nx, ny))
+
+def _carveRooms(rows, rng):
+    "Rooms joined to their neighbors by L-shaped corridors, plus a few extra corridors."
+    height, width = len(rows), len(rows[0])
+    maxSide = max(3, min(20, width // 4, height // 4))
+    rooms = []
+    for _ in range(width * height // 150):
+        w, h = rng.randint(3, maxSide), rng.randint(3, maxSide)
+        if w > width - 4 or h > height - 4:
+            continue
+        x, y = rng.randint(2, width - w - 2), rng.randint(2, height - h - 2)
+        if any([OPEN in row[x - 1:x + w + 1] for row in rows[y - 1:y + h + 1]]):
+            continue # Rooms keep a wall between them
+        rooms.append((x, y, w, h))
+        for row in rows[y:y + h]:
+            row[x:x + w] = bytearray([OPEN]) * w
+    if not rooms:
+        rooms.append((1, 1, width - 2, height - 2))
+        for row in rows[1:height - 1]:
+            row[1:width - 1] = bytearray([OPEN]) * (width - 2)
+
+    # Visit the rooms in bands from top to bottom, left to right and back, so
+    # that consecutive rooms are close to each other
+    band = 2 * maxSide
+    centers = [(x + rng.randrange(w), y + rng.randrange(h)) for x, y, w, h in rooms]
+    centers.sort(key=lambda center: (center[1] // band, center[0] if center[1] // band % 2 == 0 else -center[0]))
+    links = list(zip(centers, centers[1:]))
+    for _ in range(len(centers) // 10):
+        k = rng.randrange(len(centers))
+        links.append((centers[k], centers[min(len(centers) - 1, k + rng.randint(2, 5))]))
+    for (x1, y1), (x2, y2) in links:
+        for x in range(min(x1, x2), max(x1, x2) + 1):
+            rows[y1][x] = OPEN
+        for y in range(min(y1, y2), max(y1, y2) + 1):
+            rows[y][x2] = OPEN
+
+def _carveOpen(rows, rng):
+    "An open field with blocks of wall on about 15% of the cells."
+    height, width = len(rows), len(rows[0])
+    for row in rows[1:height - 1]:
+        row[1:width - 1] = bytearray([OPEN]) * (width - 2)
+    for _ in range((width - 2) * (height - 2) * 15 // 100 // 6):
+        w, h = rng.choice([(1, rng.randint(2, 8)), (rng.randint(2, 8), 1), (2, 2)])
+        x, y = rng.randint(1, max(1, width - w - 1)), rng.randint(1, max(1, height - h - 1))
+        for row in rows[y:min(y + h, height - 1)]:
+            row[x:min(x + w, width - 1)] = bytearray([WALL]) * (min(x + w, width - 1) - x)
+
+def _connectedCells(grid, width, rng):
+    """
+    Walls off every open cell outside the biggest connected part of the flat
+    grid (found from a few random cells) and returns the indices of the
+    cells that are left.
+    """
+    openCells = array('i', [i for i, char in enumerate(grid) if char != WALL])
+    if not openCells:
+        raise Exception('The generated layout has no open cells')
+    best, bestSeen = None, None
+    for _ in range(5):
+        start = rng.choice(openCells)
+        if best is not None and bestSeen[start]:
+            continue
+        seen = bytearray(len(grid))
+        seen[start] = 1
+        frontier = array('i', [start])
+        for i in frontier:
+            for j in (i + 1, i - 1, i + width, i - width):
+                if not seen[j] and grid[j] != WALL:
+                    seen[j] = 1
+                    frontier.append(j)
+        if best is None or len(frontier) > len(best):
+            best, bestSeen = frontier, seen
+        if 2 * len(best) > len(openCells):
+            break
+    for i in openCells:
+        if not bestSeen[i]:
+            grid[i] = WALL
+    return best
+
+CARVERS = {'maze': _carveMaze, 'rooms': _carveRooms, 'open': _carveOpen}
+STYLES = ['maze', 'rooms', 'open']
+
+def layoutStats(rows):
+    "Counts the open cells, food, capsules, ghosts, junctions and dead ends of layout rows."
+    height, width = len(rows), len(rows[0])
+    isOpen = [[char != '%' for char in row] for row in rows]
+    junctions = deadEnds = 0
+    for y in range(1, height - 1):
+        above, row, below = isOpen[y - 1], isOpen[y], isOpen[y + 1]
+        for x in range(1, width - 1):
+            if row[x]:
+                degree = above[x] + below[x] + row[x - 1] + row[x + 1]
+                if degree >= 3:
+                    junctions += 1
+                elif degree == 1:
+                    deadEnds += 1
+    text = ''.join(rows)
+    return {'width': width, 'height': height, 'cells': len(text) - text.count('%'),
+            'food': text.count('.'), 'capsules': text.count('o'), 'ghosts': text.count('G'),
+            'junctions': junctions, 'deadEnds': deadEnds}
+
+def writeLayout(path, rows):
+    with open(path, 'w') as f:
+        f.write('\n'.join(rows) + '\n')
+
+def generateCorpus(directory, sizes=CORPUS_SIZES, styles=STYLES, seed=0, verbose=True):
+    """
+    Writes a layout for every size, style and variant to directory, and their
+    metadata to directory/corpus.json.  Returns the metadata.
+    """
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    metadata = {}
+    for size in sizes:
+        for style in styles:
+            for variant, options in sorted(CORPUS_VARIANTS.items()):
+                name = '%s%d%s' % (style, size, variant)
+                layoutSeed = random.Random('%s/%d/%s/%s' % (seed, size, style, variant)).getrandbits(32)
+                rows = generateLayout(size, size, style, seed=layoutSeed, **options)
+                writeLayout(os.path.join(directory, name + '.lay'), rows)
+                stats = layoutStats(rows)
+                stats.update({'style': style, 'variant': variant, 'seed': layoutSeed})
+                metadata[name] = stats
+                if verbose:
+                    print('%-20s %8d cells %8d food %7d junctions' % (name, stats['cells'], stats['food'], stats['junctions']))
+                    sys.stdout.flush()
+    with open(os.path.join(directory, CORPUS_FILE), 'w') as f:
+        json.dump(metadata, f, indent=1, sort_keys=True)
+    return metadata
+
+def loadCorpus(directory):
+    "The metadata of a corpus written by generateCorpus, {} if there is none."
+    path = os.path.join(directory, CORPUS_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def readCommand(argv):
+    from optparse import OptionParser
+    parser = OptionParser(__doc__)
+    parser.add_option('-W', '--width', dest='width', type='int', default=100,
+                      help='the width of the layout [Default: %default]')
+    parser.add_option('-H', '--height', dest='height', type='int', default=100,
+                      help='the height of the layout [Default: %default]')
+    parser.add_option('-s', '--style', dest='style', default='maze',
+                      help='one of %s [Default: %%default]' % ', '.join(STYLES))
+    parser.add_option('--food', dest='foodDensity', type='float', default=0.0,
+                      help='the fraction of the free cells with food [Default: %default]')
+    parser.add_option('--numFood', dest='numFood', type='int', default=None,
+                      help='the number of dots, instead of --food')
+    parser.add_option('-g', '--ghosts', dest='numGhosts', type='int', default=0,
+                      help='the number of ghosts [Default: %default]')
+    parser.add_option('-c', '--capsules', dest='numCapsules', type='int', default=0,
+                      help='the number of capsules [Default: %default]')
+    parser.add_option('--seed', dest='seed', type='int', default=None,
+                      help='the random seed, for reproducible layouts')
+    parser.add_option('-o', '--output', dest='output', default=None,
+                      help='the .lay file to write [Default: print the layout]')
+    parser.add_option('--corpus', dest='corpus', default=None,
+                      help='write the stress corpus to this directory instead')
+    parser.add_option('--sizes', dest='sizes', default=','.join(map(str, CORPUS_SIZES)),
+                      help='comma separated sizes of the corpus layouts [Default: %default]')
+    options, otherjunk = parser.parse_args(argv)
+    if len(otherjunk) != 0:
+        raise Exception('Command line input not understood: ' + str(otherjunk))
+    return options
+
+def main(argv):
+    options = readCommand(argv)
+    if options.corpus:
+        sizes = [int(size) for size in options.sizes.split(',')]
+        metadata = generateCorpus(options.corpus, sizes, seed=options.seed or 0)
+        print('%d layouts written to %s' % (len(metadata), options.corpus))
+        return 0
+    rows = generateLayout(options.width, options.height, options.style, options.foodDensity, options.numFood,
+                          options.numGhosts, options.numCapsules, options.seed)
+    if options.output:
+        writeLayout(options.output, rows)
+        print('%s: %s' % (options.output, layoutStats(rows)))
+    else:
+        print('\n'.join(rows))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,198 @@
+# mstHeuristic.py
+# ---------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+A memoized minimum spanning tree heuristic for the FoodSearchProblem.
+
+Example:
+heuristic = getMSTHeuristic(problem.walls)
+heuristic(position, foodGrid)   # maze distance to the nearest food + MST cost
+
+Most A* nodes share their remaining food with many other nodes and only differ
+in Pacman's position, so the MST over the food is cached by the bits of the
+food Grid.  The cache is a LRU cache bounded by an (approximate) number of
+bytes.  When the MST of a food set is missing but the MST of the same set plus
+the dot under Pacman is cached (the parent of the node in the search), the
+new tree is derived from the old one by removing that dot instead of running
+Prim's algorithm again.
+"""
+
+import sys
+import landmarks, util
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+_EDGE_BYTES = sys.getsizeof((0, 0, 0))
+
+class MSTHeuristic:
+    """
+    h(position, food) = (maze distance from position to the nearest food)
+                      + (cost of the MST over the remaining food)
+
+    Both terms are lower bounds on the remaining path, so the sum is admissible
+    and consistent.  All distances come from a mazeDistances.MazeDistances
+    table; food cells are identified by their index in that table.  On mazes
+    too big for such a table the landmark lower bounds of landmarks.py are
+    used instead, which keeps the sum admissible.
+    """
+
+    def __init__(self, distances, maxBytes=DEFAULT_MAX_BYTES):
+        self.distances = distances
+        self.cache = util.LRUCache(maxBytes, self._entryBytes) # food bits -> (cells, mstCost, mstEdges)
+        self.hits, self.misses, self.incremental = 0, 0, 0
+
+    def __call__(self, position, foodGrid):
+        cells, cost, _ = self.lookup(foodGrid, position)
+        if not cells:
+            return 0
+        table, n = self.distances.table, self.distances.numCells
+        row = self.distances.cellIndex[position] * n
+        nearest = min([table[row + cell] for cell in cells])
+        return nearest + cost
+
+    def lookup(self, foodGrid, position=None):
+        """
+        Returns (cells, mstCost, mstEdges) for the food in foodGrid, where
+        mstEdges is a tuple of (distance, cell, cell) triples.  position is
+        the dot that was eaten last, if it is known.
+        """
+        key = foodGrid.bits
+        entry = self.cache.get(key)
+        if entry is not None:
+            self.hits += 1
+            return entry
+
+        self.misses += 1
+        cellIndex = self.distances.cellIndex
+        parent = None
+        if position is not None:
+            x, y = position
+            parent = self.cache.peek(key | (1 << (x * foodGrid.height + y)))
+        if parent is not None:
+            self.incremental += 1
+            removed = cellIndex[position]
+            cells = tuple([cell for cell in parent[0] if cell != removed])
+            cost, edges = self._removeCell(parent[1], parent[2], removed)
+        else:
+            cells = tuple([cellIndex[food] for food in foodGrid.asList()])
+            cost, edges = self._prim(cells)
+
+        entry = (cells, cost, edges)
+        self.cache.put(key, entry)
+        return entry
+
+    def _entryBytes(self, key, entry):
+        cells, cost, edges = entry
+        return sys.getsizeof(key) + sys.getsizeof(cells) + sys.getsizeof(edges) + len(edges) * _EDGE_BYTES
+
+    def _prim(self, cells):
+        "Dense O(k^2) Prim's algorithm over the food cells."
+        k = len(cells)
+        if k <= 1:
+            return 0, ()
+        table, n = self.distances.table, self.distances.numCells
+        inTree = [False] * k
+        best = [float('inf')] * k
+        parent = [-1] * k
+        best[0] = 0
+        cost, edges = 0, []
+        for _ in range(k):
+            u = min([i for i in range(k) if not inTree[i]], key=best.__getitem__)
+            inTree[u] = True
+            if parent[u] >= 0:
+                cost += best[u]
+                edges.append((best[u], cells[parent[u]], cells[u]))
+            row = cells[u] * n
+            for v in range(k):
+                if not inTree[v]:
+                    d = table[row + cells[v]]
+                    if d < best[v]:
+                        best[v] = d
+                        parent[v] = u
+        return cost, tuple(edges)
+
+    def _removeCell(self, cost, edges, removed):
+        """
+        Derives the MST without removed from the MST with it.  Dropping removed
+        splits the tree into one component per incident edge.  The other tree
+        edges stay in the new MST, the components are reconnected with the
+        MST over the cheapest edges between them.
+        """
+        incident = [edge for edge in edges if edge[1] == removed or edge[2] == removed]
+        kept = [edge for edge in edges if edge[1] != removed and edge[2] != removed]
+        cost -= sum([edge[0] for edge in incident])
+        if len(incident) <= 1: # A leaf, nothing to reconnect
+            return cost, tuple(kept)
+
+        # Label the components left after dropping removed
+        component = {}
+        for edge in incident:
+            other = edge[2] if edge[1] == removed else edge[1]
+            component[other] = len(component)
+        neighbors = {}
+        for _, a, b in kept:
+            neighbors.setdefault(a, []).append(b)
+            neighbors.setdefault(b, []).append(a)
+        for root, label in list(component.items()):
+            stack = [root]
+            while stack:
+                cell = stack.pop()
+                for other in neighbors.get(cell, ()):
+                    if other not in component:
+                        component[other] = label
+                        stack.append(other)
+
+        # Cheapest edge between every pair of components
+        table, n = self.distances.table, self.distances.numCells
+        members = {}
+        for cell, label in component.items():
+            members.setdefault(label, []).append(cell)
+        cheapest = []
+        labels = sorted(members)
+        for i, labelA in enumerate(labels):
+            for labelB in labels[i + 1:]:
+                best = None
+                for a in members[labelA]:
+                    row = a * n
+                    for b in members[labelB]:
+                        d = table[row + b]
+                        if best is None or d < best[0]:
+                            best = (d, a, b)
+                cheapest.append((best, labelA, labelB))
+
+        # Kruskal over the (few) components
+        cheapest.sort()
+        root = {label: label for label in labels}
+        def find(label):
+            while root[label] != label:
+                label = root[label]
+            return label
+        for edge, labelA, labelB in cheapest:
+            rootA, rootB = find(labelA), find(labelB)
+            if rootA != rootB:
+                root[rootA] = rootB
+                cost += edge[0]
+                kept.append(edge)
+        return cost, tuple(kept)
+
+def getMSTHeuristic(walls, maxBytes=DEFAULT_MAX_BYTES):
+    """
+    Returns the MSTHeuristic for a walls Grid, shared by every problem on the
+    same Grid so the cache survives between searches.
+    """
+    heuristic = getattr(walls, '_mstHeuristic', None)
+    if heuristic is None:
+        heuristic = MSTHeuristic(landmarks.getDistanceBounds(walls), maxBytes)
+        walls._mstHeuristic = heuristic
+    return heuristic
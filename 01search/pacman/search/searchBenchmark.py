@@ -0,0 +1,396 @@
+# searchBenchmark.py
+# ------------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+A headless benchmark of the search algorithms.
+
+Every search function in search.py is run with every heuristic of
+searchAgents.py that fits the problem, on every layout in layouts/ that fits
+the problem:
+
+  PositionSearchProblem   layouts with a single food dot
+  JumpPointSearchProblem  the same layouts, only with jumpPointSearch
+  CornersProblem          layouts named *Corners*
+  FoodSearchProblem       layouts with at most --maxFood dots
+
+contractedSearch and hierarchicalSearch only run on the PositionSearchProblems.
+
+Other layouts, e.g. the stress corpus of layoutGenerator.py, can be swept
+with --layoutDir; the corpus metadata (cells, food, junctions, ...) is then
+added to every result.
+
+Each run happens in its own process, which is killed after --timeout seconds.
+For every run the number of expanded nodes, the wall time, the peak memory
+(measured with tracemalloc in a second run, so it does not slow down the
+timed one) and the cost of the path are written to a JSON file.  When a
+baseline file is given, the results are compared with it and regressions
+are listed; the exit status is 1 if there are any.
+
+By default only the number of expanded nodes and the cost are compared,
+which are the same on every machine, and --updateBaseline leaves the times
+and the memory out of the baseline.  --checkTime and --checkMemory also
+compare those; they only make sense against a baseline written on the same
+machine with the same options.
+
+Examples:
+  python searchBenchmark.py -o results.json
+  python searchBenchmark.py -l '*Maze' -a bfs,astar -b searchBenchmarkBaseline.json
+  python searchBenchmark.py --updateBaseline -b searchBenchmarkBaseline.json
+  python searchBenchmark.py --checkTime --updateBaseline -b localBaseline.json
+  python searchBenchmark.py -d stressLayouts -l 'maze*Search' -a astar,hpa
+"""
+
+import os, sys, io, json, time, glob, fnmatch, inspect, platform, tracemalloc, contextlib
+import multiprocessing
+from queue import Empty
+import layout, pacman, search, searchAgents, layoutGenerator, boundedSearch
+
+LAYOUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'layouts')
+
+# The heuristics of searchAgents.py that are admissible for each problem
+PROBLEM_HEURISTICS = {
+    'PositionSearchProblem': ['nullHeuristic', 'manhattanHeuristic', 'euclideanHeuristic', 'landmarkHeuristic'],
+    'JumpPointSearchProblem': ['nullHeuristic', 'manhattanHeuristic', 'euclideanHeuristic', 'landmarkHeuristic'],
+    'CornersProblem': ['nullHeuristic', 'cornersHeuristic'],
+    'FoodSearchProblem': ['nullHeuristic', 'foodHeuristic'],
+}
+
+# Search functions that only work for some kinds of problem, and the problems only for one function
+PROBLEM_ONLY_FUNCTIONS = {'jumpPointSearch': ['JumpPointSearchProblem'],
+                          'contractedSearch': ['PositionSearchProblem'],  # Needs the costFn of a position problem
+                          'hierarchicalSearch': ['PositionSearchProblem']}
+FUNCTION_ONLY_PROBLEMS = {'JumpPointSearchProblem': 'jumpPointSearch'}
+GOAL_STATE_FUNCTIONS = ['bidirectionalSearch', 'bidirectionalAStarSearch', 'hierarchicalSearch']  # Need getGoalState()
+SKIPPED_FUNCTIONS = ['tinyMazeSearch']
+SEARCH_MODULES = [search.__name__, boundedSearch.__name__]  # search.py imports the memory-bounded searches
+
+def searchFunctions():
+    """
+    The names of the search functions in search.py, also those it imports
+    from boundedSearch.py: functions whose first argument is a problem and
+    whose other arguments are optional.  Abbreviations (bfs, astar, ...) are
+    only listed once.
+    """
+    names = []
+    for name, func in vars(search).items():
+        if name.startswith('_') or name in SKIPPED_FUNCTIONS or not inspect.isfunction(func):
+            continue
+        if func.__module__ not in SEARCH_MODULES or func.__name__ != name:
+            continue
+        parameters = list(inspect.signature(func).parameters.values())
+        if not parameters or parameters[0].name != 'problem':
+            continue
+        if any([p.default is inspect.Parameter.empty for p in parameters[1:]]):
+            continue
+        names.append(name)
+    return names
+
+def layoutCases(layoutName, maxFood):
+    "The problems to benchmark on a layout."
+    lay = layout.getLayout(layoutName)
+    numFood = lay.food.count()
+    problems = []
+    if numFood == 1:
+        problems += ['PositionSearchProblem', 'JumpPointSearchProblem']
+    if 'Corners' in layoutName:
+        problems.append('CornersProblem')
+    if 0 < numFood <= maxFood:
+        problems.append('FoodSearchProblem')
+    return problems
+
+def makeCases(layoutPattern='*', algorithms=None, maxFood=20, layoutDir=LAYOUT_DIR):
+    """
+    Lists every (layout, problem, algorithm, heuristic) to run.  Layouts
+    outside layouts/ are given by their path.
+    """
+    functions = searchFunctions()
+    if algorithms:
+        functions = [getattr(search, name).__name__ for name in algorithms]
+    cases = []
+    for path in sorted(glob.glob(os.path.join(layoutDir, '*.lay'))):
+        layoutName = os.path.basename(path)[:-4]
+        if not fnmatch.fnmatch(layoutName, layoutPattern):
+            continue
+        if os.path.abspath(layoutDir) != LAYOUT_DIR:
+            layoutName = path
+        for problem in layoutCases(layoutName, maxFood):
+            for fn in functions:
+                if fn in PROBLEM_ONLY_FUNCTIONS and problem not in PROBLEM_ONLY_FUNCTIONS[fn]:
+                    continue
+                if problem in FUNCTION_ONLY_PROBLEMS and FUNCTION_ONLY_PROBLEMS[problem] != fn:
+                    continue
+                if fn in GOAL_STATE_FUNCTIONS and not hasattr(getattr(searchAgents, problem), 'getGoalState'):
+                    continue
+                if 'heuristic' in inspect.signature(getattr(search, fn)).parameters:
+                    for heuristic in PROBLEM_HEURISTICS[problem]:
+                        cases.append((layoutName, problem, fn, heuristic))
+                else:
+                    cases.append((layoutName, problem, fn, None))
+    return cases
+
+def makeProblem(layoutName, problemName):
+    "Builds a search problem on the start state of a layout."
+    lay = layout.getLayout(layoutName)
+    gameState = pacman.GameState()
+    gameState.initialize(lay, lay.getNumGhosts())
+    problemType = getattr(searchAgents, problemName)
+    if problemName in ('PositionSearchProblem', 'JumpPointSearchProblem'):
+        return problemType(gameState, goal=lay.food.asList()[0], warn=False, visualize=False)
+    return problemType(gameState)
+
+def runCase(case, measureMemory=False):
+    """
+    Runs one benchmark case in this process and returns its result.  The
+    output of the problems and searches is discarded.
+    """
+    layoutName, problemName, fn, heuristic = case
+    result = {'layout': layoutName, 'problem': problemName, 'algorithm': fn, 'heuristic': heuristic}
+    with contextlib.redirect_stdout(io.StringIO()):
+        problem = makeProblem(layoutName, problemName)
+        func = getattr(search, fn)
+        if heuristic is not None:
+            heur = getattr(searchAgents, heuristic) if hasattr(searchAgents, heuristic) else getattr(search, heuristic)
+            run = lambda: func(problem, heuristic=heur)
+        else:
+            run = lambda: func(problem)
+        if measureMemory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            path = run()
+        except Exception as e:
+            result.update({'status': 'error', 'error': '%s: %s' % (type(e).__name__, e)})
+            return result
+        finally:
+            elapsed = time.perf_counter() - start
+            if measureMemory:
+                result['peakMemory'] = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+    if path is None or not isinstance(path, list):
+        path = []  # A few searches return the start state when it is the goal
+    result.update({'status': 'ok', 'time': round(elapsed, 4), 'cost': problem.getCostOfActions(path),
+                   'pathLength': len(path), 'expanded': getattr(problem, '_expanded', None)})
+    if not path and not problem.isGoalState(problem.getStartState()):
+        result['status'] = 'nopath'
+    return result
+
+def _worker(case, measureMemory, queue):
+    queue.put(runCase(case, measureMemory))
+
+def runIsolated(case, timeout, measureMemory=False):
+    "Runs runCase in a separate process, giving up after timeout seconds."
+    context = multiprocessing.get_context('fork' if 'fork' in multiprocessing.get_all_start_methods() else None)
+    queue = context.Queue()
+    process = context.Process(target=_worker, args=(case, measureMemory, queue))
+    process.start()
+    deadline = time.time() + timeout
+    result, status = None, 'timeout'
+    while result is None and time.time() < deadline:
+        try:
+            result = queue.get(timeout=0.1)
+        except Empty:
+            if not process.is_alive():
+                try:
+                    result = queue.get(timeout=0.1)  # It may have finished just now
+                except Empty:
+                    status = 'crashed'
+                    break
+    process.join(1)
+    if process.is_alive():
+        process.terminate()
+        process.join()
+    if result is None:
+        layoutName, problemName, fn, heuristic = case
+        result = {'layout': layoutName, 'problem': problemName, 'algorithm': fn, 'heuristic': heuristic,
+                  'status': status}
+    return result
+
+def runBenchmark(cases, timeout=30, measureMemory=True, verbose=True):
+    "Runs every case, returns the list of results."
+    results = []
+    for i, case in enumerate(cases):
+        result = runIsolated(case, timeout)
+        if measureMemory and result['status'] in ('ok', 'nopath'):
+            memoryResult = runIsolated(case, timeout, measureMemory=True)
+            result['peakMemory'] = memoryResult.get('peakMemory')
+        results.append(result)
+        if verbose:
+            print('[%d/%d] %s' % (i + 1, len(cases), formatResult(result)))
+            sys.stdout.flush()
+    return results
+
+def formatResult(result):
+    name = '%s %s %s %s' % (result['layout'], result['problem'], result['algorithm'], result['heuristic'] or '-')
+    if result['status'] not in ('ok', 'nopath'):
+        return '%-70s %s %s' % (name, result['status'], result.get('error', ''))
+    memory = result.get('peakMemory')
+    return '%-70s cost %6s  expanded %8s  %8.3fs  %s' % (name, result['cost'], result['expanded'], result['time'],
+                                                          '-' if memory is None else '%.1fMB' % (memory / 2.0 ** 20))
+
+def caseKey(result):
+    return (result['layout'], result['problem'], result['algorithm'], result['heuristic'])
+
+def compareResults(results, baseline, timeTolerance=0.5, memoryTolerance=0.2, expandedTolerance=0.0,
+                   checkTime=False, checkMemory=False):
+    """
+    Compares results with baseline results and returns a list of
+    (result, message) regressions:
+      - a case that is not in the baseline, so nothing can be checked,
+      - a case that used to finish but now fails or times out,
+      - a higher path cost,
+      - more expanded nodes (by more than expandedTolerance, a fraction),
+      - with checkTime / checkMemory, more time or memory (by more than
+        timeTolerance / memoryTolerance, ignoring differences below 50ms
+        and 64KB) if the baseline has them.
+    """
+    old = dict([(caseKey(result), result) for result in baseline])
+    regressions = []
+    for result in results:
+        before = old.get(caseKey(result))
+        if before is None:
+            regressions.append((result, 'not in the baseline'))
+            continue
+        if before['status'] != 'ok':
+            continue
+        if result['status'] != 'ok':
+            regressions.append((result, 'status %s, was ok' % result['status']))
+            continue
+        if result['cost'] > before['cost'] + 1e-9:
+            regressions.append((result, 'cost %s, was %s' % (result['cost'], before['cost'])))
+        if before.get('expanded') is not None and result['expanded'] is not None \
+                and result['expanded'] > before['expanded'] * (1 + expandedTolerance):
+            regressions.append((result, 'expanded %d, was %d' % (result['expanded'], before['expanded'])))
+        if checkTime and before.get('time') is not None \
+                and result['time'] > before['time'] * (1 + timeTolerance) and result['time'] - before['time'] > 0.05:
+            regressions.append((result, 'time %.3fs, was %.3fs' % (result['time'], before['time'])))
+        if checkMemory and result.get('peakMemory') is not None and before.get('peakMemory') is not None \
+                and result['peakMemory'] > before['peakMemory'] * (1 + memoryTolerance) \
+                and result['peakMemory'] - before['peakMemory'] > 64 * 1024:
+            regressions.append((result, 'peak memory %d, was %d' % (result['peakMemory'], before['peakMemory'])))
+    return regressions
+
+def unrunBaseline(baseline, cases, layoutPattern='*', functions=None):
+    """
+    The baseline results of the layouts and functions selected (by the
+    pattern and the list of function names, None for all) that are not among
+    the cases any more, e.g. because a search was renamed or moved: nothing
+    checks them.  Only the problems still benchmarked on a layout count, so
+    a lower --maxFood does not report its food problems.
+    """
+    keys = set(cases)
+    problems = set([(layoutName, problem) for layoutName, problem, fn, heuristic in cases])
+    unrun = []
+    for result in baseline:
+        layoutName = os.path.basename(result['layout'])
+        if layoutName.endswith('.lay'):
+            layoutName = layoutName[:-4]
+        if not fnmatch.fnmatch(layoutName, layoutPattern):
+            continue
+        if functions is not None and result['algorithm'] not in functions:
+            continue
+        if (result['layout'], result['problem']) not in problems:
+            continue
+        if caseKey(result) not in keys:
+            unrun.append(result)
+    return unrun
+
+def baselineResult(result, keepTime=False, keepMemory=False):
+    "A result without the measurements that depend on the machine, to be stored in a baseline."
+    result = dict(result)
+    if not keepTime:
+        result.pop('time', None)
+    if not keepMemory:
+        result.pop('peakMemory', None)
+    return result
+
+def readCommand(argv):
+    from optparse import OptionParser
+    parser = OptionParser(__doc__)
+    parser.add_option('-l', '--layouts', dest='layouts', default='*',
+                      help='only run the layouts matching this pattern, e.g. "*Maze" [Default: %default]')
+    parser.add_option('-d', '--layoutDir', dest='layoutDir', default=LAYOUT_DIR,
+                      help='the directory of the layouts, e.g. a corpus of layoutGenerator.py [Default: layouts/]')
+    parser.add_option('-a', '--algorithms', dest='algorithms', default=None,
+                      help='comma separated search functions to run [Default: all of search.py]')
+    parser.add_option('-t', '--timeout', dest='timeout', type='float', default=30,
+                      help='seconds after which a run is stopped [Default: %default]')
+    parser.add_option('--maxFood', dest='maxFood', type='int', default=20,
+                      help='the largest number of dots for a FoodSearchProblem [Default: %default]')
+    parser.add_option('--noMemory', dest='measureMemory', action='store_false', default=True,
+                      help='skip the second run that measures the peak memory')
+    parser.add_option('-o', '--output', dest='output', default='searchBenchmark.json',
+                      help='the JSON file to write the results to [Default: %default]')
+    parser.add_option('-b', '--baseline', dest='baseline', default=None,
+                      help='a JSON file of earlier results to compare with')
+    parser.add_option('--updateBaseline', dest='updateBaseline', action='store_true', default=False,
+                      help='write the results to the baseline file instead of comparing with it')
+    parser.add_option('--checkTime', dest='checkTime', action='store_true', default=False,
+                      help='also compare the time, and keep it in an updated baseline')
+    parser.add_option('--checkMemory', dest='checkMemory', action='store_true', default=False,
+                      help='also compare the peak memory, and keep it in an updated baseline')
+    parser.add_option('--timeTolerance', dest='timeTolerance', type='float', default=0.5,
+                      help='allowed relative increase of the time [Default: %default]')
+    parser.add_option('--memoryTolerance', dest='memoryTolerance', type='float', default=0.2,
+                      help='allowed relative increase of the peak memory [Default: %default]')
+    options, otherjunk = parser.parse_args(argv)
+    if len(otherjunk) != 0:
+        raise Exception('Command line input not understood: ' + str(otherjunk))
+    if options.updateBaseline and not options.baseline:
+        raise Exception('--updateBaseline needs a --baseline file')
+    return options
+
+def main(argv):
+    options = readCommand(argv)
+    algorithms = options.algorithms.split(',') if options.algorithms else None
+    cases = makeCases(options.layouts, algorithms, options.maxFood, options.layoutDir)
+    print('Running %d benchmark cases' % len(cases))
+    results = runBenchmark(cases, options.timeout, options.measureMemory)
+    corpus = layoutGenerator.loadCorpus(options.layoutDir)
+    for result in results:
+        stats = corpus.get(os.path.basename(result['layout'])[:-4])
+        if stats is not None:
+            result['layoutStats'] = stats
+
+    report = {'python': platform.python_version(), 'platform': platform.platform(),
+              'date': time.strftime('%Y-%m-%d %H:%M:%S'), 'timeout': options.timeout, 'results': results}
+    output = options.output
+    if options.updateBaseline:
+        output = options.baseline
+        report = {'python': report['python'], 'timeout': options.timeout,
+                  'results': [baselineResult(result, options.checkTime, options.checkMemory) for result in results]}
+        if options.checkTime or options.checkMemory:
+            report['platform'] = platform.platform()
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=1)
+    print('Results written to ' + output)
+
+    if options.baseline and not options.updateBaseline:
+        with open(options.baseline) as f:
+            baseline = json.load(f)['results']
+        regressions = compareResults(results, baseline, options.timeTolerance, options.memoryTolerance,
+                                     checkTime=options.checkTime, checkMemory=options.checkMemory)
+        for result, message in regressions:
+            print('REGRESSION %s %s %s %s: %s' % (result['layout'], result['problem'], result['algorithm'],
+                                                  result['heuristic'] or '-', message))
+        functions = [getattr(search, name).__name__ for name in algorithms] if algorithms else None
+        unrun = unrunBaseline(baseline, cases, options.layouts, functions)
+        for result in unrun:
+            print('NOT RUN %s %s %s %s: in the baseline, but no longer a case' % (result['layout'], result['problem'],
+                                                                                  result['algorithm'], result['heuristic'] or '-'))
+        print('%d regressions and %d baseline cases not run against %s' % (len(regressions), len(unrun), options.baseline))
+        return 1 if regressions or unrun else 0
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
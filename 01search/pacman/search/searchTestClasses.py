@@ -20,6 +20,7 @@ import textwrap
 # import project specific code
 import layout
 import pacman
+import util
 from search import SearchProblem
 
 # helper function for printing solutions in solution files
@@ -821,3 +822,158 @@ class CornerHeuristicPacman(testClasses.TestCase):
         handle.close()
         return True
 
+
+
+class BoundedSearchTest(testClasses.TestCase):
+    """
+    Checks that iterativeDeepeningAStarSearch and memoryBoundedAStarSearch find
+    a path as cheap as aStarSearch, and that SMA* keeps to its node budget
+    (maxNodes), within maxGenerated generated nodes if it is given.  The
+    problem is a PositionSearchProblem on the layout, or an eight puzzle.
+    """
+
+    def __init__(self, question, testDict):
+        super(BoundedSearchTest, self).__init__(question, testDict)
+        self.layout_text = testDict.get('layout', None)
+        self.puzzle = testDict.get('puzzle', None)
+        self.layoutName = testDict.get('layoutName', 'eightpuzzle')
+        self.heuristicName = testDict.get('heuristic', 'nullHeuristic')
+        self.maxNodes = int(testDict['maxNodes'])
+        self.maxTableSize = int(testDict.get('maxTableSize', '100000'))
+        self.maxGenerated = int(testDict['maxGenerated']) if 'maxGenerated' in testDict else None
+
+    def getProblem(self, search, searchAgents):
+        if self.puzzle != None:
+            import eightpuzzle
+            problem = eightpuzzle.EightPuzzleSearchProblem(eightpuzzle.EightPuzzleState([int(n) for n in self.puzzle.split()]))
+        else:
+            lay = layout.Layout([l.strip() for l in self.layout_text.split('\n')])
+            start_state = pacman.GameState()
+            start_state.initialize(lay, 0)
+            problem = searchAgents.PositionSearchProblem(start_state, warn=False, visualize=False)
+        heuristic = getattr(searchAgents, self.heuristicName, None) or getattr(search, self.heuristicName)
+        return problem, heuristic
+
+    def execute(self, grades, moduleDict, solutionDict):
+        search = moduleDict['search']
+        searchAgents = moduleDict['searchAgents']
+        cost = int(solutionDict['cost'])
+
+        problem, heuristic = self.getProblem(search, searchAgents)
+        path = search.iterativeDeepeningAStarSearch(problem, heuristic, self.maxTableSize)
+        if not checkSolution(problem, path) or problem.getCostOfActions(path) != cost:
+            self.addMessage('iterativeDeepeningAStarSearch found a path of cost %s, the optimal cost is %d'
+                            % (problem.getCostOfActions(path), cost))
+            return self.testFail(grades)
+
+        problem, heuristic = self.getProblem(search, searchAgents)
+        stats = {}
+        path = search.memoryBoundedAStarSearch(problem, heuristic, self.maxNodes, self.maxGenerated, stats)
+        if stats['peakNodes'] > self.maxNodes:
+            self.addMessage('memoryBoundedAStarSearch held %d nodes, its budget is %d' % (stats['peakNodes'], self.maxNodes))
+            return self.testFail(grades)
+        if self.maxGenerated != None and stats['generated'] >= self.maxGenerated:
+            self.addMessage('memoryBoundedAStarSearch gave up after %d nodes' % stats['generated'])
+            return self.testFail(grades)
+        if not checkSolution(problem, path) or problem.getCostOfActions(path) != cost:
+            self.addMessage('memoryBoundedAStarSearch found a path of cost %s, the optimal cost is %d'
+                            % (problem.getCostOfActions(path), cost))
+            return self.testFail(grades)
+        self.addMessage('optimal cost %d, SMA* held at most %d of %d nodes and generated %d'
+                        % (cost, stats['peakNodes'], self.maxNodes, stats['generated']))
+        return self.testPass(grades)
+
+    def writeSolution(self, moduleDict, filePath):
+        search = moduleDict['search']
+        searchAgents = moduleDict['searchAgents']
+        problem, heuristic = self.getProblem(search, searchAgents)
+        path = search.aStarSearch(problem, heuristic)
+        handle = open(filePath, 'w')
+        handle.write('# This is the solution file for %s.\n' % self.path)
+        handle.write('# The cost of an optimal path, found with aStarSearch.\n')
+        handle.write('cost: "%d"\n' % problem.getCostOfActions(path))
+        handle.close()
+        return True
+
+
+class LongCorridorTest(testClasses.TestCase):
+    """
+    A serpentine corridor of width x height cells (with the border), so long
+    that its maze distances do not fit 16 bits.  Checks that a DistanceField
+    finds the far end and that the landmark bounds stay below the distance,
+    and tell connected cells from the cells cut off when the last bend is
+    walled up.
+    """
+
+    def __init__(self, question, testDict):
+        super(LongCorridorTest, self).__init__(question, testDict)
+        self.width = int(testDict['width'])
+        self.height = int(testDict['height'])
+        self.layoutName = 'serpentine %dx%d' % (self.width, self.height)
+
+    def getWalls(self):
+        "Open rows at odd y, joined by one gap in the wall rows, alternately at the right and the left."
+        import game
+        walls = game.Grid(self.width, self.height, True)
+        for y in range(1, self.height - 1):
+            for x in range(1, self.width - 1):
+                walls[x][y] = y % 2 == 0
+            if y % 2 == 0:
+                walls[self.width - 2 if y % 4 == 2 else 1][y] = False
+        return walls
+
+    def getDistances(self, walls, start):
+        "Breadth first search, the maze distance from start to every cell it reaches."
+        distances = {start: 0}
+        queue = util.Queue()
+        queue.push(start)
+        while not queue.isEmpty():
+            x, y = queue.pop()
+            for next in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+                if not walls[next[0]][next[1]] and next not in distances:
+                    distances[next] = distances[(x, y)] + 1
+                    queue.push(next)
+        return distances
+
+    def execute(self, grades, moduleDict, solutionDict):
+        import distanceField, landmarks
+        distance = int(solutionDict['distance'])
+        walls = self.getWalls()
+        start, end = (1, 1), (self.width - 2, self.height - 2)
+
+        field = distanceField.DistanceField(walls, [end])
+        path = field.pathToNearest(start)
+        if path is None or len(path) != distance:
+            self.addMessage('DistanceField: path of length %s from %s to %s, the distance is %d'
+                            % (None if path is None else len(path), start, end, distance))
+            return self.testFail(grades)
+
+        bounds = landmarks.getLandmarks(walls)
+        farthest = self.getDistances(walls, start)
+        for cell, d in [(end, distance)] + [(cell, d) for cell, d in farthest.items() if d == landmarks.UNREACHABLE]:
+            bound = bounds.getDistance(start, cell)
+            if bound == landmarks.UNREACHABLE or bound > d:
+                self.addMessage('Landmarks: bound %d from %s to %s, the distance is %d' % (bound, start, cell, d))
+                return self.testFail(grades)
+
+        cut = walls.copy()
+        y = self.height - 3  # The last wall row, its gap is the last bend
+        cut[self.width - 2 if y % 4 == 2 else 1][y] = True
+        bounds = landmarks.getLandmarks(cut)
+        for cell, connected in ((end, False), ((self.width - 2, self.height - 4), True)):
+            if (bounds.getDistance(start, cell) == landmarks.UNREACHABLE) == connected:
+                self.addMessage('Landmarks: %s is %sconnected to %s' % (cell, '' if connected else 'not ', start))
+                return self.testFail(grades)
+
+        self.addMessage('distance %d from %s to %s' % (distance, start, end))
+        return self.testPass(grades)
+
+    def writeSolution(self, moduleDict, filePath):
+        walls = self.getWalls()
+        distance = self.getDistances(walls, (1, 1))[(self.width - 2, self.height - 2)]
+        handle = open(filePath, 'w')
+        handle.write('# This is the solution file for %s.\n' % self.path)
+        handle.write('# The maze distance between the ends of the corridor, found with a breadth first search.\n')
+        handle.write('distance: "%d"\n' % distance)
+        handle.close()
+        return True
@@ -0,0 +1,118 @@
+# tourHeuristic.py
+# ----------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+An exact tour heuristic for problems that must visit a small set of targets
+(the four corners, or a handful of food dots).
+
+Example:
+heuristic = TourHeuristic(problem.walls, problem.corners)
+heuristic((5, 5), 0b1010)   # shortest walk from (5,5) through corners 1 and 3
+
+The value is the length of the shortest walk from Pacman's position through
+every remaining target, using true maze distances (or, on mazes too big for
+a table of all distances, the landmark lower bounds of landmarks.py, which
+still give an admissible value).  It is computed with the Held-Karp bitmask
+dynamic program:
+
+  finish(mask, j) = shortest walk that starts at target j and visits every
+                    target in mask (j is in mask)
+  h(position, mask) = min over j in mask of dist(position, j) + finish(mask, j)
+
+finish does not depend on Pacman's position, so it is memoized per (mask, j)
+in a table of 2^k * k entries (at most 2MB) shared by every node of the
+search; h itself is cached per (position, mask).  That cache, and the masks
+of food Grids, grow with the positions and food sets seen, so they are LRU
+caches that share maxBytes.  The cost is O(2^k * k^2) in the worst case, so
+only use it for up to MAX_TARGETS targets.
+"""
+
+import sys
+from array import array
+import landmarks, util
+
+MAX_TARGETS = 15
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+
+# Approximate size of a cache entry: a dict slot, a (position, mask) key and
+# an int value
+_ENTRY_BYTES = 3 * 8 + sys.getsizeof(((0, 0), 0)) + sys.getsizeof((0, 0)) + 2 * sys.getsizeof(2 ** 40)
+_UNKNOWN = -1
+
+class TourHeuristic:
+    """
+    Target i corresponds to bit i of the masks passed to this heuristic.
+    """
+
+    def __init__(self, walls, targets, maxBytes=DEFAULT_MAX_BYTES):
+        if len(targets) > MAX_TARGETS:
+            raise Exception('TourHeuristic supports at most %d targets, got %d' % (MAX_TARGETS, len(targets)))
+        self.distances = landmarks.getDistanceBounds(walls)
+        self.targets = tuple(targets)
+        self.height = walls.height
+        self.targetCells = [self.distances.cellIndex[target] for target in self.targets]
+        getDistance = self.distances.getDistance
+        self.targetDistances = [[getDistance(a, b) for b in self.targets] for a in self.targets]
+        entryBytes = lambda key, value: _ENTRY_BYTES
+        # mask * k + j -> cost of the shortest walk from target j through mask
+        self.finishTable = array('i', [_UNKNOWN]) * (len(self.targets) << len(self.targets))
+        self.cache = util.LRUCache(maxBytes // 2, entryBytes) # (position, mask) -> heuristic value
+        self.gridMasks = util.LRUCache(maxBytes // 2, entryBytes) # food Grid bits -> target mask
+
+    def __call__(self, position, mask):
+        "Shortest walk from position through every target whose bit is set in mask."
+        if not mask:
+            return 0
+        key = (position, mask)
+        value = self.cache.get(key)
+        if value is None:
+            table, n = self.distances.table, self.distances.numCells
+            row = self.distances.cellIndex[position] * n
+            value = min([table[row + self.targetCells[j]] + self.finish(mask, j) for j in _bits(mask)])
+            self.cache.put(key, value)
+        return value
+
+    def finish(self, mask, j):
+        "Shortest walk that starts at target j and visits every target in mask."
+        key = mask * len(self.targets) + j
+        value = self.finishTable[key]
+        if value == _UNKNOWN:
+            rest = mask & ~(1 << j)
+            if not rest:
+                value = 0
+            else:
+                row = self.targetDistances[j]
+                value = min([row[i] + self.finish(rest, i) for i in _bits(rest)])
+            self.finishTable[key] = value
+        return value
+
+    def maskOfGrid(self, grid):
+        "The mask of the targets that are still True in a boolean Grid (e.g. the food)."
+        mask = self.gridMasks.get(grid.bits)
+        if mask is None:
+            mask = 0
+            for i, (x, y) in enumerate(self.targets):
+                if grid.bits >> (x * self.height + y) & 1:
+                    mask |= 1 << i
+            self.gridMasks.put(grid.bits, mask)
+        return mask
+
+def _bits(mask):
+    "The indices of the set bits of mask."
+    indices = []
+    while mask:
+        low = mask & -mask
+        indices.append(low.bit_length() - 1)
+        mask ^= low
+    return indices
@@ -222,6 +222,161 @@ class PriorityQueueWithFunction(PriorityQueue):
         PriorityQueue.push(self, item, self.priorityFunction(item))
 
 
+_REMOVED = object()  # Marks the replaced entries of an IndexedPriorityQueue
+
+class IndexedPriorityQueue:
+    """
+      A priority queue with at most one entry per key, e.g. per search state.
+
+      The key of an item is keyFunction(item), or the item itself.  Pushing an
+      item whose key is already in the queue lowers the priority of that entry
+      instead of adding a second one (decrease-key), and is ignored if the new
+      priority is not lower.  Every key maps to its entry, so 'key in queue'
+      is O(1) and push, pop, update and remove are O(log n).  Items with equal
+      priorities are popped in the order they were (last) pushed, like in
+      PriorityQueue.
+
+      The heap itself is kept by heapq: a replaced or removed entry is only
+      marked as removed and skipped when it reaches the top, and the heap is
+      rebuilt without those entries once they make up half of it.
+    """
+    def  __init__(self, keyFunction=None):
+        self.heap = []  # [priority, count, item, key] entries, key is _REMOVED once removed
+        self.index = {}  # key -> its live entry
+        self.count = 0
+        self.removed = 0  # Number of removed entries still in the heap
+        self.keyFunction = keyFunction
+
+    def push(self, item, priority):
+        key = item if self.keyFunction is None else self.keyFunction(item)
+        old = self.index.get(key)
+        if old is None or priority < old[0]:
+            self._insert(key, item, priority, self.count)
+        self.count += 1
+
+    def update(self, item, priority):
+        # Like PriorityQueue.update: lowers the priority of the entry of item,
+        # keeping its place among equal priorities, or pushes item if it is not
+        # in the queue yet
+        key = item if self.keyFunction is None else self.keyFunction(item)
+        old = self.index.get(key)
+        if old is None:
+            self.push(item, priority)
+        elif priority < old[0]:
+            self._insert(key, item, priority, old[1])
+
+    def pop(self):
+        heap = self.heap
+        while True:
+            entry = heapq.heappop(heap)
+            if entry[3] is not _REMOVED:
+                del self.index[entry[3]]
+                return entry[2]
+            self.removed -= 1
+
+    def isEmpty(self):
+        return len(self.index) == 0
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def getPriority(self, key):
+        "Returns the priority of the entry of key, which must be in the queue"
+        return self.index[key][0]
+
+    def peekPriority(self):
+        "Returns the lowest priority in the queue, which must not be empty"
+        heap = self.heap
+        while heap[0][3] is _REMOVED:
+            heapq.heappop(heap)
+            self.removed -= 1
+        return heap[0][0]
+
+    def remove(self, key):
+        "Removes the entry of key from the queue and returns its item"
+        entry = self.index.pop(key)
+        self._discard(entry)
+        return entry[2]
+
+    def _insert(self, key, item, priority, count):
+        old = self.index.get(key)
+        if old is not None:
+            self._discard(old)
+        entry = [priority, count, item, key]
+        self.index[key] = entry
+        heapq.heappush(self.heap, entry)
+
+    def _discard(self, entry):
+        entry[3] = _REMOVED
+        self.removed += 1
+        if self.removed > 64 and 2 * self.removed > len(self.heap):
+            self.heap = [entry for entry in self.heap if entry[3] is not _REMOVED]
+            heapq.heapify(self.heap)
+            self.removed = 0
+
+class IndexedPriorityQueueWithFunction(IndexedPriorityQueue):
+    """
+    An IndexedPriorityQueue with the push signature of the Queue and the Stack
+    classes, like PriorityQueueWithFunction.
+    """
+    def  __init__(self, priorityFunction, keyFunction=None):
+        "priorityFunction (item) -> priority, keyFunction (item) -> key"
+        self.priorityFunction = priorityFunction
+        IndexedPriorityQueue.__init__(self, keyFunction)
+
+    def push(self, item):
+        "Adds an item to the queue with priority from the priority function"
+        IndexedPriorityQueue.push(self, item, self.priorityFunction(item))
+
+class LRUCache:
+    """
+      A cache bounded by an approximate number of bytes: entryBytes(key, value)
+      is the size of an entry, and when the entries add up to more than
+      maxBytes the least recently used ones are dropped (at least one entry
+      is always kept).  get marks an entry as used, peek does not.
+    """
+    def  __init__(self, maxBytes, entryBytes):
+        from collections import OrderedDict
+        self.entries = OrderedDict()
+        self.maxBytes = maxBytes
+        self.entryBytes = entryBytes
+        self.bytes = 0
+
+    def get(self, key, default=None):
+        value = self.entries.get(key, _REMOVED)
+        if value is _REMOVED:
+            return default
+        self.entries.move_to_end(key)
+        return value
+
+    def peek(self, key, default=None):
+        return self.entries.get(key, default)
+
+    def put(self, key, value):
+        entries = self.entries
+        old = entries.pop(key, _REMOVED)
+        if old is not _REMOVED:
+            self.bytes -= self.entryBytes(key, old)
+        entries[key] = value
+        self.bytes += self.entryBytes(key, value)
+        while self.bytes > self.maxBytes and len(entries) > 1:
+            oldKey, oldValue = entries.popitem(last=False)
+            self.bytes -= self.entryBytes(oldKey, oldValue)
+
+    def clear(self):
+        self.entries.clear()
+        self.bytes = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+
 def manhattanDistance( xy1, xy2 ):
     "Returns the Manhattan distance between points xy1 and xy2"
     return abs( xy1[0] - xy2[0] ) + abs( xy1[1] - xy2[1] )
@@ -607,10 +762,111 @@ def pause():
 #
 import signal
 import time
+import os
+import queue
+import threading
 class TimeoutFunctionException(Exception):
     """Exception to raise on a timeout"""
     pass
 
+try:
+    import ctypes
+    _setAsyncExc = ctypes.pythonapi.PyThreadState_SetAsyncExc
+except (ImportError, AttributeError): # Not CPython
+    _setAsyncExc = None
+
+def _raiseInThread(threadId, exceptionType):
+    "Makes thread threadId raise exceptionType at its next bytecode (None: drops a pending one)."
+    _setAsyncExc(ctypes.c_ulong(threadId), None if exceptionType is None else ctypes.py_object(exceptionType))
+
+class _Deadline:
+    __slots__ = ('threadId', 'time', 'fired')
+
+    def __init__(self, threadId, deadline):
+        self.threadId = threadId
+        self.time = deadline
+        self.fired = False
+
+class Watchdog:
+    """
+    A thread that raises TimeoutFunctionException in the threads whose
+    deadlines pass.  Unlike the SIGALRM of TimeoutFunction it works in any
+    thread, and any number of deadlines (in several threads, or nested in
+    one) can be active at the same time.  Use getWatchdog() for the one of
+    this process.
+
+    The exception interrupts Python code at its next bytecode; a call that
+    is blocked in C code (a sleep, a long builtin) is only interrupted when
+    it returns.  Without ctypes (other Pythons than CPython) the time is
+    only checked after the function has returned.
+
+    The timed thread takes no locks: an exception raised while it holds one
+    would leave it locked.  A deadline belongs to whichever thread removes
+    it from active first, the timed thread when it finishes in time or the
+    watchdog when it raises the exception.
+    """
+    def __init__(self):
+        self.pid = os.getpid()
+        self.active = {} # _Deadline -> _Deadline
+        self.wakeups = queue.SimpleQueue()
+        if _setAsyncExc is not None:
+            threading.Thread(target=self._watch, name='Watchdog', daemon=True).start()
+
+    def call(self, timeout, function, *args, **keyArgs):
+        "Returns function(*args, **keyArgs), raises TimeoutFunctionException after timeout seconds."
+        if timeout <= 0:
+            raise TimeoutFunctionException()
+        deadline = _Deadline(threading.get_ident(), time.perf_counter() + timeout)
+        if _setAsyncExc is None:
+            result = function(*args, **keyArgs)
+            if time.perf_counter() >= deadline.time:
+                raise TimeoutFunctionException()
+            return result
+        self.active[deadline] = deadline
+        self.wakeups.put(deadline)
+        try:
+            return function(*args, **keyArgs)
+        finally:
+            if self._finish(deadline):
+                raise TimeoutFunctionException()
+
+    def _finish(self, deadline):
+        "Stops watching deadline and drops its exception if it is still pending; returns whether it fired."
+        while True:
+            try:
+                if self.active.pop(deadline, None) is not None:
+                    return False
+                while not deadline.fired:
+                    time.sleep(0) # The watchdog is raising it right now
+                _raiseInThread(deadline.threadId, None)
+                return True
+            except TimeoutFunctionException:
+                pass # Raised while finishing, which is fine now that it cannot be raised again
+
+    def _watch(self):
+        while True:
+            now = time.perf_counter()
+            waiting = []
+            for deadline in list(self.active):
+                if deadline.time > now:
+                    waiting.append(deadline.time)
+                elif self.active.pop(deadline, None) is not None:
+                    _raiseInThread(deadline.threadId, TimeoutFunctionException)
+                    deadline.fired = True
+            try:
+                self.wakeups.get(timeout=min(waiting) - now if waiting else None)
+            except queue.Empty:
+                pass
+
+_watchdog = None
+
+def getWatchdog():
+    "The Watchdog of this process, started when it is first needed (again in a forked process)."
+    global _watchdog
+    if _watchdog is None or _watchdog.pid != os.getpid():
+        _watchdog = Watchdog()
+    return _watchdog
+
 
 class TimeoutFunction:
     def __init__(self, function, timeout):
@@ -621,23 +877,24 @@ class TimeoutFunction:
         raise TimeoutFunctionException()
 
     def __call__(self, *args, **keyArgs):
-        # If we have SIGALRM signal, use it to cause an exception if and
-        # when this function runs too long.  Otherwise check the time taken
-        # after the method has returned, and throw an exception then.
-        if hasattr(signal, 'SIGALRM'):
+        # If we have SIGALRM signal (and are in the main thread, where the
+        # handler runs, without an alarm set already), use it to cause an
+        # exception if and when this function runs too long.  Unlike the
+        # Watchdog it also interrupts calls blocked in C code.  Otherwise
+        # leave it to the Watchdog.
+        if hasattr(signal, 'setitimer') and threading.current_thread() is threading.main_thread() \
+                and signal.getitimer(signal.ITIMER_REAL)[0] == 0:
+            if self.timeout <= 0:
+                raise TimeoutFunctionException()
             old = signal.signal(signal.SIGALRM, self.handle_timeout)
-            signal.alarm(self.timeout)
+            signal.setitimer(signal.ITIMER_REAL, self.timeout) # Fractional seconds, unlike signal.alarm
             try:
                 result = self.function(*args, **keyArgs)
             finally:
+                signal.setitimer(signal.ITIMER_REAL, 0)
                 signal.signal(signal.SIGALRM, old)
-            signal.alarm(0)
         else:
-            startTime = time.time()
-            result = self.function(*args, **keyArgs)
-            timeElapsed = time.time() - startTime
-            if timeElapsed >= self.timeout:
-                self.handle_timeout(None, None)
+            result = getWatchdog().call(self.timeout, self.function, *args, **keyArgs)
         return result
 
 
@@ -0,0 +1,232 @@
+"""
+Memory-bounded searches: iterative deepening A* and simplified memory-bounded
+A* (SMA*), for problems whose A* fringe and closed set do not fit in memory.
+
+Both follow the SearchProblem interface (getStartState, isGoalState and
+getSuccessors with (successor, action, stepCost) triples) and take the usual
+(problem, heuristic) arguments; search.py wraps them as ida_star and
+sma_star.  This is the boundedSearch.py of the Pacman search project: like
+util.py, the tiling project keeps its own copy.
+"""
+
+import heapq
+
+def nullHeuristic(state, problem=None):
+    return 0
+
+def iterativeDeepeningAStarSearch(problem, heuristic=nullHeuristic, maxTableSize=100000):
+    """
+    Iterative deepening A*: repeated depth first searches that cut off every
+    node with g + h above a bound, the bound growing to the smallest f-value
+    that was cut off in the previous iteration.  Memory is linear in the depth
+    of the search plus a transposition table of at most maxTableSize states,
+    remembering the smallest g each state was reached with in the current
+    iteration so the same subtree is not searched twice.
+    """
+    start = problem.getStartState()
+    if problem.isGoalState(start):
+        return []
+
+    bound = heuristic(start, problem)
+    while True:
+        nextBound = float('inf')
+        table = {start: 0}
+        onPath = {start}  # States on the current path, to avoid cycles
+        actions = []
+        frames = [(start, 0, iter(problem.getSuccessors(start)))]  # An explicit stack, paths can be long
+
+        while frames:
+            state, g, successors = frames[-1]
+            for successor, action, stepCost in successors:
+                if successor in onPath:
+                    continue
+                new_g = g + stepCost
+                f = new_g + heuristic(successor, problem)
+                if f > bound:
+                    nextBound = min(nextBound, f)
+                    continue
+                if successor in table and table[successor] <= new_g:
+                    continue
+                if successor in table or len(table) < maxTableSize:
+                    table[successor] = new_g
+                if problem.isGoalState(successor):
+                    return actions + [action]
+                actions.append(action)
+                onPath.add(successor)
+                frames.append((successor, new_g, iter(problem.getSuccessors(successor))))
+                break
+            else:
+                # All successors are done, backtrack
+                frames.pop()
+                onPath.discard(state)
+                if actions:
+                    actions.pop()
+
+        if nextBound == float('inf'):
+            return []
+        bound = nextBound
+
+class _MemoryNode:
+    "A search node of memoryBoundedAStarSearch."
+    __slots__ = ('state', 'parent', 'action', 'g', 'f', 'depth', 'successors', 'nextIndex',
+                 'children', 'forgotten', 'version', 'inOpen')
+
+    def __init__(self, state, parent, action, g, f):
+        self.state, self.parent, self.action, self.g, self.f = state, parent, action, g, f
+        self.depth = 0 if parent is None else parent.depth + 1
+        self.successors = None  # Filled in on the first expansion
+        self.nextIndex = 0  # Index of the next successor that was never generated
+        self.children = {}  # successor index -> child node in memory
+        self.forgotten = {}  # successor index -> f of a child that was dropped
+        self.version = 0  # Invalidates old heap entries of this node
+        self.inOpen = False
+
+    def hasPending(self):
+        "True if some successor still has to be generated (again)."
+        if self.successors is None or self.nextIndex < len(self.successors):
+            return True
+        return any([f != float('inf') for f in self.forgotten.values()])
+
+def memoryBoundedAStarSearch(problem, heuristic=nullHeuristic, maxNodes=100000, maxGenerated=None, stats=None):
+    """
+    Simplified memory-bounded A* (SMA*) that keeps at most maxNodes search
+    nodes in memory.
+
+    Nodes generate their successors one at a time.  When memory is full, the
+    shallowest leaf with the highest f-value is dropped and its parent
+    remembers its f-value, so the subtree is only regenerated if it becomes
+    the most promising one again.  f-values are backed up from the children
+    once all successors of a node have been generated.  Returns the optimal
+    path if it fits in memory and [] otherwise.
+
+    SMA* is a tree search: it only detects cycles on the current path, so a
+    state that many paths lead to is generated once for each of them.  Open
+    mazes with many equally good paths are slow for that reason whatever
+    maxNodes is (openMaze takes about a million nodes with a budget of 500
+    or of 4000).  When the nodes with the lowest f-value do not all fit in
+    maxNodes, it also thrashes: it keeps dropping and regenerating the same
+    subtrees, and the time it takes can grow exponentially as maxNodes
+    shrinks.  maxGenerated bounds the number of nodes it generates; once
+    they are used up it gives up and returns [] like when no solution fits.
+    A dict passed as stats gets the number of nodes 'generated' and the most
+    nodes held in memory at once ('peakNodes').
+    """
+    inf = float('inf')
+    start = problem.getStartState()
+    if problem.isGoalState(start):
+        return []
+
+    best, worst = [], []  # Heaps over the open nodes: lowest f/deepest first, highest f/shallowest first
+    counter = [0]
+
+    def reopen(node):
+        node.version += 1
+        node.inOpen = True
+        counter[0] += 1
+        heapq.heappush(best, (node.f, -node.depth, counter[0], node.version, node))
+        heapq.heappush(worst, (-node.f, node.depth, counter[0], node.version, node))
+
+    def close(node):
+        node.version += 1
+        node.inOpen = False
+
+    def backup(node):
+        # Once every successor was generated, f is the best f of the children
+        while node is not None and node.successors is not None and node.nextIndex == len(node.successors):
+            values = [child.f for child in node.children.values()] + list(node.forgotten.values())
+            newF = min(values) if values else inf
+            if newF == node.f:
+                return
+            node.f = newF
+            if node.inOpen:
+                reopen(node)
+            node = node.parent
+
+    def onPath(node, state):
+        while node is not None:
+            if node.state == state:
+                return True
+            node = node.parent
+        return False
+
+    def dropWorstLeaf(keep):
+        # Forgets the shallowest leaf with the highest f, other than keep
+        skipped = []
+        while worst:
+            entry = heapq.heappop(worst)
+            leaf = entry[4]
+            if entry[3] != leaf.version or not leaf.inOpen or leaf.children or leaf.parent is None:
+                continue
+            if leaf is keep:
+                skipped.append(entry)
+                continue
+            parent = leaf.parent
+            for index, child in list(parent.children.items()):
+                if child is leaf:
+                    del parent.children[index]
+                    parent.forgotten[index] = leaf.f
+            close(leaf)
+            if not parent.inOpen or not parent.children:
+                reopen(parent)  # Open again, and a leaf again if that was its last child
+            break
+        else:
+            leaf = None
+        for entry in skipped:
+            heapq.heappush(worst, entry)
+        return leaf is not None
+
+    root = _MemoryNode(start, None, None, 0, heuristic(start, problem))
+    reopen(root)
+    numNodes = peakNodes = generated = 1
+    if stats is None:
+        stats = {}
+
+    while best:
+        stats['generated'], stats['peakNodes'] = generated, peakNodes
+        if maxGenerated is not None and generated >= maxGenerated:
+            return []  # Thrashing, see above
+        entry = best[0]
+        node = entry[4]
+        if entry[3] != node.version or not node.inOpen:
+            heapq.heappop(best)
+            continue
+        if node.f == inf:
+            return []  # No solution fits in memory
+        if problem.isGoalState(node.state):
+            actions = []
+            while node.parent is not None:
+                actions.append(node.action)
+                node = node.parent
+            actions.reverse()
+            return actions
+
+        if node.successors is None:
+            node.successors = problem.getSuccessors(node.state)
+        if node.nextIndex < len(node.successors):
+            index = node.nextIndex
+            node.nextIndex += 1
+            remembered = -inf
+        else:
+            index = min(node.forgotten, key=node.forgotten.get) if node.forgotten else None
+            remembered = node.forgotten.pop(index) if index is not None else None
+
+        if index is not None:
+            successor, action, stepCost = node.successors[index]
+            child = _MemoryNode(successor, node, action, node.g + stepCost, 0)
+            if onPath(node, successor) or (child.depth >= maxNodes - 1 and not problem.isGoalState(successor)):
+                node.forgotten[index] = inf  # A cycle, or a path that can never fit in memory
+            else:
+                child.f = max(node.f, child.g + heuristic(successor, problem), remembered)
+                while numNodes >= maxNodes and dropWorstLeaf(node):
+                    numNodes -= 1
+                node.children[index] = child
+                numNodes += 1
+                generated += 1
+                peakNodes = max(peakNodes, numNodes)
+                reopen(child)
+
+        if node.children and not node.hasPending():
+            close(node)  # Leaves stay open, so dead ends can be dropped as well
+        backup(node)
+
+    return []
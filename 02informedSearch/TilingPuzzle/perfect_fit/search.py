@@ -1,4 +1,5 @@
 from util import PriorityQueue
+from boundedSearch import iterativeDeepeningAStarSearch, memoryBoundedAStarSearch
 
 
 def reconstruct_path(came_from, goal_state):
@@ -17,21 +18,35 @@ def nullHeuristic(state, problem=None) -> float:
     """
     return 0
 
-def astar(problem, heuristic= nullHeuristic):
+def graph_search(problem, heuristic=nullHeuristic):
+    """
+    Best-first graph search shared by astar and ucs, ordered by g + h.
+
+    Fringe entries are (state, parent, action, g); the parent of a state is
+    only stored in came_from once it is expanded, and the path is rebuilt with
+    reconstruct_path when a goal is popped.
+    """
     start = problem.getStartState()
-    if problem.isGoalState(start):
-        return []
 
     fringe = PriorityQueue()
-    fringe.push((start, [], 0), heuristic(start, problem))  # (state, path, g)
+    fringe.push((start, None, None, 0), heuristic(start, problem))  # (state, parent, action, g)
 
+    came_from = {}
+    closed = {}  # state -> g at expansion
     best_g = {start: 0}
 
     while not fringe.isEmpty():
-        state, path, g = fringe.pop()
+        state, parent, move, g = fringe.pop()
+
+        # Stale entry: we already expanded this state at least as cheaply
+        if state in closed and closed[state] <= g:
+            continue
+        closed[state] = g
+        if move is not None:
+            came_from[state] = (parent, move)
 
         if problem.isGoalState(state):
-            return path
+            return reconstruct_path(came_from, state)
 
         # Explore successors
         for succ, action, step_cost in problem.getSuccessors(state):
@@ -39,33 +54,36 @@ def astar(problem, heuristic= nullHeuristic):
             if succ not in best_g or new_g < best_g[succ]:
                 best_g[succ] = new_g
                 f = new_g + heuristic(succ, problem)
-                fringe.push((succ, path + [action], new_g), f)
+                fringe.push((succ, state, action, new_g), f)
 
     return []
 
+def astar(problem, heuristic= nullHeuristic):
+    start = problem.getStartState()
+    if problem.isGoalState(start):
+        return []
+
+    return graph_search(problem, heuristic)
+
 def ucs(problem):
     """Search the node of least total cost first."""
     # Border case where start state is the goal state
     if problem.isGoalState(problem.getStartState()):
         return problem.getStartState()
 
-    # General case of finiding optimal path
-    fringe = PriorityQueue()  # Keep track of the fringe in the case of breadthfrist we use a queue
-    fringe.push((problem.getStartState(), [], 0), 0)  # Add the initials start, and its path, and the cost so far. Then for the priority arg we pass 0 for now, it will be the cosqt patgh
-    visited = {}  # Keep thrack of the already visited states along witht their costs, to avoid deadlokc, infinite loops
-
-    while not fringe.isEmpty():
-        state, path, cost_so_far = fringe.pop()
-
-        if state in visited and visited[state] <= cost_so_far:# If we already visited with a lower cost, skip
-            continue
-        visited[state] = cost_so_far
+    return graph_search(problem)
 
-        if problem.isGoalState(state): # This is the one, so end
-            return path
-
-        for successor, action, step_cost in problem.getSuccessors(state):
-            new_cost = cost_so_far + step_cost # push the new cost to the quueue
-            fringe.push((successor, path + [action], new_cost), new_cost)
+def ida_star(problem, heuristic=nullHeuristic, max_table_size=100000):
+    """
+    Iterative deepening A* with a transposition table of at most
+    max_table_size states (see boundedSearch.iterativeDeepeningAStarSearch).
+    """
+    return iterativeDeepeningAStarSearch(problem, heuristic, max_table_size)
 
-    return []
\ No newline at end of file
+def sma_star(problem, heuristic=nullHeuristic, max_nodes=100000, max_generated=None, stats=None):
+    """
+    Simplified memory-bounded A* that keeps at most max_nodes nodes in memory
+    and gives up after generating max_generated of them (see
+    boundedSearch.memoryBoundedAStarSearch).  Returns [] if no solution fits.
+    """
+    return memoryBoundedAStarSearch(problem, heuristic, max_nodes, max_generated, stats)
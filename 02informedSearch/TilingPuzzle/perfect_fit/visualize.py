@@ -1,6 +1,6 @@
 import argparse
 from tiling_problem import load_board
-from search import astar, ucs
+from search import astar, ucs, ida_star, sma_star
 from heuristics import heuristic
 
 def label_solution(problem, path):
@@ -37,12 +37,16 @@ def label_solution(problem, path):
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--board", required=True, help="Path to JSON board (W,H,blocked,pieces)")
-    ap.add_argument("--algo", choices=["ucs","astar"], default="astar")
+    ap.add_argument("--algo", choices=["ucs","astar","idastar","smastar"], default="astar")
     args = ap.parse_args()
 
     prob = load_board(args.board)
     if args.algo == "ucs":
         path = ucs(prob)
+    elif args.algo == "idastar":
+        path = ida_star(prob, heuristic)
+    elif args.algo == "smastar":
+        path = sma_star(prob, heuristic)
     else:
         path = astar(prob, heuristic)
 
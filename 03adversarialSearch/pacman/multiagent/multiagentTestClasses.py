@@ -141,14 +141,19 @@ def parseTreeProblem(testDict):
     return MultiagentTreeProblem(numAgents, startState, winStates, loseStates, successors, evaluation)
 
 
-def run(lay, layName, pac, ghosts, disp, nGames=1, name='games'):
+def run(lay, layName, pac, ghosts, disp, nGames=1, name='games', explored=None):
     """
-    Runs a few games and outputs their statistics.
+    Runs a few games and outputs their statistics.  explored is the
+    exploration tracker to play them with (see pacman.ExploredCounter).
     """
     starttime = time.time()
     print('*** Running %s on' % name, layName, '%d time(s).' % nGames)
-    games = pacman.runGames(lay, pac, ghosts, disp,
-                            nGames, False, catchExceptions=True, timeout=120)
+    previous = GameState.setExploredTracker(explored)
+    try:
+        games = pacman.runGames(lay, pac, ghosts, disp,
+                                nGames, False, catchExceptions=True, timeout=120)
+    finally:
+        GameState.setExploredTracker(previous)
     print('*** Finished running %s on' % name, layName,
           'after %d seconds.' % (time.time() - starttime))
     stats = {'time': time.time() - starttime, 'wins': [g.state.isWin() for g in games].count(True), 'games': games, 'scores': [g.state.getScore() for g in games],
@@ -346,7 +351,8 @@ class PacmanGameTreeTest(testClasses.TestCase):
         # check return codes and assign grades
         disp = self.question.getDisplay()
         stats = run(lay, self.layout_name, pac, [DirectionalGhost(
-            i + 1) for i in range(2)], disp, name=self.alg)
+            i + 1) for i in range(2)], disp, name=self.alg,
+            explored=pacman.ExploredSet())
         if stats['timeouts'] > 0:
             self.addMessage('Agent timed out on smallClassic.  No credit')
             return self.testFail(grades)
@@ -396,7 +402,8 @@ class PacmanGameTreeTest(testClasses.TestCase):
         pac = PolyAgent(self.seed, multiAgents, ourPacOptions, self.depth)
         disp = self.question.getDisplay()
         run(lay, self.layout_name, pac, [DirectionalGhost(
-            i + 1) for i in range(2)], disp, name=self.alg)
+            i + 1) for i in range(2)], disp, name=self.alg,
+            explored=pacman.ExploredSet())
         (optimalActions, altDepthActions, partialPlyBugActions) = pac.getTraces()
         # recover traces and record to file
         handle = open(filePath, 'w')
@@ -77,13 +77,21 @@ class GameState:
     # Accessor methods: use these to access state data #
     ####################################################
 
-    # static variable keeps track of which states have had getLegalActions called
-    explored = set()
+    # The exploration tracker generateSuccessor reports to (None, the default,
+    # tracks nothing; see ExploredCounter)
+    explored = None
+
+    def setExploredTracker(tracker):
+        "Sets the exploration tracker (None for none), returns the one before."
+        previous, GameState.explored = GameState.explored, tracker
+        return previous
+    setExploredTracker = staticmethod(setExploredTracker)
 
     def getAndResetExplored():
-        tmp = GameState.explored.copy()
-        GameState.explored = set()
-        return tmp
+        "The states the exploration tracker kept since the last call, an empty set if it keeps none."
+        if GameState.explored is None:
+            return set()
+        return GameState.explored.getAndReset()
     getAndResetExplored = staticmethod(getAndResetExplored)
 
     def getLegalActions(self, agentIndex=0):
@@ -129,8 +137,8 @@ class GameState:
         # Book keeping
         state.data._agentMoved = agentIndex
         state.data.score += state.data.scoreChange
-        GameState.explored.add(self)
-        GameState.explored.add(state)
+        if GameState.explored is not None:
+            GameState.explored.add(self, state, agentIndex)
         return state
 
     def getLegalPacmanActions(self):
@@ -274,6 +282,95 @@ COLLISION_TOLERANCE = 0.7  # How close ghosts must be to Pacman to kill
 TIME_PENALTY = 1  # Number of points lost each round
 
 
+class ExploredCounter:
+    """
+    Tracks the successors GameState.generateSuccessor makes, but only counts
+    them: per agent (counts[agentIndex], successors in which that agent moved)
+    and per move of the game (moveCounts, one (agentIndex, count) for every
+    move, the successor that makes the move included).
+
+    Set a tracker with GameState.setExploredTracker; there is none by default.
+    The counters add up until reset, getAndReset only hands over the states
+    kept, which this tracker has none of.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def add(self, parent, child, agentIndex):
+        self.counts[agentIndex] = self.counts.get(agentIndex, 0) + 1
+        self.moveCount += 1
+
+    def endMove(self, agentIndex):
+        "Called by the rules after every move of a game."
+        self.moveCounts.append((agentIndex, self.moveCount))
+        self.moveCount = 0
+
+    def getTotal(self):
+        return sum(self.counts.values())
+
+    def getAndReset(self):
+        return set()
+
+    def reset(self):
+        self.counts = {}
+        self.moveCounts = []
+        self.moveCount = 0
+
+
+class ExploredSample(ExploredCounter):
+    """
+    Also keeps a uniform sample of at most size of the successors made since
+    the last getAndReset (reservoir sampling with a random generator of its
+    own, so the games play the same as without it).
+    """
+
+    def __init__(self, size=1000, seed=None):
+        self.size = size
+        self.random = random.Random(seed)
+        ExploredCounter.__init__(self)
+
+    def add(self, parent, child, agentIndex):
+        ExploredCounter.add(self, parent, child, agentIndex)
+        self.seen += 1
+        if len(self.sample) < self.size:
+            self.sample.append(child)
+        else:
+            i = self.random.randrange(self.seen)
+            if i < self.size:
+                self.sample[i] = child
+
+    def getAndReset(self):
+        sample = set(self.sample)
+        self.sample, self.seen = [], 0
+        return sample
+
+    def reset(self):
+        ExploredCounter.reset(self)
+        self.sample, self.seen = [], 0
+
+
+class ExploredSet(ExploredCounter):
+    """
+    Also keeps every state a successor was made of or made since the last
+    getAndReset, like the autograder counts them.  Keeps them all alive:
+    only for grading.
+    """
+
+    def add(self, parent, child, agentIndex):
+        ExploredCounter.add(self, parent, child, agentIndex)
+        self.states.add(parent)
+        self.states.add(child)
+
+    def getAndReset(self):
+        states, self.states = self.states, set()
+        return states
+
+    def reset(self):
+        ExploredCounter.reset(self)
+        self.states = set()
+
+
 class ClassicGameRules:
     """
     These game rules manage the control flow of a game, deciding when
@@ -297,6 +394,8 @@ class ClassicGameRules:
         """
         Checks to see whether it is time to end the game.
         """
+        if GameState.explored is not None:
+            GameState.explored.endMove(state.data._agentMoved)
         if state.isWin():
             self.win(state, game)
         if state.isLose():
@@ -58,6 +58,7 @@ class Distancer:
   def getDistance(self, pos1, pos2):
     """
     The getDistance function is the only one you'll need after you create the object.
+    Positions that are not connected are 65535 (mazeDistances.UNREACHABLE) apart.
     """
     if self._distances == None:
       return manhattanDistance(pos1, pos2)
@@ -143,44 +144,15 @@ class DistanceCalculator(threading.Thread):
     self.distancer._distances = distances
 
 def computeDistances(layout):
-    distances = {}
-    allNodes = layout.walls.asList(False)
-    for source in allNodes:
-        dist = {}
-        closed = {}
-        for node in allNodes:
-            dist[node] = 1000000000
-        import util
-        queue = util.PriorityQueue()
-        queue.push(source, 0)
-        dist[source] = 0
-        while not queue.isEmpty():
-            node = queue.pop()
-            if node in closed:
-                continue
-            closed[node] = True
-            nodeDist = dist[node]
-            adjacent = []
-            x, y = node
-            if not layout.isWall((x,y+1)):
-                adjacent.append((x,y+1))
-            if not layout.isWall((x,y-1)):
-                adjacent.append((x,y-1) )
-            if not layout.isWall((x+1,y)):
-                adjacent.append((x+1,y) )
-            if not layout.isWall((x-1,y)):
-                adjacent.append((x-1,y))
-            for other in adjacent:
-                if not other in dist:
-                    continue
-                oldDist = dist[other]
-                newDist = nodeDist+1
-                if newDist < oldDist:
-                    dist[other] = newDist
-                    queue.push(other, newDist)
-        for target in allNodes:
-            distances[(target, source)] = dist[target]
-    return distances
+    """
+    Returns the all-pairs maze distances of the layout.  They are computed once
+    per wall layout and cached on disk, see mazeDistances.py.  The result can
+    be indexed like a dictionary with (pos1, pos2) keys.  Cells that are not
+    connected are mazeDistances.UNREACHABLE (65535) apart, and layouts of
+    more than mazeDistances.MAX_TABLE_CELLS open cells are refused.
+    """
+    import mazeDistances
+    return mazeDistances.getMazeDistances(layout.walls)
 
 
 def getDistanceOnGrid(distances, pos1, pos2):
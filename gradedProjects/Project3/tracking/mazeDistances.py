@@ -0,0 +1,171 @@
+# mazeDistances.py
+# ----------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+All-pairs maze distances, computed once per wall layout.
+
+Example:
+distances = getMazeDistances(gameState.getWalls())
+distances.getDistance( (1,1), (10,10) )
+
+The distances are computed with one breadth first search per open cell and
+stored as a flat array of unsigned 16 bit integers (one row per source cell).
+The array is written to CACHE_DIR in a file named after a hash of the walls,
+and later runs map that file into memory instead of searching again.  Within
+one process the table is also remembered on the walls Grid itself, so every
+lookup after the first one is O(1).
+"""
+
+import os, sys, mmap, struct, hashlib
+from array import array
+
+CACHE_DIR = os.environ.get('PACMAN_CACHE_DIR',
+                           os.path.join(os.path.dirname(os.path.abspath(__file__)), '.pacmancache'))
+UNREACHABLE = 0xFFFF  # Stored for pairs of cells that are not connected
+MAX_TABLE_CELLS = 5000  # Larger mazes would need a table of more than 50MB
+
+_HEADER = struct.Struct('<4sIII')  # magic, width, height, number of open cells
+_MAGIC = b'MZD1' if sys.byteorder == 'little' else b'MZB1'  # The table is stored in native byte order
+_loaded = {}  # wall hash -> MazeDistances, shared by all layouts with the same walls
+
+class MazeDistances:
+    """
+    Shortest path distances between every pair of open cells of a maze.
+
+    Cells are numbered column by column (the order of walls.asList(False)),
+    the distance from cell i to cell j is stored at index i * numCells + j.
+    """
+
+    def __init__(self, walls, table=None):
+        self.width, self.height = walls.width, walls.height
+        self.cells = walls.asList(False)
+        self.cellIndex = {cell: i for i, cell in enumerate(self.cells)}
+        self.numCells = len(self.cells)
+        if table is None:
+            table = self._computeTable(walls)
+        self.table = table
+
+    def _computeTable(self, walls):
+        "Runs one breadth first search per open cell."
+        n = self.numCells
+        neighbors = []
+        for x, y in self.cells:
+            adjacent = []
+            for nx, ny in ((x, y + 1), (x, y - 1), (x + 1, y), (x - 1, y)):
+                if (nx, ny) in self.cellIndex:
+                    adjacent.append(self.cellIndex[(nx, ny)])
+            neighbors.append(adjacent)
+
+        table = array('H', [UNREACHABLE]) * (n * n)
+        for source in range(n):
+            row = source * n
+            table[row + source] = 0
+            frontier, depth = [source], 0
+            while frontier:
+                depth += 1
+                nextFrontier = []
+                for cell in frontier:
+                    for other in neighbors[cell]:
+                        if table[row + other] == UNREACHABLE:
+                            table[row + other] = depth
+                            nextFrontier.append(other)
+                frontier = nextFrontier
+        return table
+
+    def getDistance(self, pos1, pos2):
+        """
+        Returns the maze distance between two open grid positions, or
+        UNREACHABLE if there is no path between them.
+        """
+        try:
+            return self.table[self.cellIndex[pos1] * self.numCells + self.cellIndex[pos2]]
+        except KeyError:
+            raise Exception("Positions not in grid: " + str((pos1, pos2)))
+
+    def getDistancesFrom(self, pos):
+        """
+        Returns the row of distances from pos to every open cell, indexed like
+        self.cells.
+        """
+        start = self.cellIndex[pos] * self.numCells
+        return self.table[start:start + self.numCells]
+
+    # The (pos1, pos2) -> distance dictionary interface used by distanceCalculator.py
+    def __contains__(self, key):
+        pos1, pos2 = key
+        return pos1 in self.cellIndex and pos2 in self.cellIndex
+
+    def __getitem__(self, key):
+        return self.getDistance(*key)
+
+def wallsKey(walls):
+    "Returns a stable hash of the shape and the contents of a walls Grid."
+    bits = ''.join(['1' if walls[x][y] else '0' for x in range(walls.width) for y in range(walls.height)])
+    return hashlib.sha1(('%d,%d:' % (walls.width, walls.height) + bits).encode()).hexdigest()
+
+def getMazeDistances(walls):
+    """
+    Returns the MazeDistances of a walls Grid, loading them from memory or from
+    the on-disk cache when possible and computing (and saving) them otherwise.
+    Mazes of more than MAX_TABLE_CELLS open cells are refused with an Exception.
+    """
+    distances = getattr(walls, '_mazeDistances', None)
+    if distances is not None:
+        return distances
+    numCells = walls.count(False)
+    if numCells > MAX_TABLE_CELLS:
+        raise Exception('A maze of %d open cells is too big for a table of all distances (at most %d)'
+                        % (numCells, MAX_TABLE_CELLS))
+
+    key = wallsKey(walls)
+    if key not in _loaded:
+        path = os.path.join(CACHE_DIR, key + '.dist')
+        distances = _load(walls, path)
+        if distances is None:
+            distances = MazeDistances(walls)
+            _save(distances, path)
+        _loaded[key] = distances
+    walls._mazeDistances = _loaded[key]
+    return walls._mazeDistances
+
+def _load(walls, path):
+    "Memory-maps a cached distance table, returns None if it is missing or stale."
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'rb') as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    if len(data) < _HEADER.size:
+        return None
+    distances = MazeDistances(walls, table=array('H'))
+    magic, width, height, n = _HEADER.unpack_from(data)
+    if (magic, width, height, n) != (_MAGIC, walls.width, walls.height, distances.numCells) \
+            or len(data) != _HEADER.size + 2 * n * n:
+        return None
+    distances.table = memoryview(data)[_HEADER.size:].cast('H')
+    return distances
+
+def _save(distances, path):
+    "Writes a distance table to the cache, only warning on read-only installs."
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmpPath = '%s.%d.tmp' % (path, os.getpid())
+        with open(tmpPath, 'wb') as f:
+            f.write(_HEADER.pack(_MAGIC, distances.width, distances.height, distances.numCells))
+            distances.table.tofile(f)
+        os.replace(tmpPath, path)
+    except OSError as e:
+        print('[mazeDistances] could not write cache %s: %s' % (path, e), file=sys.stderr)
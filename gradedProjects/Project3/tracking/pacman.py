@@ -72,8 +72,10 @@ class GameState:
     ####################################################
 
     # static variable keeps track of which states have had getLegalActions called
-    explored = set()
+    # (None, the default, keeps none: set it to set() to collect them)
+    explored = None
     def getAndResetExplored():
+        if GameState.explored is None: return set()
         tmp = GameState.explored.copy()
         GameState.explored = set()
         return tmp
@@ -120,8 +122,9 @@ class GameState:
         # Book keeping
         state.data._agentMoved = agentIndex
         state.data.score += state.data.scoreChange
-        GameState.explored.add(self)
-        GameState.explored.add(state)
+        if GameState.explored is not None:
+            GameState.explored.add(self)
+            GameState.explored.add(state)
         return state
 
     def getLegalPacmanActions( self ):